@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def rsi_analysis(data, period:int=14):
@@ -30,4 +31,159 @@ def atr_analysis(data, period: int = 14):
     atr = true_range.rolling(window=period).mean()
     atr_percent = (atr / df['close']) * 100
     
-    return atr_percent
\ No newline at end of file
+    return atr_percent
+
+def _rolling_mean_panel(values: np.ndarray, period: int) -> np.ndarray:
+    """2次元配列の行ごとの単純移動平均（累積和で一括計算）"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] < period:
+        return out
+    csum = np.cumsum(values, axis=1)
+    window_sum = csum[:, period - 1:].copy()
+    window_sum[:, 1:] -= csum[:, :-period]
+    out[:, period - 1:] = window_sum / period
+    return out
+
+def rsi_panel(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI計算（銘柄×足の2次元配列を一括処理、rsi_analysisと同じ値）"""
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.zeros_like(close)
+    delta[:, 1:] = np.diff(close, axis=1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    avg_gain = _rolling_mean_panel(gain, period)
+    avg_loss = _rolling_mean_panel(loss, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    return rsi
+
+def atr_panel(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """ATR%計算（銘柄×足の2次元配列を一括処理、atr_analysisと同じ値）"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    # 前日終値（先頭列は前日がないので高値-安値のみ）
+    true_range = high - low
+    prev_close = close[:, :-1]
+    true_range[:, 1:] = np.maximum.reduce([
+        true_range[:, 1:],
+        np.abs(high[:, 1:] - prev_close),
+        np.abs(low[:, 1:] - prev_close),
+    ])
+
+    atr = _rolling_mean_panel(true_range, period)
+    return (atr / close) * 100
+
+def indicator_panel(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14):
+    """高値・安値・終値のパネル（銘柄×足、古い順）からRSIとATR%を一括計算"""
+    return {
+        'RSI': rsi_panel(close, period),
+        'ATR': atr_panel(high, low, close, period),
+    }
+
+
+class _RingBuffer:
+    """固定長リングバッファ（配列ベース、合計を逐次更新）"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, value: float) -> None:
+        old = self.values[self.index]
+        self.values[self.index] = value
+        self.index += 1
+        if self.index == self.size:
+            self.index = 0
+            # 浮動小数点誤差の蓄積を防ぐため一周ごとに合計を再計算
+            self.total = float(self.values.sum())
+        else:
+            self.total += value - old
+        if self.count < self.size:
+            self.count += 1
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.size
+
+    def mean(self) -> float:
+        return self.total / self.size
+
+    def mean_with(self, value: float) -> float:
+        """valueを追加した場合の平均（状態は変更しない、満たない場合はNaN）"""
+        if self.count + 1 < self.size:
+            return float('nan')
+        return (self.total - self.values[self.index] + value) / self.size
+
+
+class IncrementalIndicator:
+    """RSI/ATRの逐次計算（1本ごとにO(1)で更新、rsi_analysis/atr_analysisと同じ値）
+
+    確定足だけを古い順に update() へ渡すこと。形成中の足は provisional() で暫定値を計算する（状態は変更しない）。
+    """
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.gains = _RingBuffer(period)
+        self.losses = _RingBuffer(period)
+        self.true_ranges = _RingBuffer(period)
+        self.prev_close = None
+        self.last_timestamp = None
+        self.rsi = float('nan')
+        self.atr = float('nan')
+
+    def _changes(self, high: float, low: float, close: float):
+        """直前の確定足に対する (上昇幅, 下落幅, True Range)"""
+        if self.prev_close is None:
+            # 最初の足は前日終値がないので差分0、TR=高値-安値
+            delta = 0.0
+            true_range = high - low
+        else:
+            delta = close - self.prev_close
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        return (delta if delta > 0 else 0.0), (-delta if delta < 0 else 0.0), true_range
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss > 0:
+            return 100 - (100 / (1 + avg_gain / avg_loss))
+        if avg_gain > 0:
+            return 100.0
+        return float('nan')
+
+    def update(self, high: float, low: float, close: float, timestamp=None):
+        """確定した足を1本追加し、(RSI, ATR%)を返す"""
+        high, low, close = float(high), float(low), float(close)
+        gain, loss, true_range = self._changes(high, low, close)
+
+        self.gains.push(gain)
+        self.losses.push(loss)
+        self.true_ranges.push(true_range)
+        self.prev_close = close
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+
+        if self.gains.full:
+            self.rsi = self._rsi(self.gains.mean(), self.losses.mean())
+        if self.true_ranges.full:
+            self.atr = (self.true_ranges.mean() / close) * 100
+
+        return self.rsi, self.atr
+
+    def provisional(self, high: float, low: float, close: float):
+        """形成中の足を含めた暫定の (RSI, ATR%) を返す（確定足の状態は変更しない）"""
+        high, low, close = float(high), float(low), float(close)
+        gain, loss, true_range = self._changes(high, low, close)
+        avg_gain = self.gains.mean_with(gain)
+        if avg_gain != avg_gain:  # NaN（期間に満たない）
+            return float('nan'), float('nan')
+        rsi = self._rsi(avg_gain, self.losses.mean_with(loss))
+        atr = (self.true_ranges.mean_with(true_range) / close) * 100
+        return rsi, atr
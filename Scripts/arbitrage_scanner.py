@@ -0,0 +1,810 @@
+"""
+マルチ取引所アービトラージスキャナー
+取引所ごとのアダプター（一括価格取得・シンボル変換）と、全取引所の組み合わせを一括計算するスキャナー
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+import numpy as np
+
+from fx_rate import usdjpy_cache
+from http_limiter import request_json
+
+
+class VenueAdapter:
+    """取引所アダプターの基底クラス"""
+    name = ""
+    label = ""  # 表示名
+    quote_currency = "USD"  # 価格の建て通貨（JPYの場合はスキャナーがUSD換算）
+    taker_fee = 0.1  # テイカー手数料(%)
+
+    def __init__(self, symbol_overrides: Optional[Dict[str, str]] = None, taker_fee: Optional[float] = None):
+        self.symbol_overrides = symbol_overrides or {}
+        if taker_fee is not None:
+            self.taker_fee = taker_fee
+
+    def default_symbol(self, currency: str) -> str:
+        raise NotImplementedError
+
+    def symbol(self, currency: str) -> str:
+        """通貨名を取引所のペア名に変換"""
+        return self.symbol_overrides.get(currency, self.default_symbol(currency))
+
+    async def fetch_quotes(self, session: aiohttp.ClientSession, currencies: List[str]) -> Dict[str, Dict]:
+        """対象通貨の価格をまとめて取得（{通貨: {'bid', 'ask', 'last'}}）"""
+        raise NotImplementedError
+
+    async def fetch_depth(self, session: aiohttp.ClientSession, currency: str, depth: int = 50) -> Dict[str, np.ndarray]:
+        """板情報を取得（{'bids': [[価格, 数量], ...]（降順）, 'asks': 同（昇順）}、ndarray）"""
+        raise NotImplementedError
+
+    @staticmethod
+    def book_array(levels) -> np.ndarray:
+        """板の各段を(価格, 数量)のfloat配列に変換"""
+        if not levels:
+            return np.empty((0, 2))
+        return np.array([[float(level[0]), float(level[1])] for level in levels])
+
+    async def get_json(self, session: aiohttp.ClientSession, url: str, params=None):
+        # ホストごとのレート制限・再試行は共通処理に任せる
+        return await request_json(session, "GET", url, params=params, timeout=aiohttp.ClientTimeout(total=10))
+
+
+class CoincheckAdapter(VenueAdapter):
+    name = "coincheck"
+    label = "Coincheck"
+    quote_currency = "JPY"
+    taker_fee = 0.0  # 取引所の板取引は手数料無料（スプレッドは気配に反映済み）
+
+    def __init__(self, base_url: str = "https://coincheck.com", max_concurrent: int = 10, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+        self.max_concurrent = max_concurrent
+
+    def default_symbol(self, currency: str) -> str:
+        return f"{currency.lower()}_jpy"
+
+    @staticmethod
+    def parse_ticker(data) -> Dict:
+        return {'bid': float(data['bid']), 'ask': float(data['ask']), 'last': float(data['last'])}
+
+    async def fetch_quotes(self, session, currencies):
+        # Coincheckには一括ティッカーがないのでペアごとに並列取得
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def fetch(currency):
+            async with semaphore:
+                data = await self.get_json(session, f"{self.base_url}/api/ticker", params={'pair': self.symbol(currency)})
+                return dict(self.parse_ticker(data), received_at=time.time())
+
+        results = await asyncio.gather(*(fetch(c) for c in currencies), return_exceptions=True)
+        quotes = {}
+        for currency, result in zip(currencies, results):
+            if isinstance(result, Exception):
+                print(f"Coincheck {self.symbol(currency)} 価格取得エラー: {result}")
+            else:
+                quotes[currency] = result
+        return quotes
+
+
+    async def fetch_depth(self, session, currency, depth=50):
+        data = await self.get_json(session, f"{self.base_url}/api/order_books", params={'pair': self.symbol(currency)})
+        return {'bids': self.book_array(data.get('bids', [])[:depth]), 'asks': self.book_array(data.get('asks', [])[:depth])}
+
+
+class OKXAdapter(VenueAdapter):
+    name = "okx"
+    label = "OKX"
+
+    def __init__(self, base_url: str = "https://www.okx.com", **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def default_symbol(self, currency: str) -> str:
+        return f"{currency}-USDT"
+
+    @staticmethod
+    def parse_ticker(ticker) -> Dict:
+        return {'bid': float(ticker['bidPx']), 'ask': float(ticker['askPx']), 'last': float(ticker['last'])}
+
+    async def fetch_quotes(self, session, currencies):
+        data = await self.get_json(session, f"{self.base_url}/api/v5/market/tickers", params={'instType': 'SPOT'})
+        received_at = time.time()
+        if data.get('code') != '0':
+            print(f"OKX APIエラー: {data.get('msg')}")
+            return {}
+        wanted = {self.symbol(c): c for c in currencies}
+        quotes = {}
+        for ticker in data.get('data', []):
+            currency = wanted.get(ticker.get('instId'))
+            if currency and ticker.get('bidPx') and ticker.get('askPx'):
+                quotes[currency] = dict(self.parse_ticker(ticker), received_at=received_at)
+        return quotes
+
+
+    async def fetch_depth(self, session, currency, depth=50):
+        data = await self.get_json(session, f"{self.base_url}/api/v5/market/books", params={'instId': self.symbol(currency), 'sz': depth})
+        if data.get('code') != '0' or not data.get('data'):
+            raise ValueError(f"OKX板取得エラー: {data.get('msg')}")
+        book = data['data'][0]
+        return {'bids': self.book_array(book['bids']), 'asks': self.book_array(book['asks'])}
+
+
+class KrakenAdapter(VenueAdapter):
+    name = "kraken"
+    label = "Kraken"
+    taker_fee = 0.26
+
+    def __init__(self, base_url: str = "https://api.kraken.com", **kwargs):
+        # altnameが「通貨名USD」と異なるもの（BTCはXBT、DOGEはXDG）
+        overrides = {'BTC': 'XBTUSD', 'DOGE': 'XDGUSD'}
+        overrides.update(kwargs.pop('symbol_overrides', {}) or {})
+        super().__init__(symbol_overrides=overrides, **kwargs)
+        self.base_url = base_url
+        # レスポンスキー（XXBTZUSD等）→ ペア名（XBTUSD等）
+        self.result_keys = {}
+
+    def default_symbol(self, currency: str) -> str:
+        return f"{currency}USD"
+
+    async def load_result_keys(self, session):
+        """AssetPairsから全ペアのレスポンスキーとaltnameの対応を取得"""
+        data = await self.get_json(session, f"{self.base_url}/0/public/AssetPairs")
+        for key, info in data.get('result', {}).items():
+            self.result_keys[key] = info.get('altname', key)
+
+    async def fetch_quotes(self, session, currencies):
+        if not self.result_keys:
+            await self.load_result_keys(session)
+
+        # 取引所に存在しないペアを含めると全体がエラーになるので除外
+        listed = set(self.result_keys.values())
+        wanted = {self.symbol(c): c for c in currencies if self.symbol(c) in listed}
+        unlisted = [self.symbol(c) for c in currencies if self.symbol(c) not in listed]
+        if unlisted:
+            print(f"Kraken 上場していないペア: {', '.join(unlisted)}")
+        if not wanted:
+            return {}
+
+        data = await self.get_json(session, f"{self.base_url}/0/public/Ticker", params={'pair': ','.join(wanted)})
+        received_at = time.time()
+        if data.get('error'):
+            print(f"Kraken APIエラー: {data['error']}")
+            return {}
+        quotes = {}
+        for key, ticker in data.get('result', {}).items():
+            currency = wanted.get(self.result_keys.get(key, key))
+            if currency:
+                quotes[currency] = {'bid': float(ticker['b'][0]), 'ask': float(ticker['a'][0]), 'last': float(ticker['c'][0]),
+                                    'received_at': received_at}
+        missing = [pair for pair, currency in wanted.items() if currency not in quotes]
+        if missing:
+            print(f"Kraken レスポンスにないペア: {', '.join(missing)}")
+        return quotes
+
+
+    async def fetch_depth(self, session, currency, depth=50):
+        data = await self.get_json(session, f"{self.base_url}/0/public/Depth", params={'pair': self.symbol(currency), 'count': depth})
+        if data.get('error'):
+            raise ValueError(f"Kraken板取得エラー: {data['error']}")
+        book = next(iter(data['result'].values()))
+        return {'bids': self.book_array(book['bids']), 'asks': self.book_array(book['asks'])}
+
+
+class BybitAdapter(VenueAdapter):
+    name = "bybit"
+    label = "Bybit"
+
+    def __init__(self, base_url: str = "https://api.bybit.com", **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def default_symbol(self, currency: str) -> str:
+        return f"{currency}USDT"
+
+    async def fetch_quotes(self, session, currencies):
+        data = await self.get_json(session, f"{self.base_url}/v5/market/tickers", params={'category': 'spot'})
+        received_at = time.time()
+        if data.get('retCode') != 0:
+            print(f"Bybit APIエラー: {data.get('retMsg')}")
+            return {}
+        wanted = {self.symbol(c): c for c in currencies}
+        quotes = {}
+        for ticker in data.get('result', {}).get('list', []):
+            currency = wanted.get(ticker.get('symbol'))
+            if currency and ticker.get('bid1Price') and ticker.get('ask1Price'):
+                quotes[currency] = {'bid': float(ticker['bid1Price']), 'ask': float(ticker['ask1Price']),
+                                    'last': float(ticker['lastPrice']), 'received_at': received_at}
+        return quotes
+
+
+    async def fetch_depth(self, session, currency, depth=50):
+        data = await self.get_json(session, f"{self.base_url}/v5/market/orderbook",
+                                   params={'category': 'spot', 'symbol': self.symbol(currency), 'limit': min(depth, 200)})
+        if data.get('retCode') != 0:
+            raise ValueError(f"Bybit板取得エラー: {data.get('retMsg')}")
+        return {'bids': self.book_array(data['result']['b']), 'asks': self.book_array(data['result']['a'])}
+
+
+class BitgetAdapter(VenueAdapter):
+    name = "bitget"
+    label = "Bitget"
+
+    def __init__(self, base_url: str = "https://api.bitget.com", **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def default_symbol(self, currency: str) -> str:
+        return f"{currency}USDT"
+
+    async def fetch_quotes(self, session, currencies):
+        data = await self.get_json(session, f"{self.base_url}/api/v2/spot/market/tickers")
+        received_at = time.time()
+        if data.get('code') != "00000":
+            print(f"Bitget APIエラー: {data.get('msg')}")
+            return {}
+        wanted = {self.symbol(c): c for c in currencies}
+        quotes = {}
+        for ticker in data.get('data', []):
+            currency = wanted.get(ticker.get('symbol'))
+            if currency and ticker.get('bidPr') and ticker.get('askPr'):
+                quotes[currency] = {'bid': float(ticker['bidPr']), 'ask': float(ticker['askPr']), 'last': float(ticker['lastPr']),
+                                    'received_at': received_at}
+        return quotes
+
+
+    async def fetch_depth(self, session, currency, depth=50):
+        data = await self.get_json(session, f"{self.base_url}/api/v2/spot/market/orderbook",
+                                   params={'symbol': self.symbol(currency), 'limit': min(depth, 150)})
+        if data.get('code') != "00000":
+            raise ValueError(f"Bitget板取得エラー: {data.get('msg')}")
+        return {'bids': self.book_array(data['data']['bids']), 'asks': self.book_array(data['data']['asks'])}
+
+
+def walk_books(asks: np.ndarray, bids: np.ndarray, target_notional: Optional[float],
+               buy_fee: float = 0.0, sell_fee: float = 0.0) -> Dict:
+    """買い側の売り板(asks)と売り側の買い板(bids)を同時にたどり、約定可能数量と加重平均の利益率を計算
+
+    asks/bids は(価格, 数量)の配列（asksは昇順、bidsは降順）。手数料は%。
+    利益が出る限り、かつ買い代金がtarget_notional以下の範囲で数量を決める。
+    """
+    empty = {'size': 0.0, 'cost': 0.0, 'revenue': 0.0, 'vwap_buy': np.nan, 'vwap_sell': np.nan,
+             'edge_pct': np.nan, 'net_pct': np.nan, 'limited_by': 'spread'}
+    if len(asks) == 0 or len(bids) == 0:
+        return {**empty, 'limited_by': 'depth'}
+
+    ask_px, ask_qty = asks[:, 0], asks[:, 1]
+    bid_px, bid_qty = bids[:, 0], bids[:, 1]
+    ask_cum_qty = np.cumsum(ask_qty)
+    bid_cum_qty = np.cumsum(bid_qty)
+    ask_cum_cost = np.cumsum(ask_px * ask_qty)
+    bid_cum_rev = np.cumsum(bid_px * bid_qty)
+
+    # 両板の累積数量を合わせた区切りごとに、その区間の限界価格を求める
+    total_qty = min(ask_cum_qty[-1], bid_cum_qty[-1])
+    breaks = np.unique(np.concatenate([ask_cum_qty, bid_cum_qty]))
+    breaks = breaks[breaks <= total_qty]
+    starts = np.concatenate([[0.0], breaks[:-1]])
+    marginal_ask = ask_px[np.searchsorted(ask_cum_qty, starts, side='right')]
+    marginal_bid = bid_px[np.searchsorted(bid_cum_qty, starts, side='right')]
+
+    # 先頭から連続して手数料控除後も利益が出る区間まで
+    profitable = marginal_bid * (1 - sell_fee / 100) > marginal_ask * (1 + buy_fee / 100)
+    if not profitable[0]:
+        return empty
+    n_profitable = len(profitable) if profitable.all() else int(np.argmin(profitable))
+    size = breaks[n_profitable - 1]
+    limited_by = 'spread' if n_profitable < len(profitable) else 'depth'
+
+    def value_at(qty, cum_qty, cum_value, px):
+        """累積数量qtyまで約定した場合の代金（区間内は線形補間）"""
+        i = int(np.searchsorted(cum_qty, qty, side='left'))
+        prev_qty = cum_qty[i - 1] if i > 0 else 0.0
+        prev_value = cum_value[i - 1] if i > 0 else 0.0
+        return prev_value + (qty - prev_qty) * px[min(i, len(px) - 1)]
+
+    # 目標金額を超える場合は、買い代金が目標金額になる数量まで
+    if target_notional is not None and value_at(size, ask_cum_qty, ask_cum_cost, ask_px) > target_notional:
+        i = int(np.searchsorted(ask_cum_cost, target_notional, side='left'))
+        prev_qty = ask_cum_qty[i - 1] if i > 0 else 0.0
+        prev_cost = ask_cum_cost[i - 1] if i > 0 else 0.0
+        size = prev_qty + (target_notional - prev_cost) / ask_px[i]
+        limited_by = 'notional'
+
+    cost = value_at(size, ask_cum_qty, ask_cum_cost, ask_px)
+    revenue = value_at(size, bid_cum_qty, bid_cum_rev, bid_px)
+    edge_pct = (revenue - cost) / cost * 100
+    return {
+        'size': size,
+        'cost': cost,
+        'revenue': revenue,
+        'vwap_buy': cost / size,
+        'vwap_sell': revenue / size,
+        'edge_pct': edge_pct,
+        'net_pct': edge_pct - buy_fee - sell_fee,
+        'limited_by': limited_by,
+    }
+
+
+def best_routes(bids: np.ndarray, asks: np.ndarray):
+    """通貨×取引所の気配から、通貨ごとに最も有利な(買い取引所, 売り取引所)を一括計算
+
+    戻り値: (買い取引所index, 売り取引所index, 利益率%) の配列
+    """
+    _, pct = spread_matrix(bids, asks)
+    n_venues = bids.shape[1]
+    flat = np.where(np.isnan(pct), -np.inf, pct).reshape(len(bids), -1)
+    best = flat.argmax(axis=1)
+    best_pct = flat[np.arange(len(bids)), best]
+    return best // n_venues, best % n_venues, best_pct
+
+
+def spread_matrix(bids: np.ndarray, asks: np.ndarray):
+    """全方向のスプレッドを一括計算
+
+    diff[c, i, j] / pct[c, i, j] = 通貨cを取引所iで買って取引所jで売った場合の差額 / 利益率%
+    （同一取引所と気配がない組み合わせはNaN）
+    """
+    diff = bids[:, None, :] - asks[:, :, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = diff / asks[:, :, None] * 100
+    n_venues = bids.shape[1]
+    diff[:, np.arange(n_venues), np.arange(n_venues)] = np.nan
+    pct[:, np.arange(n_venues), np.arange(n_venues)] = np.nan
+    return diff, pct
+
+
+class QuoteTable:
+    """通貨×取引所×{bid, ask}の気配表（USD建て）"""
+    BID = 0
+    ASK = 1
+
+    def __init__(self, currencies: List[str], venues: List[str], fees=None):
+        self.currencies = list(currencies)
+        self.venues = list(venues)
+        self.currency_index = {c: i for i, c in enumerate(self.currencies)}
+        self.venue_index = {v: i for i, v in enumerate(self.venues)}
+        self.quotes = np.full((len(self.currencies), len(self.venues), 2), np.nan)
+        # 取引所ごとのテイカー手数料(%)
+        self.fees = np.zeros(len(self.venues)) if fees is None else np.asarray(fees, dtype=np.float64)
+
+    @classmethod
+    def from_results(cls, results: Dict, fees: Optional[Dict[str, float]] = None) -> "QuoteTable":
+        """get_all_prices形式の結果（{'currencies': {通貨: {取引所: {'bid', 'ask'}}}}）から作成"""
+        currencies = list(results['currencies'])
+        venues = []
+        for data in results['currencies'].values():
+            for venue in data:
+                if venue not in venues:
+                    venues.append(venue)
+        fees = fees or {}
+        table = cls(currencies, venues, [fees.get(v, 0.0) for v in venues])
+        for currency, data in results['currencies'].items():
+            for venue, quote in data.items():
+                table.set(currency, venue, quote['bid'], quote['ask'])
+        return table
+
+    @property
+    def bids(self) -> np.ndarray:
+        return self.quotes[:, :, self.BID]
+
+    @property
+    def asks(self) -> np.ndarray:
+        return self.quotes[:, :, self.ASK]
+
+    def set(self, currency: str, venue: str, bid: float, ask: float) -> None:
+        c = self.currency_index[currency]
+        v = self.venue_index[venue]
+        self.quotes[c, v, self.BID] = bid
+        self.quotes[c, v, self.ASK] = ask
+
+    def spreads(self):
+        """全方向の差額・利益率%・手数料控除後の純利益率%を一括計算（いずれも通貨×買い×売り）"""
+        diff, pct = spread_matrix(self.bids, self.asks)
+        net = pct - self.fees[None, :, None] - self.fees[None, None, :]
+        return diff, pct, net
+
+    def best_routes(self):
+        """通貨ごとの最良(買い取引所, 売り取引所, 利益率%)"""
+        return best_routes(self.bids, self.asks)
+
+    def top(self, k: int = 5, min_net: float = -np.inf) -> List[Dict]:
+        """純利益率の上位k件（argpartitionで部分選択してから並べ替え）"""
+        diff, pct, net = self.spreads()
+        flat = np.where(np.isnan(net), -np.inf, net).ravel()
+        k = min(k, flat.size)
+        if k == 0:
+            return []
+        candidates = np.argpartition(-flat, k - 1)[:k]
+        candidates = candidates[np.argsort(-flat[candidates])]
+
+        n_venues = len(self.venues)
+        opportunities = []
+        for idx in candidates:
+            if not flat[idx] > min_net:
+                break
+            c, rest = divmod(int(idx), n_venues * n_venues)
+            buy, sell = divmod(rest, n_venues)
+            opportunities.append({
+                'currency': self.currencies[c],
+                'buy_venue': self.venues[buy],
+                'sell_venue': self.venues[sell],
+                'buy_price': self.asks[c, buy],
+                'sell_price': self.bids[c, sell],
+                'diff': diff[c, buy, sell],
+                'profit_pct': pct[c, buy, sell],
+                'net_pct': net[c, buy, sell],
+            })
+        return opportunities
+
+
+class ArbitrageScanner:
+    def __init__(self, venues: List[VenueAdapter], currencies: List[str], fx=usdjpy_cache):
+        self.venues = venues
+        self.currencies = currencies
+        self.fx = fx
+
+    async def fetch_all(self, currencies: Optional[List[str]] = None) -> Dict:
+        """全取引所の価格を同時に取得し、USD建ての気配表を作成（取引所ごとの元の価格は 'quotes'）"""
+        currencies = currencies if currencies is not None else self.currencies
+        async with aiohttp.ClientSession() as session:
+            tasks = [asyncio.to_thread(self.fx.get)]
+            tasks += [venue.fetch_quotes(session, currencies) for venue in self.venues]
+            responses = await asyncio.gather(*tasks, return_exceptions=True)
+
+        usdjpy_rate = responses[0] if not isinstance(responses[0], Exception) else None
+        table = QuoteTable(currencies, [v.name for v in self.venues], [v.taker_fee for v in self.venues])
+        quotes_by_venue = {}
+
+        for v, (venue, quotes) in enumerate(zip(self.venues, responses[1:])):
+            if isinstance(quotes, Exception):
+                print(f"{venue.name} 価格取得エラー: {quotes}")
+                continue
+            quotes_by_venue[venue.name] = quotes
+            if venue.quote_currency == "JPY":
+                if usdjpy_rate is None:
+                    print(f"{venue.name}: 為替レートがないため除外")
+                    continue
+                rate = usdjpy_rate
+            else:
+                rate = 1.0
+            for currency, quote in quotes.items():
+                table.set(currency, venue.name, quote['bid'] / rate, quote['ask'] / rate)
+
+        return {
+            'usdjpy_rate': usdjpy_rate,
+            'table': table,
+            'quotes': quotes_by_venue,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    async def scan(self, top: int = 10) -> Dict:
+        """全取引所の組み合わせから手数料控除後の上位アービトラージを計算"""
+        start_time = time.time()
+        results = await self.fetch_all()
+        results['opportunities'] = results['table'].top(top)
+        results['elapsed'] = time.time() - start_time
+        return results
+
+    async def scan_depth(self, target_notional: float = 1000.0, depth: int = 50, min_profit: float = 0.0) -> Dict:
+        """通貨ごとの最良ルートについて板を取得し、目標金額(USD)で約定可能な数量と実効利益率を計算"""
+        start_time = time.time()
+        results = await self.fetch_all()
+        table = results['table']
+        buy, sell, pct = table.best_routes()
+
+        routes = [(c, self.venues[buy[i]], self.venues[sell[i]])
+                  for i, c in enumerate(self.currencies) if np.isfinite(pct[i]) and pct[i] > min_profit]
+
+        def usd_rate(venue):
+            return results['usdjpy_rate'] if venue.quote_currency == "JPY" else 1.0
+
+        async with aiohttp.ClientSession() as session:
+            tasks = []
+            for currency, buy_venue, sell_venue in routes:
+                tasks.append(buy_venue.fetch_depth(session, currency, depth))
+                tasks.append(sell_venue.fetch_depth(session, currency, depth))
+            books = await asyncio.gather(*tasks, return_exceptions=True)
+
+        opportunities = []
+        for i, (currency, buy_venue, sell_venue) in enumerate(routes):
+            buy_book, sell_book = books[2 * i], books[2 * i + 1]
+            if isinstance(buy_book, Exception) or isinstance(sell_book, Exception):
+                print(f"{currency} 板取得エラー: {buy_book if isinstance(buy_book, Exception) else sell_book}")
+                continue
+            # 価格をUSD換算（数量はそのまま）
+            asks = buy_book['asks'] / [usd_rate(buy_venue), 1.0]
+            bids = sell_book['bids'] / [usd_rate(sell_venue), 1.0]
+            walk = walk_books(asks, bids, target_notional, buy_venue.taker_fee, sell_venue.taker_fee)
+            opportunities.append({
+                'currency': currency,
+                'buy_venue': buy_venue.name,
+                'sell_venue': sell_venue.name,
+                'top_pct': pct[table.currency_index[currency]],
+                **walk,
+            })
+        opportunities.sort(key=lambda x: x['net_pct'] if np.isfinite(x['net_pct']) else -np.inf, reverse=True)
+
+        results['depth_opportunities'] = opportunities
+        results['target_notional'] = target_notional
+        results['elapsed'] = time.time() - start_time
+        return results
+
+    def display_depth_results(self, results, top=10):
+        """板の厚みを考慮した結果を表示"""
+        print("=" * 80)
+        print(f"板考慮アービトラージ - {results['timestamp']} | 目標金額: ${results['target_notional']:,.0f}")
+        print("=" * 80)
+        for i, opp in enumerate(results['depth_opportunities'][:top], 1):
+            print(f"{i}. {opp['currency']} - {opp['buy_venue']}→{opp['sell_venue']} (最良気配 {opp['top_pct']:+.3f}%)")
+            if opp['size'] > 0:
+                print(f"   約定可能: {opp['size']:.6f} (${opp['cost']:,.2f}, 制約: {opp['limited_by']})")
+                print(f"   加重平均: 買い ${opp['vwap_buy']:.6f} → 売り ${opp['vwap_sell']:.6f}")
+                print(f"   実効利益率: {opp['edge_pct']:.3f}% | 手数料控除後: {opp['net_pct']:.3f}%")
+            else:
+                print("   手数料控除後に利益の出る数量なし")
+
+    def display_results(self, results, min_profit=0.3, top=10):
+        """結果を表示"""
+        print("=" * 80)
+        print(f"マルチ取引所アービトラージ機会検索 - {results['timestamp']}")
+        print(f"取引所: {', '.join(v.name for v in self.venues)} | 処理時間: {results['elapsed']:.2f}秒")
+        if results['usdjpy_rate'] is not None:
+            print(f"USD/JPY為替レート: {results['usdjpy_rate']:.2f}")
+        print("=" * 80)
+
+        profitable = [o for o in results['opportunities'] if o['profit_pct'] > min_profit]
+        if not profitable:
+            print(f"現在、{min_profit}%以上の利益機会はありません")
+            return
+        for i, opp in enumerate(profitable[:top], 1):
+            print(f"{i}. {opp['currency']} - {opp['buy_venue']}→{opp['sell_venue']}")
+            print(f"   買い ${opp['buy_price']:.6f} → 売り ${opp['sell_price']:.6f}")
+            print(f"   利益率: {opp['profit_pct']:.3f}% | 手数料控除後: {opp['net_pct']:.3f}%")
+
+
+class PairArbitrage(ArbitrageScanner):
+    """Coincheckと1取引所の2取引所アービトラージ（get_ticker / get_ticker02 の共通部分）
+
+    取得・計算はスキャナーに任せ、結果を従来の形式
+    {'currencies': {通貨: {'coincheck': 価格, 相手の取引所名: 価格}}}（USD建て）に変換する。
+    """
+
+    def __init__(self, other: VenueAdapter, currencies: List[str], fx=usdjpy_cache,
+                 round_trip_fee: Optional[float] = None):
+        self.coincheck = CoincheckAdapter()
+        self.other = other
+        super().__init__([self.coincheck, other], list(currencies), fx=fx)
+        self.coincheck_url = f"{self.coincheck.base_url}/api/ticker"
+        # 通貨 → 各取引所のペア名
+        self.currency_pairs = {c: {venue.name: venue.symbol(c) for venue in self.venues} for c in self.currencies}
+        # 方向のキー（cc_to_okx / okx_to_cc など）
+        self.forward = f"cc_to_{other.name}"
+        self.backward = f"{other.name}_to_cc"
+        # 手数料控除後の表示に使う往復の手数料(%)（未指定なら両取引所のテイカー手数料の合計）
+        self.round_trip_fee = round_trip_fee if round_trip_fee is not None else self.coincheck.taker_fee + other.taker_fee
+
+    def get_usdjpy_rate(self):
+        """USD/JPY為替レートを取得（キャッシュ、取得できない場合はNone）"""
+        return self.fx.get()
+
+    def get_available_currencies(self):
+        """利用可能な通貨リストを返す"""
+        return list(self.currency_pairs.keys())
+
+    def to_usd_quote(self, venue: VenueAdapter, quote: Dict, usdjpy_rate: Optional[float]) -> Dict:
+        """取引所の価格を従来形式のUSD建て価格に変換（JPY建ては元の価格を 'original' に残す）"""
+        rate = usdjpy_rate if venue.quote_currency == "JPY" else 1.0
+        result = {
+            'bid': round(quote['bid'] / rate, 6),
+            'ask': round(quote['ask'] / rate, 6),
+            'last': round(quote['last'] / rate, 6),
+            'success': True
+        }
+        if venue.quote_currency == "JPY":
+            result['original'] = {'bid_jpy': quote['bid'], 'ask_jpy': quote['ask'], 'last_jpy': quote['last']}
+        if 'received_at' in quote:
+            result['received_at'] = quote['received_at']
+        return result
+
+    def parse_coincheck_ticker(self, data, usdjpy_rate):
+        """Coincheckのティッカーをパース（JPYからUSDに換算）"""
+        return self.to_usd_quote(self.coincheck, self.coincheck.parse_ticker(data), usdjpy_rate)
+
+    async def get_all_prices_async(self, selected_currencies=None):
+        """選択された通貨の価格を両取引所から同時に取得（為替レートも並列取得）"""
+        if selected_currencies is None:
+            selected_currencies = self.currencies[:5]  # デフォルトは主要5通貨
+
+        currencies = []
+        for currency in selected_currencies:
+            if currency not in self.currency_pairs:
+                print(f"警告: {currency} は対応していません")
+                continue
+            currencies.append(currency)
+
+        scan = await self.fetch_all(currencies)
+        usdjpy_rate = scan['usdjpy_rate']
+        results = {
+            'usdjpy_rate': usdjpy_rate,
+            'currencies': {},
+            'timestamp': scan['timestamp'],
+            'capture_window': 0.0
+        }
+
+        if usdjpy_rate is None:
+            print("為替レート取得エラー: 有効なレートがありません")
+            return results
+
+        cc_quotes = scan['quotes'].get(self.coincheck.name, {})
+        other_quotes = scan['quotes'].get(self.other.name, {})
+        received_times = []
+        for currency in currencies:
+            if currency in cc_quotes and currency in other_quotes:
+                cc_data = self.to_usd_quote(self.coincheck, cc_quotes[currency], usdjpy_rate)
+                other_data = self.to_usd_quote(self.other, other_quotes[currency], usdjpy_rate)
+                results['currencies'][currency] = {self.coincheck.name: cc_data, self.other.name: other_data}
+                received_times.extend(q['received_at'] for q in (cc_data, other_data) if 'received_at' in q)
+            elif currency in cc_quotes:
+                print(f"⚠️  {currency}: {self.other.label}でデータ取得失敗")
+            elif currency in other_quotes:
+                print(f"⚠️  {currency}: Coincheckでデータ取得失敗")
+            else:
+                print(f"❌ {currency}: 両取引所でデータ取得失敗")
+
+        # 全価格の取得時刻の幅（スナップショットの鮮度）
+        results['capture_window'] = max(received_times) - min(received_times) if received_times else 0.0
+        return results
+
+    def get_all_prices(self, selected_currencies=None):
+        """選択された通貨の価格を両取引所から取得（同期版）"""
+        return asyncio.run(self.get_all_prices_async(selected_currencies))
+
+    def calculate_arbitrage_opportunity(self, cc_data, other_data):
+        """アービトラージ機会を計算"""
+        # Coincheckで買って相手の取引所で売る
+        diff1 = other_data['bid'] - cc_data['ask']
+        # 相手の取引所で買ってCoincheckで売る
+        diff2 = cc_data['bid'] - other_data['ask']
+        return {
+            self.forward: {'diff': diff1, 'pct': diff1 / cc_data['ask'] * 100},
+            self.backward: {'diff': diff2, 'pct': diff2 / other_data['ask'] * 100}
+        }
+
+    def display_results(self, results, show_details=True, min_profit=0.3):
+        """結果を表示"""
+        label = self.other.label
+        print("=" * 80)
+        print(f"{label} vs Coincheck アービトラージ機会検索 - {results['timestamp']}")
+        if results['usdjpy_rate'] is None:
+            print("❌ 為替レートが取得できないためJPY建て価格を換算できません")
+            return
+        print(f"USD/JPY為替レート: {results['usdjpy_rate']:.2f}")
+        if 'capture_window' in results:
+            print(f"価格取得時刻の幅: {results['capture_window'] * 1000:.0f}ms")
+        print("=" * 80)
+
+        if not results['currencies']:
+            print("❌ データが取得できませんでした")
+            return
+
+        opportunities = []
+        for currency, data in results['currencies'].items():
+            cc_data = data[self.coincheck.name]
+            other_data = data[self.other.name]
+            arb = self.calculate_arbitrage_opportunity(cc_data, other_data)
+
+            # 最大利益機会を特定
+            if abs(arb[self.forward]['pct']) > abs(arb[self.backward]['pct']):
+                max_opportunity = arb[self.forward]
+                direction = f"Coincheck→{label}"
+            else:
+                max_opportunity = arb[self.backward]
+                direction = f"{label}→Coincheck"
+
+            opportunities.append({
+                'currency': currency,
+                'profit_pct': abs(max_opportunity['pct']),
+                'direction': direction
+            })
+
+            if show_details:
+                print(f"\n【{currency}】")
+                print(f"  {'Coincheck:':<11}Bid ${cc_data['bid']:>9.6f} | Ask ${cc_data['ask']:>9.6f}")
+                print(f"  {label + ':':<11}Bid ${other_data['bid']:>9.6f} | Ask ${other_data['ask']:>9.6f}")
+                print(f"  CC→{label}: {arb[self.forward]['pct']:+7.3f}% (${arb[self.forward]['diff']:+9.6f})")
+                print(f"  {label}→CC: {arb[self.backward]['pct']:+7.3f}% (${arb[self.backward]['diff']:+9.6f})")
+
+                if abs(max_opportunity['pct']) > 0.5:  # 0.5%以上の機会
+                    print(f"  🚀 機会: {direction} - {abs(max_opportunity['pct']):.3f}%")
+
+        # 上位の機会をランキング表示
+        opportunities.sort(key=lambda x: x['profit_pct'], reverse=True)
+
+        print("\n" + "=" * 60)
+        print("🎯 アービトラージ機会ランキング TOP5")
+        print("=" * 60)
+
+        profitable = [opp for opp in opportunities if opp['profit_pct'] > min_profit]
+        if not profitable:
+            print(f"現在、{min_profit}%以上の利益機会はありません")
+            print(f"最良の機会: {opportunities[0]['currency']} - {opportunities[0]['profit_pct']:.3f}%")
+            return
+
+        for i, opp in enumerate(profitable[:5], 1):
+            net_profit = opp['profit_pct'] - self.round_trip_fee
+            print(f"{i}. {opp['currency']} - {opp['direction']}")
+            print(f"   💰 理論利益率: {opp['profit_pct']:.3f}%")
+            if net_profit > 0:
+                print(f"   📈 手数料控除後: {net_profit:.3f}%")
+            else:
+                print(f"   📉 手数料控除後: {net_profit:.3f}% (赤字)")
+            print()
+
+    def get_detailed_analysis(self, currency):
+        """特定通貨の詳細分析"""
+        if currency not in self.currency_pairs:
+            print(f"❌ {currency} は対応していません")
+            return
+
+        label = self.other.label
+        print(f"\n📊 {currency} 詳細分析")
+        print("=" * 50)
+
+        results = self.get_all_prices([currency])
+        if currency not in results['currencies']:
+            return
+
+        data = results['currencies'][currency]
+        cc_data = data[self.coincheck.name]
+        other_data = data[self.other.name]
+
+        print(f"Coincheck ({currency}/JPY):")
+        print(f"  Bid: ¥{cc_data['original']['bid_jpy']:,.2f}")
+        print(f"  Ask: ¥{cc_data['original']['ask_jpy']:,.2f}")
+        print(f"  スプレッド: ¥{cc_data['original']['ask_jpy'] - cc_data['original']['bid_jpy']:,.2f}")
+
+        print(f"\n{label} ({self.currency_pairs[currency][self.other.name]}):")
+        print(f"  Bid: ${other_data['bid']:,.6f}")
+        print(f"  Ask: ${other_data['ask']:,.6f}")
+        print(f"  スプレッド: ${other_data['ask'] - other_data['bid']:,.6f}")
+
+        arb = self.calculate_arbitrage_opportunity(cc_data, other_data)
+        print(f"\nアービトラージ機会:")
+        print(f"  Coincheck→{label}: {arb[self.forward]['pct']:+.3f}%")
+        print(f"  {label}→Coincheck: {arb[self.backward]['pct']:+.3f}%")
+
+    def monitor_specific_currencies(self, currencies, interval=10, min_profit=0.5):
+        """特定通貨の継続監視"""
+        print(f"🔍 監視対象通貨: {', '.join(currencies)}")
+        print(f"📊 最小利益率: {min_profit}%")
+        print(f"⏱️  更新間隔: {interval}秒")
+        print("Ctrl+C で停止")
+        print("\n")
+
+        # 為替レートは監視ループとは別スレッドで定期更新
+        self.fx.start()
+
+        try:
+            while True:
+                results = self.get_all_prices(currencies)
+                self.display_results(results, show_details=False, min_profit=min_profit)
+                print(f"\n次回更新: {interval}秒後...")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n\n🛑 監視を停止しました")
+
+
+# 使用例
+if __name__ == "__main__":
+    currencies = ['BTC', 'ETH', 'XRP', 'LTC', 'BCH', 'XLM', 'DOT', 'LINK', 'AVAX', 'DOGE', 'SHIB']
+    scanner = ArbitrageScanner(
+        [CoincheckAdapter(), OKXAdapter(), KrakenAdapter(), BybitAdapter(), BitgetAdapter()],
+        currencies,
+    )
+    results = asyncio.run(scanner.scan())
+    scanner.display_results(results)
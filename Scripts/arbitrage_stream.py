@@ -0,0 +1,234 @@
+"""
+Coincheck/OKX アービトラージ ストリーミング監視
+WebSocketの板・ティッカーをpybottersのDataStoreで保持し、更新のたびにアービトラージ機会を再計算
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import pybotters
+
+from get_ticker import MultiCurrencyArbitrage
+from market_log import record_from_env
+
+
+def changed_levels(data: Dict):
+    """Coincheck板の差分メッセージで変化した (サイド, 価格) を列挙（通常形式・sequence_number形式の両方）"""
+    if 'upper' in data or 'lower' in data:
+        for book_side in ('upper', 'lower'):
+            for row in data.get(book_side, []):
+                for side, amount_key in (('asks', 'ask_amount'), ('bids', 'bid_amount')):
+                    if row.get(amount_key) is not None:
+                        yield side, row['rate']
+    else:
+        for side in ('asks', 'bids'):
+            for rate, _ in data.get(side, []):
+                yield side, rate
+
+
+class BookTop:
+    """1ペアの板にある価格と最良気配（差分ごとに更新し、最良気配が消えたときだけそのペアの価格から再計算）"""
+
+    def __init__(self):
+        self.levels = {'bids': {}, 'asks': {}}  # 価格 → 価格の文字列
+        self.best = {'bids': None, 'asks': None}
+
+    def set(self, side: str, rate: str, present: bool) -> None:
+        price = float(rate)
+        levels = self.levels[side]
+        if present:
+            levels[price] = rate
+            best = self.best[side]
+            if best is None or (price > best if side == 'bids' else price < best):
+                self.best[side] = price
+        elif levels.pop(price, None) is not None and price == self.best[side]:
+            self.best[side] = (max(levels) if side == 'bids' else min(levels)) if levels else None
+
+    def quote(self) -> Optional[Dict[str, float]]:
+        """最良気配（片側でも空ならNone）"""
+        if self.best['bids'] is None or self.best['asks'] is None:
+            return None
+        return {'bid': self.best['bids'], 'ask': self.best['asks']}
+
+
+class ArbitrageStream:
+    def __init__(self, arbitrage: MultiCurrencyArbitrage, currencies: List[str], min_profit: float = 0.5,
+                 on_opportunity: Optional[Callable[[Dict], None]] = None,
+                 coincheck_ws_url: str = "wss://ws-api.coincheck.com/",
+                 coincheck_rest_url: str = "https://coincheck.com",
+                 okx_ws_url: str = "wss://ws.okx.com:8443/ws/v5/public"):
+        self.arbitrage = arbitrage
+        self.min_profit = min_profit  # 通知する最小利益率(%)
+        self.on_opportunity = on_opportunity or self.print_opportunity
+
+        self.coincheck_ws_url = coincheck_ws_url
+        self.coincheck_rest_url = coincheck_rest_url
+        self.okx_ws_url = okx_ws_url
+
+        self.coincheck_store = pybotters.CoincheckDataStore()
+        self.okx_store = pybotters.OKXDataStore()
+
+        # 取引所ペア名 → 通貨
+        self.currencies = [c for c in currencies if c in arbitrage.currency_pairs]
+        self.coincheck_pairs = {arbitrage.currency_pairs[c]['coincheck']: c for c in self.currencies}
+        self.okx_pairs = {arbitrage.currency_pairs[c]['okx']: c for c in self.currencies}
+
+        # ペアごとの板の最良気配（DataStoreの板全体をソートせずに済ませる）
+        self.coincheck_books = {pair: BookTop() for pair in self.coincheck_pairs}
+        # 通貨ごとの最良気配（USD建て）
+        self.quotes = {c: {'coincheck': None, 'okx': None} for c in self.currencies}
+        # 閾値を超えている（通知済みの）通貨と方向
+        self.active = set()
+        self.recorder = None  # 受信メッセージの記録先（market_log.MarketLogWriter）
+
+    def on_coincheck_message(self, msg, ws=None) -> None:
+        """Coincheck板メッセージを反映して該当通貨を再評価"""
+        self.coincheck_store.onmessage(msg, ws)
+        if isinstance(msg, list) and len(msg) > 1 and msg[0] in self.coincheck_books and isinstance(msg[1], dict):
+            pair = msg[0]
+            # 変化した価格だけDataStoreの反映結果（キー検索）を最良気配に反映
+            orderbook = self.coincheck_store.orderbook
+            book = self.coincheck_books[pair]
+            for side, rate in changed_levels(msg[1]):
+                book.set(side, rate, orderbook.get({'pair': pair, 'side': side, 'rate': rate}) is not None)
+            self.update_coincheck_quote(pair)
+
+    def rebuild_coincheck_book(self, pair: str) -> None:
+        """DataStoreの板からペアの最良気配を作り直す（板のスナップショット取得後）"""
+        book = self.coincheck_books[pair] = BookTop()
+        for item in self.coincheck_store.orderbook.find({'pair': pair}):
+            book.set(item['side'], item['rate'], True)
+
+    def on_okx_message(self, msg, ws=None) -> None:
+        """OKXティッカーメッセージを反映して該当通貨を再評価"""
+        self.okx_store.onmessage(msg, ws)
+        if not isinstance(msg, dict) or msg.get('arg', {}).get('channel') != 'tickers':
+            return
+        for ticker in msg.get('data', []):
+            inst_id = ticker.get('instId')
+            if inst_id not in self.okx_pairs:
+                continue
+            try:
+                quote = self.arbitrage.parse_okx_entry(ticker)
+            except (KeyError, ValueError):
+                continue
+            quote['received_at'] = time.time()
+            currency = self.okx_pairs[inst_id]
+            self.quotes[currency]['okx'] = quote
+            self.evaluate(currency)
+
+    def update_coincheck_quote(self, pair: str) -> None:
+        """ペアの最良気配をUSD換算して反映"""
+        if pair not in self.coincheck_books:
+            return
+        best = self.coincheck_books[pair].quote()
+        if best is None:
+            return
+        # 受信処理ではキャッシュを読むだけ（更新は refresh_fx がイベントループ外で行う）
+        usdjpy_rate = self.arbitrage.fx.cached()
+        if usdjpy_rate is None:
+            return
+
+        ticker = {'bid': best['bid'], 'ask': best['ask'], 'last': best['bid']}
+        quote = self.arbitrage.parse_coincheck_ticker(ticker, usdjpy_rate)
+        quote['received_at'] = time.time()
+        currency = self.coincheck_pairs[pair]
+        self.quotes[currency]['coincheck'] = quote
+        self.evaluate(currency)
+
+    def evaluate(self, currency: str) -> None:
+        """アービトラージ機会を計算し、閾値を超えた瞬間に通知"""
+        cc_data = self.quotes[currency]['coincheck']
+        okx_data = self.quotes[currency]['okx']
+        if cc_data is None or okx_data is None:
+            return
+
+        arb = self.arbitrage.calculate_arbitrage_opportunity(cc_data, okx_data)
+        for key, direction in (('cc_to_okx', "Coincheck→OKX"), ('okx_to_cc', "OKX→Coincheck")):
+            pct = arb[key]['pct']
+            if pct >= self.min_profit:
+                if (currency, key) not in self.active:
+                    self.active.add((currency, key))
+                    self.on_opportunity({
+                        'currency': currency,
+                        'direction': direction,
+                        'profit_pct': pct,
+                        'diff': arb[key]['diff'],
+                        'data': {'coincheck': cc_data, 'okx': okx_data},
+                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+                    })
+            else:
+                # 閾値を下回ったら再通知できるようにする
+                self.active.discard((currency, key))
+
+    def print_opportunity(self, opportunity: Dict) -> None:
+        """機会を表示"""
+        print(f"[{opportunity['timestamp']}] 🚀 {opportunity['currency']} {opportunity['direction']}: "
+              f"{opportunity['profit_pct']:+.3f}% (${opportunity['diff']:+.6f})")
+
+    async def refresh_fx(self, interval: float) -> None:
+        """為替レートを定期更新（同期通信はスレッドで実行してイベントループを止めない）"""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.arbitrage.fx.refresh)
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        """WebSocketを購読して監視（durationを指定するとその秒数で終了）"""
+        print(f"ストリーミング監視対象通貨: {', '.join(self.currencies)}")
+        # 購読前に為替レートを用意し、以降はタイマーで更新
+        fx = self.arbitrage.fx
+        if fx.cached() is None or fx.age() > fx.ttl:
+            await asyncio.to_thread(fx.refresh)
+        fx_task = asyncio.create_task(self.refresh_fx(fx.ttl))
+        try:
+            await self.stream(duration)
+        finally:
+            fx_task.cancel()
+
+    async def stream(self, duration: Optional[float] = None) -> None:
+        """Coincheckの板・OKXのティッカーを購読して反映"""
+        # 記録時は受信した文字列をJSON解析前にそのまま記録
+        def recorder(url):
+            return self.recorder.ws_handler(url) if self.recorder else None
+
+        async with pybotters.Client() as client:
+            coincheck_ws = client.ws_connect(
+                self.coincheck_ws_url,
+                send_json=[{"type": "subscribe", "channel": f"{pair}-orderbook"} for pair in self.coincheck_pairs],
+                hdlr_str=recorder(self.coincheck_ws_url),
+                hdlr_json=self.on_coincheck_message,
+            )
+            okx_ws = client.ws_connect(
+                self.okx_ws_url,
+                send_json={"op": "subscribe", "args": [{"channel": "tickers", "instId": pair} for pair in self.okx_pairs]},
+                hdlr_str=recorder(self.okx_ws_url),
+                hdlr_json=self.on_okx_message,
+            )
+            await asyncio.gather(coincheck_ws, okx_ws)
+
+            # 購読後に板のスナップショットを取得（差分はDataStoreが適用）
+            await self.coincheck_store.initialize(
+                *(client.get(f"{self.coincheck_rest_url}/api/order_books", params={'pair': pair})
+                  for pair in self.coincheck_pairs)
+            )
+            for pair in self.coincheck_pairs:
+                self.rebuild_coincheck_book(pair)
+                self.update_coincheck_quote(pair)
+
+            if duration is None:
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(duration)
+
+
+# 使用例
+if __name__ == "__main__":
+    stream = ArbitrageStream(MultiCurrencyArbitrage(), ['BTC', 'ETH', 'XRP'], min_profit=0.5)
+    # MARKET_LOG=パス で受信した応答・WebSocketメッセージを記録
+    stream.recorder = record_from_env()
+    try:
+        asyncio.run(stream.run())
+    except KeyboardInterrupt:
+        print("\n\n監視を停止しました")
@@ -0,0 +1,59 @@
+"""
+インジケーター計算ベンチマーク
+銘柄ごとのpandasループとパネル一括計算（indicator_panel）の処理時間を比較
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis import rsi_analysis, atr_analysis, indicator_panel
+
+
+def make_panel(n_symbols: int, n_bars: int = 500, seed: int = 0):
+    """ランダムウォークの高値・安値・終値パネルを生成（銘柄×足、始値は高値・安値の生成にだけ使う）"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=(n_symbols, n_bars)), axis=1)
+    open_ = close + rng.normal(scale=0.2, size=close.shape)
+    high = np.maximum(open_, close) + rng.random(close.shape)
+    low = np.minimum(open_, close) - rng.random(close.shape)
+    return high, low, close
+
+def per_symbol_loop(high, low, close):
+    """現行方式: 銘柄ごとにDataFrameを作って計算"""
+    results = []
+    for i in range(close.shape[0]):
+        df = pd.DataFrame({'high': high[i], 'low': low[i], 'close': close[i]})
+        df['RSI'] = rsi_analysis(data=df)
+        df['ATR'] = atr_analysis(data=df)
+        results.append(df)
+    return results
+
+def best_of(func, *args, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(sizes=(10, 100, 500), n_bars: int = 500):
+    print(f"{'銘柄数':>6} | {'ループ(ms)':>10} | {'パネル(ms)':>10} | {'倍率':>6}")
+    for n_symbols in sizes:
+        panel = make_panel(n_symbols, n_bars)
+
+        # 結果が一致することを確認
+        loop_result = per_symbol_loop(*panel)
+        panel_result = indicator_panel(*panel)
+        for i, df in enumerate(loop_result):
+            assert np.allclose(df['RSI'].to_numpy(), panel_result['RSI'][i], equal_nan=True)
+            assert np.allclose(df['ATR'].to_numpy(), panel_result['ATR'][i], equal_nan=True)
+
+        loop_time = best_of(per_symbol_loop, *panel, repeat=3)
+        panel_time = best_of(indicator_panel, *panel)
+        print(f"{n_symbols:>6} | {loop_time * 1000:>10.2f} | {panel_time * 1000:>10.2f} | {loop_time / panel_time:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
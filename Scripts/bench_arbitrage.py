@@ -0,0 +1,81 @@
+"""
+アービトラージ計算ベンチマーク
+現行のdictベース計算（calculate_arbitrage_opportunity + ソート）とQuoteTableの一括計算を比較
+"""
+
+import time
+
+import numpy as np
+
+from arbitrage_scanner import QuoteTable
+from get_ticker import MultiCurrencyArbitrage
+
+
+def make_results(n_currencies: int, venues, seed: int = 0):
+    """get_all_prices形式のランダムな気配を生成"""
+    rng = np.random.default_rng(seed)
+    results = {'currencies': {}}
+    for i in range(n_currencies):
+        mid = rng.uniform(0.01, 1000)
+        data = {}
+        for venue in venues:
+            venue_mid = mid * (1 + rng.normal(scale=0.005))
+            half_spread = venue_mid * rng.uniform(0.0001, 0.002)
+            data[venue] = {'bid': venue_mid - half_spread, 'ask': venue_mid + half_spread}
+        results['currencies'][f"C{i}"] = data
+    return results
+
+def dict_path(arbitrage: MultiCurrencyArbitrage, results, fee: float = 0.3, k: int = 5):
+    """現行方式: 通貨・取引所の組み合わせごとにdictを作ってソート"""
+    opportunities = []
+    for currency, data in results['currencies'].items():
+        venues = list(data)
+        for i, buy in enumerate(venues):
+            for sell in venues[i + 1:]:
+                arb = arbitrage.calculate_arbitrage_opportunity(data[buy], data[sell])
+                for key, direction in (('cc_to_okx', f"{buy}→{sell}"), ('okx_to_cc', f"{sell}→{buy}")):
+                    opportunities.append({
+                        'currency': currency,
+                        'direction': direction,
+                        'profit_pct': arb[key]['pct'],
+                        'net_pct': arb[key]['pct'] - fee,
+                    })
+    opportunities.sort(key=lambda x: x['net_pct'], reverse=True)
+    return opportunities[:k]
+
+def table_path(table: QuoteTable, k: int = 5):
+    """QuoteTable方式: 全方向を一括計算してargpartitionで上位k件"""
+    return table.top(k)
+
+def best_of(func, *args, repeat: int = 20) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(sizes=(26, 100, 500), venue_counts=(2, 5)):
+    arbitrage = MultiCurrencyArbitrage()
+    print(f"{'通貨数':>6} | {'取引所':>4} | {'dict(ms)':>9} | {'表作成(ms)':>10} | {'一括(ms)':>9} | {'倍率':>6}")
+    for n_venues in venue_counts:
+        venues = [f"V{i}" for i in range(n_venues)]
+        fees = {v: 0.15 for v in venues}
+        for n_currencies in sizes:
+            results = make_results(n_currencies, venues)
+            table = QuoteTable.from_results(results, fees)
+
+            # 上位の純利益率が一致することを確認
+            expected = [o['net_pct'] for o in dict_path(arbitrage, results)]
+            actual = [o['net_pct'] for o in table_path(table)]
+            assert np.allclose(expected, actual)
+
+            dict_time = best_of(dict_path, arbitrage, results)
+            build_time = best_of(QuoteTable.from_results, results, fees)
+            table_time = best_of(table_path, table)
+            print(f"{n_currencies:>6} | {n_venues:>4} | {dict_time * 1000:>9.3f} | {build_time * 1000:>10.3f} | "
+                  f"{table_time * 1000:>9.3f} | {dict_time / table_time:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Cardano取引分析ベンチマーク
+従来の3関数（is_dex_transaction / is_complex_transaction / analyze_token_profits）と
+1回走査の analyze_transaction、列指向バッチの analyze_batch の処理時間・メモリを比較
+
+使い方: python bench_cardano.py [--cache cardano_tx_cache.sqlite3] [--count 5000]
+--cache を指定すると、キャッシュに記録済みの実際の取引で計測する（なければ合成データ）
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from blockfrost.utils import convert_json_to_object
+
+from cardano_scrape import DEX_SCRIPT_ADDRESSES, SimplifiedArbitrageAnalyzer
+from tx_cache import TxCache
+
+
+def make_raw(count: int = 5000, seed: int = 0):
+    """Blockfrostの応答(JSON)と同じ形の合成取引 (transaction, utxos, metadata) を生成"""
+    rng = random.Random(seed)
+    dex_addresses = [a for addresses in DEX_SCRIPT_ADDRESSES.values() for a in addresses]
+    wallets = [f"addr1q{rng.getrandbits(256):064x}" for _ in range(500)]
+    tokens = ['lovelace'] + [f"{rng.getrandbits(224):056x}{rng.getrandbits(32):08x}" for _ in range(200)]
+
+    def utxo():
+        address = rng.choice(dex_addresses) if rng.random() < 0.1 else rng.choice(wallets)
+        units = ['lovelace'] + rng.sample(tokens[1:], rng.randint(0, 4))
+        return {'address': address, 'amount': [{'unit': u, 'quantity': str(rng.randint(1, 10 ** 12))} for u in units]}
+
+    batch = []
+    for i in range(count):
+        metadata = []
+        if rng.random() < 0.3:
+            metadata.append({'label': '674', 'json_metadata': {
+                'msg': [rng.choice(['Minswap: Swap Order', 'Order Executed', 'SundaeSwap Scoop', 'payment'])],
+                'extra': {'id': i, 'tags': ['a', 'b']}
+            }})
+        tx = {'hash': f"{i:064x}", 'block_time': 1700000000 + i, 'block_height': 10000000 + i // 100, 'fees': '180000'}
+        utxos = {'inputs': [utxo() for _ in range(rng.randint(1, 6))],
+                 'outputs': [utxo() for _ in range(rng.randint(1, 8))]}
+        batch.append((tx, utxos, metadata))
+    return batch
+
+def to_details(tx, utxos, metadata):
+    """応答(JSON)をフェッチャーと同じ取引詳細に変換"""
+    tx, utxos, metadata = (convert_json_to_object(body) for body in (tx, utxos, metadata))
+    return {'transaction': tx, 'inputs': utxos.inputs, 'outputs': utxos.outputs, 'metadata': metadata,
+            'block_time': tx.block_time, 'block_height': tx.block_height}
+
+def load_raw(path: str, count: int):
+    """TxCacheに記録済みの取引 (transaction, utxos, metadata) を読み込み"""
+    cache = TxCache(path)
+    rows = cache.conn.execute(
+        "SELECT tx_hash FROM responses WHERE kind = 'transaction' LIMIT ?", (count,)
+    ).fetchall()
+    tx_hashes = [row[0] for row in rows]
+    bodies = {kind: cache.get_many(tx_hashes, kind) for kind in TxCache.KINDS}
+    return [(bodies['transaction'][h], bodies['utxos'][h], bodies['metadata'].get(h, []))
+            for h in tx_hashes if h in bodies['utxos']]
+
+def legacy_is_dex(analyzer, tx_details):
+    """従来の is_dex_transaction（Namespaceも直列化できるよう default=vars を指定）"""
+    for metadata in tx_details['metadata']:
+        if hasattr(metadata, 'json_metadata') and metadata.json_metadata:
+            metadata_str = json.dumps(metadata.json_metadata, default=vars).lower()
+            for pattern in analyzer.dex_patterns:
+                if pattern in metadata_str:
+                    return True
+    return False
+
+def legacy_analyze(analyzer, tx_details):
+    """従来方式: 3関数がそれぞれUTxOとメタデータを走査（is_complex_transaction 内でもDEX判定を再実行）"""
+    is_dex = analyzer.is_dex_transaction(tx_details)
+    is_complex, complexity_analysis = analyzer.is_complex_transaction(tx_details)
+    profit_analysis = analyzer.analyze_token_profits(tx_details)
+    return is_dex, is_complex, complexity_analysis, profit_analysis
+
+def fused_analyze(analyzer, tx_details):
+    """1回走査: DEX判定・複雑度・トークンフローを同時に計算し、利益はフローから求める"""
+    analysis = analyzer.analyze_transaction(tx_details)
+    return analysis, analyzer.token_profits(analysis['token_flows'])
+
+def measure_memory(build):
+    """build() で作ったデータが保持するメモリ（バイト）"""
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+def best_of(func, repeat: int = 7) -> float:
+    # GCの影響を除いて最速値を採用
+    gc.disable()
+    try:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+    finally:
+        gc.enable()
+
+def main(cache_path=None, count: int = 5000):
+    raw = load_raw(cache_path, count) if cache_path else make_raw(count)
+    batch = [to_details(*r) for r in raw]
+    analyzer = SimplifiedArbitrageAnalyzer(None)
+    # is_complex_transaction 内の DEX 判定も従来方式に揃える
+    analyzer.is_dex_transaction = lambda tx_details: legacy_is_dex(analyzer, tx_details)
+
+    # 結果が一致することを確認（DEX判定はメタデータ由来の部分のみ比較）
+    script_dex = 0
+    for tx_details in batch:
+        is_dex, is_complex, complexity_analysis, profit_analysis = legacy_analyze(analyzer, tx_details)
+        fused, fused_profits = fused_analyze(analyzer, tx_details)
+        assert fused['is_complex'] == is_complex
+        assert fused_profits == profit_analysis
+        for key in ('complexity_score', 'total_utxos', 'unique_addresses', 'unique_tokens', 'has_metadata'):
+            assert fused['complexity_analysis'][key] == complexity_analysis[key]
+        assert fused['is_dex'] >= is_dex
+        script_dex += fused['is_dex'] and not is_dex
+
+    # 列指向バッチも同じ結果になることを確認
+    columnar = analyzer.new_batch()
+    for r in raw:
+        columnar.append_raw(*r)
+    result = analyzer.analyze_batch(columnar)
+    for i, tx_details in enumerate(batch):
+        fused, fused_profits = fused_analyze(analyzer, tx_details)
+        assert result['is_dex'][i] == fused['is_dex']
+        assert result['complexity_score'][i] == fused['complexity_analysis']['complexity_score']
+        assert columnar.profits(result['token_flows'], i) == fused_profits
+
+    legacy_time = best_of(lambda: [legacy_analyze(analyzer, tx) for tx in batch])
+    fused_time = best_of(lambda: [fused_analyze(analyzer, tx) for tx in batch])
+    columnar_time = best_of(lambda: analyzer.analyze_batch(columnar))
+    print(f"取引数: {len(batch)}（{'記録済み' if cache_path else '合成'}）")
+    print(f"従来(3関数): {legacy_time * 1000:.1f} ms")
+    print(f"1回走査:     {fused_time * 1000:.1f} ms（{legacy_time / fused_time:.1f}x）")
+    print(f"列指向バッチ: {columnar_time * 1000:.1f} ms（{legacy_time / columnar_time:.1f}x）")
+    print(f"スクリプトアドレスで追加検出したDEX取引: {script_dex}件")
+
+    def build_columnar():
+        columnar = analyzer.new_batch()
+        for r in raw:
+            columnar.append_raw(*r)
+        return columnar
+
+    object_memory = measure_memory(lambda: [to_details(*r) for r in raw])
+    columnar_memory = measure_memory(build_columnar)
+    print(f"メモリ: 取引詳細(Namespace) {object_memory / 1e6:.1f} MB / 列指向 {columnar_memory / 1e6:.1f} MB"
+          f"（{object_memory / columnar_memory:.1f}分の1）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cardano取引分析ベンチマーク")
+    parser.add_argument("--cache", help="記録済み取引のキャッシュ（TxCacheのSQLite）")
+    parser.add_argument("--count", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.cache, args.count)
@@ -0,0 +1,150 @@
+"""
+ベンチマーク用の合成フィクスチャ
+記録済みの応答がない場合に、各取引所・Blockfrostの応答と同じ形・実運用に近い件数の応答を生成する
+（Bitget 1000銘柄、アービトラージ26ペア、300取引のCardanoブロック）
+
+使い方: python bench_fixtures.py bench_fixtures [--symbols 1000] [--block-txs 300]
+"""
+
+import argparse
+import random
+import time
+from typing import Dict
+
+from bench_cardano import make_raw
+from get_ticker import MultiCurrencyArbitrage
+from get_ticker02 import KrakenCoincheckArbitrage
+from mock_exchange import fixture_key, save_fixtures
+
+USDJPY = 150.0
+
+
+def make_prices(currencies, rng) -> Dict[str, float]:
+    """通貨ごとのUSD価格（対数一様）"""
+    return {c: 10 ** rng.uniform(-5, 4.8) for c in currencies}
+
+def quote(price: float, rng, skew: float = 0.005):
+    """取引所ごとに少しずらした (bid, ask, last)"""
+    mid = price * (1 + rng.gauss(0, skew))
+    half_spread = mid * rng.uniform(0.0001, 0.002)
+    return mid - half_spread, mid + half_spread, mid
+
+def bitget_fixtures(n_symbols: int, rng, pump_ratio: float = 0.01) -> Dict[str, object]:
+    symbols = [f"S{i:04d}USDT" for i in range(n_symbols)]
+    # USDT建て以外・停止中の銘柄も混ぜる（フィルタ処理も計測に含める）
+    listing = [{"symbol": s, "status": "online", "baseCoin": s[:-4], "quoteCoin": "USDT"} for s in symbols]
+    listing += [{"symbol": f"S{i:04d}BTC", "status": "online", "baseCoin": f"S{i:04d}", "quoteCoin": "BTC"}
+                for i in range(n_symbols // 5)]
+    listing += [{"symbol": f"H{i:04d}USDT", "status": "halt", "baseCoin": f"H{i:04d}", "quoteCoin": "USDT"}
+                for i in range(n_symbols // 20)]
+    fixtures = {fixture_key("/api/v2/spot/public/symbols"): {"code": "00000", "msg": "success", "data": listing}}
+
+    now = int(time.time() // 900 * 900 * 1000)
+    tickers = []
+    for symbol in symbols:
+        previous_close = 10 ** rng.uniform(-5, 3)
+        previous_volume = 10 ** rng.uniform(3, 7)
+        pump = rng.random() < pump_ratio
+        close = previous_close * (rng.uniform(1.5, 3.0) if pump else 1 + rng.gauss(0, 0.01))
+        volume = previous_volume * (rng.uniform(3, 10) if pump else rng.uniform(0.5, 1.5))
+        candles = []
+        for ts, c, v in ((now, close, volume), (now - 900_000, previous_close, previous_volume)):
+            candles.append([str(ts), f"{c:.8g}", f"{c * 1.01:.8g}", f"{c * 0.99:.8g}", f"{c:.8g}",
+                            f"{v / c:.8g}", f"{v:.8g}", f"{v:.8g}"])
+        key = fixture_key("/api/v2/spot/market/candles", {"granularity": "15m", "limit": 2, "symbol": symbol})
+        fixtures[key] = {"code": "00000", "msg": "success", "data": candles}
+        bid, ask, last = quote(close, rng)
+        tickers.append({"symbol": symbol, "lastPr": f"{last:.8g}", "open": f"{previous_close:.8g}",
+                        "bidPr": f"{bid:.8g}", "askPr": f"{ask:.8g}", "quoteVolume": f"{volume:.8g}",
+                        "ts": str(now)})
+    fixtures[fixture_key("/api/v2/spot/market/tickers")] = {"code": "00000", "msg": "success", "data": tickers}
+    return fixtures
+
+def arbitrage_fixtures(prices: Dict[str, float], rng, n_other: int = 700):
+    """OKX・Bybit・Bitget（一括ティッカー）、Kraken、Coincheck（ペアごと）の応答"""
+    okx, bybit, bitget = [], [], []
+    others = {f"X{i:03d}": 10 ** rng.uniform(-4, 3) for i in range(n_other)}
+    for currency, price in {**prices, **others}.items():
+        bid, ask, last = quote(price, rng)
+        okx.append({"instType": "SPOT", "instId": f"{currency}-USDT", "last": f"{last:.8g}",
+                    "bidPx": f"{bid:.8g}", "askPx": f"{ask:.8g}", "bidSz": "1", "askSz": "1"})
+        bid, ask, last = quote(price, rng)
+        bybit.append({"symbol": f"{currency}USDT", "lastPrice": f"{last:.8g}",
+                      "bid1Price": f"{bid:.8g}", "ask1Price": f"{ask:.8g}"})
+        bid, ask, last = quote(price, rng)
+        bitget.append({"symbol": f"{currency}USDT", "lastPr": f"{last:.8g}", "open": f"{last:.8g}",
+                       "bidPr": f"{bid:.8g}", "askPr": f"{ask:.8g}", "quoteVolume": "1000000"})
+
+    # Krakenはレスポンスキー（XXBTZUSD等）とaltname（XBTUSD等）が異なり、BTC・DOGEはaltnameもXBT・XDG
+    kraken_pairs, kraken_tickers = {}, {}
+    for currency, price in prices.items():
+        altname = {"BTC": "XBTUSD", "DOGE": "XDGUSD"}.get(currency, f"{currency}USD")
+        key = f"X{altname[:-3]}ZUSD" if len(altname) == 6 and currency != "DOGE" else altname
+        kraken_pairs[key] = {"altname": altname, "wsname": f"{currency}/USD"}
+        bid, ask, last = quote(price, rng)
+        kraken_tickers[key] = {"a": [f"{ask:.8g}", "1", "1.0"], "b": [f"{bid:.8g}", "1", "1.0"],
+                               "c": [f"{last:.8g}", "0.1"]}
+
+    coincheck = {}
+    for currency, price in prices.items():
+        bid, ask, last = quote(price * USDJPY, rng)
+        coincheck[fixture_key("/api/ticker", {"pair": f"{currency.lower()}_jpy"})] = {
+            "last": round(last, 8), "bid": round(bid, 8), "ask": round(ask, 8), "high": round(last * 1.02, 8),
+            "low": round(last * 0.98, 8), "volume": "1000.0", "timestamp": int(time.time())}
+
+    return {
+        "okx": {fixture_key("/api/v5/market/tickers", {"instType": "SPOT"}): {"code": "0", "msg": "", "data": okx}},
+        "bybit": {fixture_key("/v5/market/tickers", {"category": "spot"}): {
+            "retCode": 0, "retMsg": "OK", "result": {"category": "spot", "list": bybit}}},
+        "bitget": {fixture_key("/api/v2/spot/market/tickers"): {"code": "00000", "msg": "success", "data": bitget}},
+        "kraken": {"/0/public/AssetPairs": {"error": [], "result": kraken_pairs},
+                   "/0/public/Ticker": {"error": [], "result": kraken_tickers}},
+        "coincheck": coincheck,
+    }
+
+def blockfrost_fixtures(n_txs: int, seed: int = 0, page_size: int = 100) -> Dict[str, object]:
+    """最新ブロック1つ（n_txs取引）の応答（メタデータなしの取引は404になるよう登録しない）"""
+    block_hash = f"{seed + 1:064x}"
+    raw = make_raw(n_txs, seed)
+    block = {"time": raw[0][0]["block_time"], "height": raw[0][0]["block_height"], "hash": block_hash,
+             "slot": 100000000, "epoch": 500, "tx_count": n_txs, "size": 80000, "previous_block": f"{seed:064x}"}
+    fixtures = {"/api/v0/blocks/latest": block}
+    hashes = [tx["hash"] for tx, _, _ in raw]
+    for page in range(len(hashes) // page_size + 1):
+        key = fixture_key(f"/api/v0/blocks/{block_hash}/txs", {"count": page_size, "page": page + 1})
+        fixtures[key] = hashes[page * page_size:(page + 1) * page_size]
+    for tx, utxos, metadata in raw:
+        fixtures[f"/api/v0/txs/{tx['hash']}"] = dict(tx, block=block_hash, block_height=block["height"],
+                                                      block_time=block["time"])
+        fixtures[f"/api/v0/txs/{tx['hash']}/utxos"] = dict(utxos, hash=tx["hash"])
+        if metadata:
+            fixtures[f"/api/v0/txs/{tx['hash']}/metadata"] = metadata
+    return fixtures
+
+def generate(directory: str, n_symbols: int = 1000, n_block_txs: int = 300, seed: int = 0) -> None:
+    """合成フィクスチャを生成してdirectoryに保存"""
+    rng = random.Random(seed)
+    currencies = set(MultiCurrencyArbitrage().currency_pairs) | set(KrakenCoincheckArbitrage().currency_pairs)
+    arbitrage = arbitrage_fixtures(make_prices(sorted(currencies), rng), rng)
+    # Bitgetの一括ティッカーは急騰検出の銘柄とアービトラージの通貨を合わせる
+    bitget = bitget_fixtures(n_symbols, rng)
+    tickers_key = fixture_key("/api/v2/spot/market/tickers")
+    bitget[tickers_key]["data"] += arbitrage.pop("bitget")[tickers_key]["data"]
+    fixtures = {
+        "bitget": bitget,
+        "blockfrost": blockfrost_fixtures(n_block_txs, seed),
+        "fx": {"/v4/latest/USD": {"base": "USD", "rates": {"USD": 1, "JPY": USDJPY}}},
+        **arbitrage,
+    }
+    save_fixtures(directory, fixtures)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成フィクスチャを生成")
+    parser.add_argument("directory")
+    parser.add_argument("--symbols", type=int, default=1000, help="Bitgetの銘柄数")
+    parser.add_argument("--block-txs", type=int, default=300, help="Cardanoブロックの取引数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.directory, args.symbols, args.block_txs, args.seed)
+    print(f"Generated fixtures in {args.directory}")
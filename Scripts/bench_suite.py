@@ -0,0 +1,327 @@
+"""
+ベンチマークスイート
+記録済みの取引所・Blockfrostの応答（なければ合成フィクスチャ）を疑似サーバー（mock_exchange.py）から返し、
+実際の取得〜解析〜分析の経路を実運用規模で計測する。処理時間（最速・中央値）、スループット、メモリのピークを
+bench_results.jsonl に追記し、前回（または --baseline で指定したラベル）の結果と比較する。
+
+使い方:
+    python bench_suite.py                          # 合成フィクスチャで全ベンチマーク
+    python bench_suite.py --fixtures bench_fixtures --label after-fix --only hige
+    python bench_suite.py --latency 0.02           # 取引所の応答遅延を模擬
+記録済みフィクスチャの作り方: mock_exchange.py --record を起動し、--mock-url でそのサーバーを指定して1回実行する
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pybotters
+
+from analysis import IncrementalIndicator, indicator_panel
+from arbitrage_scanner import ArbitrageScanner, BitgetAdapter, BybitAdapter, CoincheckAdapter, KrakenAdapter, OKXAdapter
+from bench_analysis import make_panel
+from bench_fixtures import generate
+from cardano_scrape import CardanoDataFetcher, SimplifiedArbitrageAnalyzer
+from fx_rate import FxRateCache
+from get_ticker import MultiCurrencyArbitrage
+from get_ticker02 import KrakenCoincheckArbitrage
+from hige_catch import BitgetPumpDetector
+from metrics import METRICS
+from mock_exchange import use_mock
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class BenchContext:
+    """ベンチマーク共通の環境（疑似サーバーのURL・イベントループ・作業ディレクトリ）"""
+
+    def __init__(self, mock_url: str, workdir: str):
+        self.mock_url = mock_url
+        self.workdir = workdir
+        # 非同期のベンチマークは同じループで実行（常駐時と同様に接続を使い回す）
+        self.loop = asyncio.new_event_loop()
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def client(self, apis) -> pybotters.Client:
+        """ループ上でクライアントを作成（セッションの作成に実行中のループが必要）"""
+        async def create():
+            return pybotters.Client(apis=apis)
+        return self.run(create())
+
+    def fx(self) -> FxRateCache:
+        """前回値をディスクから読まない為替レートキャッシュ"""
+        return FxRateCache(path=os.path.join(self.workdir, "fx_rate.json"))
+
+    def close(self) -> None:
+        self.loop.close()
+
+
+# ベンチマーク: (コンテキスト) → (計測する関数, 1回あたりの処理件数, 件数の単位, 後始末)
+
+def bench_hige_scan(ctx: BenchContext):
+    """Bitget急騰検出（run()と同じ経路）: 銘柄一覧 → 全銘柄の15分足 → 判定"""
+    detector = BitgetPumpDetector("", state_path=os.path.join(ctx.workdir, "bitget_state.json"))
+    client = ctx.client(detector.apis)
+    symbols = ctx.run(detector.get_all_usdt_symbols(client))
+
+    async def scan():
+        found = await detector.get_all_usdt_symbols(client)
+        return await detector.process_all_symbols_concurrent(client, found, max_concurrent=detector.max_concurrent)
+
+    return lambda: ctx.run(scan()), len(symbols), "symbols", lambda: ctx.run(client.close())
+
+def bench_hige_snapshot(ctx: BenchContext):
+    """Bitgetスナップショットモード: 全ティッカー1リクエスト ×2 → 候補抽出"""
+    detector = BitgetPumpDetector("", state_path=os.path.join(ctx.workdir, "bitget_state.json"))
+    client = ctx.client(detector.apis)
+
+    async def snapshot():
+        previous = await detector.get_ticker_snapshot(client)
+        current = await detector.get_ticker_snapshot(client)
+        return detector.prefilter_snapshots(previous, current)
+
+    count = len(ctx.run(detector.get_ticker_snapshot(client))["symbol"])
+    return lambda: ctx.run(snapshot()), count, "symbols", lambda: ctx.run(client.close())
+
+def bench_arbitrage_async(ctx: BenchContext):
+    """Coincheck×OKX 26ペア（get_all_prices_async）"""
+    arbitrage = MultiCurrencyArbitrage()
+    arbitrage.fx = ctx.fx()
+    currencies = list(arbitrage.currency_pairs)
+    return lambda: ctx.run(arbitrage.get_all_prices_async(currencies)), len(currencies), "pairs", None
+
+def bench_arbitrage_sync(ctx: BenchContext):
+    """Coincheck×OKX 26ペア（get_all_prices、同期呼び出し）"""
+    arbitrage = MultiCurrencyArbitrage()
+    arbitrage.fx = ctx.fx()
+    currencies = list(arbitrage.currency_pairs)
+    return lambda: arbitrage.get_all_prices(currencies), len(currencies), "pairs", None
+
+def bench_kraken_coincheck(ctx: BenchContext):
+    """Coincheck×Kraken 全ペア（get_ticker02.get_all_prices）"""
+    arbitrage = KrakenCoincheckArbitrage()
+    arbitrage.fx = ctx.fx()
+    currencies = list(arbitrage.currency_pairs)
+    return lambda: arbitrage.get_all_prices(currencies), len(currencies), "pairs", None
+
+def bench_scanner(ctx: BenchContext):
+    """5取引所×26通貨の一括スキャン（ArbitrageScanner.scan）"""
+    currencies = list(MultiCurrencyArbitrage().currency_pairs)
+    venues = [CoincheckAdapter(), OKXAdapter(), KrakenAdapter(), BybitAdapter(), BitgetAdapter()]
+    scanner = ArbitrageScanner(venues, currencies, fx=ctx.fx())
+    return lambda: ctx.run(scanner.scan()), len(currencies), "pairs", None
+
+def bench_cardano_block(ctx: BenchContext):
+    """Cardano最新ブロック: 取引ハッシュ → 取引詳細の並列取得 → 1回走査の分析（キャッシュなし）"""
+    fetcher = CardanoDataFetcher(os.getenv("BLOCKFROST_PROJECT_ID", "mock"), cache_path=None,
+                                 base_url=f"{ctx.mock_url}/blockfrost/api")
+    analyzer = SimplifiedArbitrageAnalyzer(fetcher)
+    block = fetcher.call(fetcher.api.block_latest)
+
+    def run():
+        tx_hashes = fetcher.get_block_tx_hashes(block.hash)
+        details = fetcher.get_transactions_details(tx_hashes)
+        return [analyzer.analyze_transaction(tx_details) for tx_details in details if tx_details]
+
+    return run, block.tx_count, "txs", None
+
+def bench_indicator_panel(ctx: BenchContext):
+    """RSI/ATRのパネル一括計算（500銘柄×500本）"""
+    panel = make_panel(500, 500)
+    return lambda: indicator_panel(*panel), 500 * 500, "bars", None
+
+def bench_indicator_incremental(ctx: BenchContext):
+    """RSI/ATRの逐次更新（100銘柄×500本）"""
+    high, low, close = (a.tolist() for a in make_panel(100, 500))
+
+    def run():
+        for h, l, c in zip(high, low, close):
+            indicator = IncrementalIndicator()
+            for bar in zip(h, l, c):
+                indicator.update(*bar)
+
+    return run, 100 * 500, "bars", None
+
+BENCHMARKS: List[Tuple[str, Callable]] = [
+    ("hige_scan", bench_hige_scan),
+    ("hige_snapshot", bench_hige_snapshot),
+    ("arbitrage_async", bench_arbitrage_async),
+    ("arbitrage_sync", bench_arbitrage_sync),
+    ("kraken_coincheck", bench_kraken_coincheck),
+    ("scanner_5venues", bench_scanner),
+    ("cardano_block", bench_cardano_block),
+    ("indicator_panel", bench_indicator_panel),
+    ("indicator_incremental", bench_indicator_incremental),
+]
+
+
+def measure(func: Callable, repeat: int) -> Dict:
+    """1回目（ウォームアップ）を除いて repeat 回計測し、別に1回メモリのピークを計測"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"best_s": min(times), "median_s": statistics.median(times), "peak_mb": peak / 1e6}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_mock(fixtures_dir: str, latency: float) -> Tuple[subprocess.Popen, str]:
+    """疑似サーバーを別プロセスで起動（計測対象のプロセスと競合しないように）"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "mock_exchange.py"), "--fixtures", fixtures_dir,
+         "--port", str(port), "--latency", str(latency)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Failed to start mock exchange server")
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPTS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_results(path: str) -> List[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+def find_baseline(history: List[Dict], fixtures: str, label: Optional[str] = None) -> Optional[Dict]:
+    """比較対象: ラベル指定があればその最新、なければ同じフィクスチャでの前回"""
+    for entry in reversed(history):
+        if label is not None and entry.get("label") != label:
+            continue
+        if entry.get("fixtures") == fixtures:
+            return entry
+    return None
+
+def display(run: Dict, baseline: Optional[Dict]) -> None:
+    print(f"{'ベンチマーク':<22} | {'最速(ms)':>9} | {'中央値(ms)':>10} | {'ピーク(MB)':>10} | {'スループット':>16} | {'前回比':>7}")
+    for name, result in run["results"].items():
+        throughput = f"{result['throughput']:,.0f} {result['unit']}/s"
+        change = ""
+        previous = (baseline or {}).get("results", {}).get(name)
+        if previous:
+            ratio = result["median_s"] / previous["median_s"]
+            change = f"{ratio:.2f}x" + (" !" if ratio > 1.1 else "")
+        print(f"{name:<22} | {result['best_s'] * 1000:>9.1f} | {result['median_s'] * 1000:>10.1f} | "
+              f"{result['peak_mb']:>10.2f} | {throughput:>16} | {change:>7}")
+    if baseline:
+        print(f"比較対象: {baseline['timestamp']} {baseline.get('label') or ''} ({baseline.get('commit')})")
+        print("（前回比は中央値の比、1.1倍を超えた遅延に ! を表示）")
+
+def main(fixtures_dir: Optional[str] = None, mock_url: Optional[str] = None, latency: float = 0.0, repeat: int = 5,
+         only: Optional[str] = None, label: Optional[str] = None, baseline_label: Optional[str] = None,
+         results_path: str = "bench_results.jsonl", show_metrics: bool = False) -> Dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        if mock_url:
+            fixtures = "external"
+        else:
+            fixtures = "recorded" if fixtures_dir and os.path.isdir(fixtures_dir) else "synthetic"
+        if fixtures == "synthetic":
+            fixtures_dir = os.path.join(workdir, "fixtures")
+            generate(fixtures_dir)
+
+        process = None
+        if not mock_url:
+            process, mock_url = start_mock(fixtures_dir, latency)
+        use_mock(mock_url)
+        ctx = BenchContext(mock_url, workdir)
+        try:
+            results = {}
+            for name, bench in BENCHMARKS:
+                if only and only not in name:
+                    continue
+                print(f"計測中: {name}")
+                func, items, unit, cleanup = bench(ctx)
+                try:
+                    result = measure(func, repeat)
+                finally:
+                    if cleanup:
+                        cleanup()
+                result.update(items=items, unit=unit, throughput=items / result["median_s"])
+                results[name] = result
+        finally:
+            ctx.close()
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "label": label,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "fixtures": fixtures,
+        "latency": latency,
+        "repeat": repeat,
+        "results": results,
+    }
+    baseline = find_baseline(load_results(results_path), fixtures, baseline_label)
+    print()
+    display(run, baseline)
+    if show_metrics:
+        METRICS.print_summary()
+
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+    print(f"結果を {results_path} に追記しました")
+    return run
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ベンチマークスイート")
+    parser.add_argument("--fixtures", help="記録済みフィクスチャのディレクトリ（なければ合成データ）")
+    parser.add_argument("--mock-url", help="起動済みの疑似サーバー（mock_exchange.py --record での記録にも使う）")
+    parser.add_argument("--latency", type=float, default=0.0, help="疑似サーバーの応答遅延（秒）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="名前にこの文字列を含むベンチマークだけ実行")
+    parser.add_argument("--label", help="結果に付けるラベル")
+    parser.add_argument("--baseline", help="比較対象のラベル（省略時は前回）")
+    parser.add_argument("--results", default="bench_results.jsonl", help="結果を追記するファイル")
+    parser.add_argument("--metrics", action="store_true", help="段階ごとの所要時間（metrics）も表示")
+    args = parser.parse_args()
+    main(args.fixtures, args.mock_url, args.latency, args.repeat, args.only, args.label, args.baseline,
+         args.results, args.metrics)
@@ -0,0 +1,94 @@
+"""
+Cardanoアドレスのユーティリティ
+bech32アドレスから支払い部分のスクリプトハッシュを取り出し、既知のDEXコントラクトを識別する
+"""
+
+from functools import lru_cache
+
+
+# 既知のDEXスクリプトアドレス（支払い部分のスクリプトハッシュで照合するので、ステーク部分が違うプールも一致する）
+DEX_SCRIPT_ADDRESSES = {
+    'minswap': [
+        'addr1wxn9efv2f6w82hagxqtn62ju4m293tqvw0uhmdl64ch8uwc0h43gt',  # V1 注文
+        'addr1z8snz7c4974vzdpxu65ruphl3zjdvtxw8strf2c2tmqnxz2j2c79gy9l76sdg0xwhd7r0c0kna0tycz4y5s6mlenh8pq0xmsha',  # V1 プール
+        'addr1z84q0denmyep98ph3tmzwsmw0j7zau9ljmsqx6a4rvaau66j2c79gy9l76sdg0xwhd7r0c0kna0tycz4y5s6mlenh8pq777e2a',  # V2 プール
+    ],
+    'sundaeswap': [
+        'addr1wxaptpmxcxawvr3pzlhgnpmzz3ql43n2tc8mn3av5kx0yzs09tqh8',  # 注文
+        'addr1w9qzpelu9hn45pefc0xr4ac4kdxeswq7pndul2vuj59u8tqaxdznu',  # V1 プール
+    ],
+    'wingriders': [
+        'addr1wxr2a8htmzuhj39y2gq7ftkpxv98y2g67tg8zezthgq4jkg0a4ul4',  # リクエスト
+    ],
+    'muesliswap': [
+        'addr1zyq0kyrml023kwjk8zr86d5gaxrt5w8lxnah8r6m6s4jp4g3r6dxnzml343sx8jweqn4vn3fz2kj8kgu9czghx0jrsyqqktyhv',  # 注文板
+    ],
+    'spectrum': [
+        'addr1x8nz307k3sr60gu0e47cmajssy4fmld7u493a4xztjrll0aj764lvrxdayh2ux30fl0ktuh27csgmpevdu89jlxppvrswgxsta',  # プール
+    ],
+}
+
+BECH32_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+BECH32_VALUES = {c: i for i, c in enumerate(BECH32_CHARSET)}
+
+def bech32_decode(address):
+    """bech32アドレスをバイト列に変換（チェックサム不一致などはNone）"""
+    hrp, _, data = address.rpartition('1')
+    try:
+        values = [BECH32_VALUES[c] for c in data]
+    except KeyError:
+        return None
+    
+    checksum = 1
+    for value in [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp] + values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1ffffff) << 5 ^ value
+        for i, generator in enumerate((0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3)):
+            if (top >> i) & 1:
+                checksum ^= generator
+    if checksum != 1:
+        return None
+    
+    acc, bits, decoded = 0, 0, bytearray()
+    for value in values[:-6]:
+        acc = (acc << 5) | value
+        bits += 5
+        if bits >= 8:
+            bits -= 8
+            decoded.append((acc >> bits) & 0xff)
+    return bytes(decoded)
+
+@lru_cache(maxsize=65536)
+def payment_script_hash(address):
+    """Shelleyアドレスの支払い部分がスクリプトならそのハッシュ（16進）、それ以外はNone"""
+    # ヘッダー種別1,3,5,7（先頭文字 z, x, 2, w）が支払い部分スクリプト
+    if not address.startswith('addr1') or len(address) < 6 or address[5] not in 'zx2w':
+        return None
+    decoded = bech32_decode(address)
+    if decoded is None or len(decoded) < 29:
+        return None
+    return decoded[1:29].hex()
+
+DEX_SCRIPT_HASHES = {
+    payment_script_hash(address): dex
+    for dex, addresses in DEX_SCRIPT_ADDRESSES.items() for address in addresses
+}
+
+# 流動性プール（価格・残高を追跡できるコントラクト）
+DEX_POOL_ADDRESSES = {
+    'minswap': [
+        'addr1z8snz7c4974vzdpxu65ruphl3zjdvtxw8strf2c2tmqnxz2j2c79gy9l76sdg0xwhd7r0c0kna0tycz4y5s6mlenh8pq0xmsha',  # V1
+        'addr1z84q0denmyep98ph3tmzwsmw0j7zau9ljmsqx6a4rvaau66j2c79gy9l76sdg0xwhd7r0c0kna0tycz4y5s6mlenh8pq777e2a',  # V2
+    ],
+    'sundaeswap': [
+        'addr1w9qzpelu9hn45pefc0xr4ac4kdxeswq7pndul2vuj59u8tqaxdznu',  # V1
+    ],
+    'spectrum': [
+        'addr1x8nz307k3sr60gu0e47cmajssy4fmld7u493a4xztjrll0aj764lvrxdayh2ux30fl0ktuh27csgmpevdu89jlxppvrswgxsta',
+    ],
+}
+
+DEX_POOL_SCRIPT_HASHES = {
+    payment_script_hash(address): dex
+    for dex, addresses in DEX_POOL_ADDRESSES.items() for address in addresses
+}
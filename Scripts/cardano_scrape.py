@@ -1,50 +1,103 @@
 from blockfrost import BlockFrostApi, ApiError, ApiUrls
+from blockfrost.utils import convert_json_to_object
+from requests import RequestException
 import json
+import re
 import pandas as pd
 import pytz
 from datetime import datetime, timedelta
 import time
-
-api = BlockFrostApi(
-    project_id='mainnetBfAqcyng5W9OWn6PFkiECjYaxX7GJ7Ty',
-    base_url=ApiUrls.mainnet.value,
-)
-
-try:
-    health = api.health()
-    print(health)
-except ApiError as e:
-    print(e)
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from cardano_address import DEX_POOL_ADDRESSES, DEX_SCRIPT_ADDRESSES, DEX_SCRIPT_HASHES, payment_script_hash
+from dex_pools import PoolTracker, block_fixture, format_gap
+from http_limiter import RetryError, call_with_retry, get_limiter
+from metrics import METRICS
+from tx_cache import TxCache
+from utxo_batch import UtxoBatch
+import numpy as np
 
 class CardanoDataFetcher:
-    def __init__(self, project_id):
+    def __init__(self, project_id, cache_path="cardano_tx_cache.sqlite3", base_url=ApiUrls.mainnet.value):
         self.api = BlockFrostApi(
             project_id=project_id,
-            base_url=ApiUrls.mainnet.value
+            base_url=base_url
         )
+        # Blockfrostのレート制限（秒間10リクエスト・バースト500）を共有リミッターで管理
+        self.limiter = get_limiter(base_url)
+        self.max_workers = 20  # 並列取得のスレッド数（実際の同時実行数はリミッターが調整）
+        # 確定済み取引の応答キャッシュ（cache_path=Noneで無効）
+        self.cache = TxCache(cache_path) if cache_path else None
+    
+    def call(self, func, *args, **kwargs):
+        """API呼び出しをレート制限・再試行付きで実行"""
+        return call_with_retry(self.limiter, func, *args, **kwargs)
+    
+    def fetch_json(self, kind, func, tx_hash):
+        """API応答(JSON)を取得してキャッシュに保存"""
+        body = self.call(func, tx_hash, return_type='json')
+        if self.cache is not None:
+            self.cache.put(tx_hash, kind, body)
+        return body
+    
+    def get_metadata(self, tx_hash):
+        """メタデータを取得（なければ空リスト）"""
+        try:
+            return self.fetch_json('metadata', self.api.transaction_metadata, tx_hash)
+        except ApiError as e:
+            # 「メタデータなし」も保存して次回から問い合わせない（一時的なエラーは保存しない）
+            if self.cache is not None and e.status_code == 404:
+                self.cache.put(tx_hash, 'metadata', [])
+            return []
     
     def get_transaction_details(self, tx_hash):
         """特定のトランザクションの詳細を取得"""
-        try:
-            tx = self.api.transaction(tx_hash)
-            utxos = self.api.transaction_utxos(tx_hash)
-            
-            try:
-                metadata = self.api.transaction_metadata(tx_hash)
-            except ApiError:
-                metadata = []
+        return self.get_transactions_details([tx_hash])[0]
+    
+    def get_transactions_details(self, tx_hashes, progress=False):
+        """複数トランザクションの詳細を並列取得（取引ごとの3つのAPI呼び出しも並列化、結果は入力順）
+        
+        キャッシュ済みの応答はAPIを呼ばずに使う。
+        """
+        tx_hashes = list(tx_hashes)
+        fetchers = {
+            'transaction': lambda h: self.fetch_json('transaction', self.api.transaction, h),
+            'utxos': lambda h: self.fetch_json('utxos', self.api.transaction_utxos, h),
+            'metadata': self.get_metadata,
+        }
+        cached = {kind: self.cache.get_many(tx_hashes, kind) if self.cache is not None else {} for kind in TxCache.KINDS}
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                (tx_hash, [cached[kind][tx_hash] if tx_hash in cached[kind] else executor.submit(fetchers[kind], tx_hash)
+                           for kind in TxCache.KINDS])
+                for tx_hash in tx_hashes
+            ]
             
-            return {
-                'transaction': tx,
-                'inputs': utxos.inputs,
-                'outputs': utxos.outputs,
-                'metadata': metadata,
-                'block_time': tx.block_time,
-                'block_height': tx.block_height
-            }
-        except ApiError as e:
-            print(f"取引詳細取得エラー {tx_hash}: {e}")
-            return None
+            for i, (tx_hash, parts) in enumerate(futures):
+                if progress and i % 20 == 0:
+                    print(f"取引取得中: {i}/{len(tx_hashes)}")
+                try:
+                    tx, utxos, metadata = (
+                        convert_json_to_object(part.result() if isinstance(part, Future) else part) for part in parts
+                    )
+                except (ApiError, RetryError, RequestException, ConnectionError) as e:
+                    # 再試行しても失敗した・接続できなかった取引だけを欠損として扱い、残りの取引は続けて取得
+                    print(f"取引詳細取得エラー {tx_hash}: {e}")
+                    results.append(None)
+                    continue
+                
+                results.append({
+                    'transaction': tx,
+                    'inputs': utxos.inputs,
+                    'outputs': utxos.outputs,
+                    'metadata': metadata,
+                    'block_time': tx.block_time,
+                    'block_height': tx.block_height
+                })
+        return results
     
     def get_latest_transactions(self, max_transactions=200):
         """最新の取引を直接取得"""
@@ -53,24 +106,15 @@ class CardanoDataFetcher:
         
         try:
             # 最新ブロックを取得
-            latest_block = self.api.block_latest()
+            latest_block = self.call(self.api.block_latest)
             print(f"最新ブロック: {latest_block.height}")
             
             # 最新ブロックから取引を取得
-            block_transactions = self.api.block_transactions(latest_block.hash)
+            block_transactions = self.call(self.api.block_transactions, latest_block.hash)
             
-            for i, tx_hash in enumerate(block_transactions[:max_transactions]):
-                if i % 20 == 0:
-                    print(f"取引取得中: {i}/{min(len(block_transactions), max_transactions)}")
-                
-                tx_details = self.get_transaction_details(tx_hash)
-                if tx_details:
-                    transactions.append(tx_details)
-                
-                time.sleep(0.1)  # レート制限対策
-                
-                if len(transactions) >= max_transactions:
-                    break
+            # 取引詳細を並列取得
+            details = self.get_transactions_details(block_transactions[:max_transactions], progress=True)
+            transactions = [tx_details for tx_details in details if tx_details]
             
             print(f"取得完了: {len(transactions)}件の取引")
             return transactions
@@ -106,7 +150,8 @@ class CardanoDataFetcher:
                 page = 1
                 while len(all_transactions) < max_transactions:
                     try:
-                        transactions = self.api.address_transactions(
+                        transactions = self.call(
+                            self.api.address_transactions,
                             address=address,
                             count=100,
                             page=page,
@@ -118,15 +163,14 @@ class CardanoDataFetcher:
                         
                         # 期間内の取引をフィルタ
                         period_transactions = []
-                        for tx in transactions:
-                            tx_details = self.get_transaction_details(tx.tx_hash)
+                        details = self.get_transactions_details(tx.tx_hash for tx in transactions)
+                        for tx_details in details:
                             if tx_details and tx_details['block_time']:
                                 if start_timestamp <= tx_details['block_time'] <= end_timestamp:
                                     period_transactions.append(tx_details)
                                 elif tx_details['block_time'] < start_timestamp:
                                     # 期間より古い取引に到達
                                     break
-                            time.sleep(0.1)
                         
                         all_transactions.extend(period_transactions)
                         print(f"  ページ{page}: {len(period_transactions)}件")
@@ -149,6 +193,100 @@ class CardanoDataFetcher:
         
         print(f"期間内取引取得完了: {len(all_transactions)}件")
         return all_transactions
+    
+    def get_block_tx_hashes(self, block_hash, count=100):
+        """ブロック内の全取引ハッシュを取得（ページ単位）"""
+        tx_hashes = []
+        page = 1
+        while True:
+            hashes = self.call(self.api.block_transactions, block_hash, count=count, page=page)
+            tx_hashes.extend(hashes)
+            if len(hashes) < count:
+                return tx_hashes
+            page += 1
+    
+    def iter_blocks_backward(self, since, count=100):
+        """最新ブロックから高さ順に遡り、since（UNIX時刻）以降のブロックを新しい順に列挙"""
+        block = self.call(self.api.block_latest)
+        while block.time >= since:
+            yield block
+            previous = self.call(self.api.blocks_previous, block.hash, count=count)
+            if not previous:
+                return
+            for block in sorted(previous, key=lambda b: b.height, reverse=True)[:-1]:
+                if block.time < since:
+                    return
+                yield block
+            block = min(previous, key=lambda b: b.height)
+    
+    def iter_blocks_forward(self, start=None, poll_interval=20, count=100, stop_event=None):
+        """指定ブロック（既定は最新）の次から新しいブロックを古い順に追従（新しいブロックが出るまで待機）"""
+        block = self.call(self.api.block, start) if start is not None else self.call(self.api.block_latest)
+        while stop_event is None or not stop_event.is_set():
+            following = self.call(self.api.blocks_next, block.hash, count=count)
+            if not following:
+                if stop_event is not None:
+                    stop_event.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+                continue
+            for block in sorted(following, key=lambda b: b.height):
+                yield block
+    
+    def stream_transactions(self, blocks, prefetch=500):
+        """ブロックの列から取引詳細を順に生成（別スレッドで先読み、先読みはprefetch件まで）
+        
+        メモリに保持するのは先読みキューと処理中の1ブロック分だけなので、期間の長さによらず一定。
+        """
+        buffer = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        done = object()
+        
+        def put(item):
+            # 利用側が止めたら待機をやめる
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce():
+            try:
+                for block in blocks:
+                    if stop.is_set():
+                        return
+                    if block.tx_count == 0:
+                        continue
+                    tx_hashes = self.get_block_tx_hashes(block.hash)
+                    for tx_details in self.get_transactions_details(tx_hashes):
+                        if tx_details and not put(tx_details):
+                            return
+                    if stop.is_set():
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+    
+    def stream_recent_transactions(self, hours_back=6, prefetch=500):
+        """過去hours_back時間の全ブロックの取引を新しい順に生成"""
+        since = int((datetime.now() - timedelta(hours=hours_back)).timestamp())
+        return self.stream_transactions(self.iter_blocks_backward(since), prefetch=prefetch)
 
 class SimplifiedArbitrageAnalyzer:
     def __init__(self, data_fetcher):
@@ -168,6 +306,10 @@ class SimplifiedArbitrageAnalyzer:
         
         # DEXメタデータパターン
         self.dex_patterns = ['minswap', 'sundaeswap', 'wingriders', 'muesliswap', 'vyfinance', 'dex', 'swap']
+        # 全パターンを1つの正規表現にまとめて1回で照合
+        self.dex_regex = re.compile('|'.join(map(re.escape, self.dex_patterns)), re.IGNORECASE)
+        self.dex_script_hashes = DEX_SCRIPT_HASHES
+        self.address_dex = {}  # アドレス → DEX名（DEXでなければNone）
     
     def is_dex_transaction(self, tx_details):
         """DEX取引かどうかを判定"""
@@ -177,10 +319,9 @@ class SimplifiedArbitrageAnalyzer:
         # メタデータからDEX取引を識別
         for metadata in tx_details['metadata']:
             if hasattr(metadata, 'json_metadata') and metadata.json_metadata:
-                metadata_str = json.dumps(metadata.json_metadata).lower()
-                for pattern in self.dex_patterns:
-                    if pattern in metadata_str:
-                        return True
+                strings = self.metadata_strings(metadata.json_metadata, [])
+                if self.dex_regex.search('\x00'.join(strings)):
+                    return True
         
         return False
     
@@ -269,6 +410,139 @@ class SimplifiedArbitrageAnalyzer:
         
         return profit_analysis
     
+    def metadata_strings(self, value, strings):
+        """メタデータ中のキー・文字列値を集める（Namespace・dict・listを再帰的に走査）"""
+        if isinstance(value, str):
+            strings.append(value)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                strings.append(str(key))
+                self.metadata_strings(item, strings)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self.metadata_strings(item, strings)
+        elif hasattr(value, '__dict__'):
+            self.metadata_strings(vars(value), strings)
+        return strings
+    
+    def metadata_is_dex(self, metadata_list):
+        """メタデータ（Namespaceまたは応答JSON）の文字列をまとめて1回だけ照合"""
+        strings = []
+        for metadata in metadata_list:
+            json_metadata = metadata.get('json_metadata') if isinstance(metadata, dict) else getattr(metadata, 'json_metadata', None)
+            if json_metadata:
+                self.metadata_strings(json_metadata, strings)
+        return bool(strings) and self.dex_regex.search('\x00'.join(strings)) is not None
+    
+    def new_batch(self):
+        """メタデータのDEX判定付きの列指向バッチを作成"""
+        return UtxoBatch(metadata_matcher=self.metadata_is_dex)
+    
+    @METRICS.timed("analyze", "cardano")
+    def analyze_batch(self, batch):
+        """列指向バッチの全取引を一括分析（analyze_transaction と同じ判定を配列で返す）"""
+        # DEXスクリプトアドレスはアドレス表に対して1回だけ判定
+        address_mask = np.array(
+            [self.dex_script_hashes.get(payment_script_hash(address)) is not None for address in batch.addresses],
+            dtype=bool
+        )
+        script_dex = batch.address_flag(address_mask)
+        is_dex = batch.metadata_flag | script_dex
+        
+        token_flows = batch.token_flows()
+        counts = batch.unique_counts(token_flows)
+        metadata_count = batch.metadata_count
+        total_utxos = batch.input_count + batch.output_count
+        complexity_score = (
+            np.minimum(total_utxos, 20)
+            + np.minimum(counts['addresses'] * 5, 25)
+            + np.minimum(counts['tokens'] * 10, 30)
+            + np.where(metadata_count > 0, np.minimum(metadata_count * 5, 25), 0)
+        )
+        
+        return {
+            'is_dex': is_dex,
+            'is_complex': complexity_score >= 40,
+            'complexity_score': complexity_score,
+            'total_utxos': total_utxos,
+            'unique_addresses': counts['addresses'],
+            'unique_tokens': counts['tokens'],
+            'token_flows': token_flows
+        }
+    
+    @METRICS.timed("analyze", "cardano")
+    def analyze_transaction(self, tx_details):
+        """UTxOとメタデータを1回ずつ走査して、DEX判定・複雑度・トークンフローをまとめて計算
+        
+        DEXはメタデータの文字列に加えて既知のDEXスクリプトアドレスでも判定する。
+        token_flows はトークンごとの [入力合計, 出力合計]（利益は token_profits で計算）。
+        """
+        # 入力・出力を1回ずつ走査してアドレスとトークンごとの数量を集計
+        addresses = set()
+        token_flows = {}
+        for side, utxos in ((0, tx_details['inputs']), (1, tx_details['outputs'])):
+            for utxo in utxos:
+                addresses.add(utxo.address)
+                for amount in utxo.amount:
+                    flows = token_flows.get(amount.unit)
+                    if flows is None:
+                        flows = token_flows[amount.unit] = [0, 0]
+                    flows[side] += int(amount.quantity)
+        
+        # スクリプトアドレスからDEXを識別（アドレスごとの結果をキャッシュ）
+        dex_names = set()
+        address_dex = self.address_dex
+        for address in addresses:
+            if address in address_dex:
+                dex = address_dex[address]
+            else:
+                if len(address_dex) >= 1_000_000:
+                    address_dex.clear()
+                dex = address_dex[address] = self.dex_script_hashes.get(payment_script_hash(address))
+            if dex:
+                dex_names.add(dex)
+        
+        metadata_dex = self.metadata_is_dex(tx_details['metadata'])
+        is_dex = metadata_dex or bool(dex_names)
+        
+        # 複雑度判定（is_complex_transaction と同じ配点）
+        total_utxos = len(tx_details['inputs']) + len(tx_details['outputs'])
+        complexity_score = 0
+        complexity_score += min(total_utxos, 20)
+        complexity_score += min(len(addresses) * 5, 25)
+        complexity_score += min(len(token_flows) * 10, 30)
+        if tx_details['metadata']:
+            complexity_score += min(len(tx_details['metadata']) * 5, 25)
+        
+        return {
+            'is_dex': is_dex,
+            'dex_names': sorted(dex_names),
+            'is_complex': complexity_score >= 40,
+            'complexity_analysis': {
+                'complexity_score': complexity_score,
+                'total_utxos': total_utxos,
+                'unique_addresses': len(addresses),
+                'unique_tokens': len(token_flows),
+                'has_metadata': len(tx_details['metadata']) > 0,
+                'is_dex_transaction': is_dex
+            },
+            'token_flows': token_flows
+        }
+    
+    def token_profits(self, token_flows):
+        """analyze_transaction のトークンフローから利益を計算（analyze_token_profits と同じ形式）"""
+        profit_analysis = {}
+        for token, (input_total, output_total) in token_flows.items():
+            profit = output_total - input_total
+            if profit > 0:
+                profit_analysis[token] = {
+                    'input': input_total,
+                    'output': output_total,
+                    'profit': profit,
+                    'profit_percentage': (profit / input_total * 100) if input_total > 0 else 0
+                }
+        return profit_analysis
+    
     def format_amount(self, amount, token_id):
         """金額をフォーマット"""
         if token_id in self.known_tokens:
@@ -290,47 +564,57 @@ class SimplifiedArbitrageCollector:
         self.analyzer = SimplifiedArbitrageAnalyzer(self.fetcher)
     
     def collect_arbitrage_candidates(self, method='latest', hours_back=6, max_transactions=200):
-        """アービトラージ候補を収集"""
+        """アービトラージ候補を収集
+        
+        method='stream' は過去hours_back時間の全ブロックを順に取得しながら分析する（max_transactionsは使わない）
+        """
         print(f"\n{'='*80}")
         print(f"簡素化アービトラージ検出開始")
         print(f"方法: {method}")
         print(f"{'='*80}")
         
         # 取引データを取得
-        if method == 'latest':
-            all_transactions = self.fetcher.get_latest_transactions(max_transactions)
+        if method == 'stream':
+            all_transactions = self.fetcher.stream_recent_transactions(hours_back)
+            total = None
         else:
-            all_transactions = self.fetcher.get_recent_transactions_by_period(hours_back, max_transactions)
-        
-        if not all_transactions:
-            print("取引データの取得に失敗しました")
-            return []
-        
-        print(f"取得した取引数: {len(all_transactions)}")
+            if method == 'latest':
+                all_transactions = self.fetcher.get_latest_transactions(max_transactions)
+            else:
+                all_transactions = self.fetcher.get_recent_transactions_by_period(hours_back, max_transactions)
+            
+            if not all_transactions:
+                print("取引データの取得に失敗しました")
+                return []
+            
+            total = len(all_transactions)
+            print(f"取得した取引数: {total}")
         
-        # アービトラージ候補を分析
+        # アービトラージ候補を分析（取引自体は保持せず件数だけ数える）
         arbitrage_candidates = []
-        dex_transactions = []
-        complex_transactions = []
+        dex_count = 0
+        complex_count = 0
+        analyzed_count = 0
         
         for i, tx_details in enumerate(all_transactions, 1):
+            analyzed_count = i
             if i % 50 == 0:
-                print(f"分析進行: {i}/{len(all_transactions)}")
+                print(f"分析進行: {i}/{total}" if total else f"分析進行: {i}件")
             
             try:
-                # DEX取引かチェック
-                is_dex = self.analyzer.is_dex_transaction(tx_details)
+                # DEX判定・複雑度・利益を1回の走査で計算
+                analysis = self.analyzer.analyze_transaction(tx_details)
+                is_dex = analysis['is_dex']
+                is_complex = analysis['is_complex']
+                complexity_analysis = analysis['complexity_analysis']
                 if is_dex:
-                    dex_transactions.append(tx_details)
-                
-                # 複雑な取引かチェック
-                is_complex, complexity_analysis = self.analyzer.is_complex_transaction(tx_details)
+                    dex_count += 1
                 if is_complex:
-                    complex_transactions.append((tx_details, complexity_analysis))
+                    complex_count += 1
                 
                 # アービトラージ候補の判定
                 if is_dex and is_complex and complexity_analysis['complexity_score'] >= 60:
-                    profit_analysis = self.analyzer.analyze_token_profits(tx_details)
+                    profit_analysis = self.analyzer.token_profits(analysis['token_flows'])
                     
                     candidate_data = {
                         'tx_hash': tx_details['transaction'].hash,
@@ -340,6 +624,7 @@ class SimplifiedArbitrageCollector:
                         'profit_analysis': profit_analysis,
                         'fee': int(tx_details['transaction'].fees),
                         'is_dex': is_dex,
+                        'dex_names': analysis['dex_names'],
                         'confidence_score': min(complexity_analysis['complexity_score'], 100)
                     }
                     arbitrage_candidates.append(candidate_data)
@@ -348,12 +633,55 @@ class SimplifiedArbitrageCollector:
                 continue
         
         print(f"\n分析結果:")
-        print(f"- DEX取引: {len(dex_transactions)}件")
-        print(f"- 複雑な取引: {len(complex_transactions)}件")
+        if total is None:
+            print(f"- 分析した取引: {analyzed_count}件")
+        print(f"- DEX取引: {dex_count}件")
+        print(f"- 複雑な取引: {complex_count}件")
         print(f"- アービトラージ候補: {len(arbitrage_candidates)}件")
         
         return arbitrage_candidates
     
+    def monitor_dex_prices(self, hours_back=1, follow=False, min_gap_pct=1.0, bootstrap=True, record_path=None):
+        """DEXプールの残高からトークン価格を追跡し、ブロックごとにDEX間の価格差を報告
+        
+        過去hours_back時間のブロックを古い順に処理し、follow=Trueならその後も新しいブロックを追従する。
+        過去のブロックは空の状態から再生し（プールは再生した取引の出力で作られる）、
+        bootstrap=True の場合は最新ブロックに追いついてから現在のプール残高を取り込んで追従する。
+        record_path を指定すると処理したブロックを記録する（dex_pools.py で再現できる）。
+        """
+        tracker = PoolTracker(min_gap_pct=min_gap_pct)
+        
+        since = int((datetime.now() - timedelta(hours=hours_back)).timestamp())
+        blocks = list(self.fetcher.iter_blocks_backward(since))[::-1]
+        print(f"対象ブロック: {len(blocks)}件")
+        
+        def all_blocks():
+            yield from blocks
+            if follow:
+                if bootstrap:
+                    # 過去のブロックで見えなかったプールを最新ブロック時点の残高で補う（再生済みのプールはそのまま）
+                    pool_count = tracker.bootstrap(self.fetcher, [a for addresses in DEX_POOL_ADDRESSES.values() for a in addresses],
+                                                   skip_known=True)
+                    print(f"プール初期化: {pool_count}件")
+                start = blocks[-1].hash if blocks else None
+                yield from self.fetcher.iter_blocks_forward(start)
+        
+        all_gaps = []
+        record = open(record_path, 'a', encoding='utf-8') if record_path else None
+        try:
+            for block, gaps, transactions in tracker.run(self.fetcher, all_blocks()):
+                if record is not None:
+                    record.write(json.dumps(block_fixture(block.height, transactions)) + "\n")
+                for gap in gaps:
+                    print(format_gap(gap))
+                all_gaps.extend(gaps)
+        finally:
+            if record is not None:
+                record.close()
+        
+        print(f"追跡中のプール: {len(tracker.pools)} / 価格差の検出: {len(all_gaps)}件")
+        return all_gaps
+    
     def display_results(self, candidates):
         """結果を表示"""
         if not candidates:
@@ -403,22 +731,34 @@ def main_simplified_arbitrage():
     """簡素化アービトラージ検出のメイン関数"""
     PROJECT_ID = "mainnetBfAqcyng5W9OWn6PFkiECjYaxX7GJ7Ty"
     
+    # API疎通確認（importでは実行しない）
+    try:
+        print(BlockFrostApi(project_id=PROJECT_ID, base_url=ApiUrls.mainnet.value).health())
+    except ApiError as e:
+        print(e)
+    
     try:
         collector = SimplifiedArbitrageCollector(PROJECT_ID)
         
-        # 方法を選択: 'latest' または 'period'
+        # 方法を選択: 'latest'、'period' または 'stream'
         candidates = collector.collect_arbitrage_candidates(
-            method='latest',  # 'latest' または 'period'
-            hours_back=24,    # method='period'の場合のみ使用
+            method='latest',  # 'latest'、'period' または 'stream'
+            hours_back=24,    # method='period' / 'stream' の場合のみ使用
             max_transactions=1000
         )
         
         collector.display_results(candidates)
         
+        # DEXプール価格の追跡（DEX間の価格差）: follow=True で新しいブロックを追従
+        # collector.monitor_dex_prices(hours_back=1, follow=False, min_gap_pct=1.0, record_path="dex_blocks.jsonl")
+        
     except Exception as e:
         print(f"エラー: {e}")
         import traceback
         traceback.print_exc()
+    
+    # 段階ごとの所要時間（Blockfrost呼び出し・分析）
+    METRICS.print_summary()
 
 if __name__ == "__main__":
     main_simplified_arbitrage()
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""
+DEXプール価格の追跡とDEX間の価格差検出
+ブロックごとに、既知のプールコントラクトへの出力（プールUTxOの更新）だけを反映して残高・価格を更新し、
+変化したトークンについてのみDEX間の価格差を再計算する（ブロックあたりの計算量は変化したプール数に比例）。
+"""
+
+import argparse
+import json
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from cardano_address import DEX_POOL_SCRIPT_HASHES, payment_script_hash
+
+LOVELACE = 'lovelace'
+
+
+def field(obj, name):
+    """Namespace（フェッチャーの取引詳細）と応答JSONのどちらからも値を取り出す"""
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+def flag(obj, name) -> bool:
+    """真偽値の項目（reference・collateral 等）を取り出す（ない場合はFalse）"""
+    return bool(obj.get(name) if isinstance(obj, dict) else getattr(obj, name, False))
+
+def spends(utxo) -> bool:
+    """入力が実際に消費されるか（参照入力・担保入力は有効な取引では消費されない）"""
+    return not (flag(utxo, 'reference') or flag(utxo, 'collateral'))
+
+def parse_pool_utxo(amounts) -> Optional[Tuple[tuple, str, int, int]]:
+    """プールUTxOの数量から (プールID, トークン, ADA残高, トークン残高) を取り出す（ADAペア以外はNone）
+
+    数量1の資産（プールNFT・ファクトリートークン）の組をプールIDとし、
+    数量が2以上のADA以外の資産がちょうど1つならADA/トークンのプールとみなす。
+    """
+    lovelace = 0
+    identity = []
+    reserves = []
+    for amount in amounts:
+        unit = field(amount, 'unit')
+        quantity = int(field(amount, 'quantity'))
+        if unit == LOVELACE:
+            lovelace = quantity
+        elif quantity == 1:
+            identity.append(unit)
+        else:
+            reserves.append((unit, quantity))
+    if not identity or len(reserves) != 1 or lovelace <= 0:
+        return None
+    token, token_reserve = reserves[0]
+    return tuple(sorted(identity)), token, lovelace, token_reserve
+
+
+class PoolTracker:
+    def __init__(self, pool_script_hashes: Optional[Dict[str, str]] = None, min_liquidity: int = 10_000 * 1_000_000,
+                 min_gap_pct: float = 1.0, fee_pct: float = 0.3):
+        self.pool_script_hashes = pool_script_hashes or DEX_POOL_SCRIPT_HASHES
+        self.min_liquidity = min_liquidity  # 比較に使うプールの最小ADA残高（lovelace）
+        self.min_gap_pct = min_gap_pct      # 報告する最小価格差（手数料控除後、%）
+        self.fee_pct = fee_pct              # 1回のスワップ手数料（%）
+
+        # プールID → {'dex', 'token', 'ada', 'token_reserve', 'price', 'block_height'}
+        self.pools: Dict[tuple, Dict] = {}
+        # トークン → DEX → プールIDの集合
+        self.pools_by_token: Dict[str, Dict[str, Set[tuple]]] = {}
+        # トークン → DEX → 最も流動性の高いプールの価格情報
+        self.price_index: Dict[str, Dict[str, Dict]] = {}
+        self.address_dex: Dict[str, Optional[str]] = {}
+
+    def pool_dex(self, address: str) -> Optional[str]:
+        """アドレスがプールコントラクトならDEX名"""
+        if address not in self.address_dex:
+            self.address_dex[address] = self.pool_script_hashes.get(payment_script_hash(address))
+        return self.address_dex[address]
+
+    def update_pool(self, dex: str, amounts, block_height: int) -> Optional[Tuple[tuple, str]]:
+        """プールUTxOを反映し、(プールID, 価格が変わったトークン) を返す"""
+        parsed = parse_pool_utxo(amounts)
+        if parsed is None:
+            return None
+        pool_id, token, ada, token_reserve = parsed
+        previous = self.pools.get(pool_id)
+        if previous is not None and previous['token'] != token:
+            self.pools_by_token[previous['token']][previous['dex']].discard(pool_id)
+        self.pools[pool_id] = {
+            'dex': dex,
+            'token': token,
+            'ada': ada,
+            'token_reserve': token_reserve,
+            'price': ada / token_reserve,  # トークン1単位あたりのlovelace
+            'block_height': block_height
+        }
+        self.pools_by_token.setdefault(token, {}).setdefault(dex, set()).add(pool_id)
+        return pool_id, token
+
+    def remove_pool(self, pool_id: tuple) -> Optional[str]:
+        pool = self.pools.pop(pool_id, None)
+        if pool is None:
+            return None
+        self.pools_by_token[pool['token']][pool['dex']].discard(pool_id)
+        return pool['token']
+
+    def apply_transactions(self, transactions: Iterable, block_height: int) -> Set[str]:
+        """ブロック内の取引を反映し、価格が変わったトークンの集合を返す"""
+        changed = set()
+        for tx_details in transactions:
+            if not tx_details:
+                continue
+            # 消費されたプールのうち、同じ取引で再作成されないものは削除
+            consumed = set()
+            for utxo in tx_details['inputs']:
+                if spends(utxo) and self.pool_dex(field(utxo, 'address')):
+                    parsed = parse_pool_utxo(field(utxo, 'amount'))
+                    if parsed is not None:
+                        consumed.add(parsed[0])
+            for utxo in tx_details['outputs']:
+                dex = self.pool_dex(field(utxo, 'address'))
+                if dex:
+                    updated = self.update_pool(dex, field(utxo, 'amount'), block_height)
+                    if updated is not None:
+                        consumed.discard(updated[0])
+                        changed.add(updated[1])
+            for pool_id in consumed:
+                token = self.remove_pool(pool_id)
+                if token is not None:
+                    changed.add(token)
+        return changed
+
+    def refresh_prices(self, token: str) -> None:
+        """1トークンについてDEXごとの代表価格（最もADA残高の多いプール）を再計算"""
+        index = {}
+        for dex, pool_ids in self.pools_by_token.get(token, {}).items():
+            if not pool_ids:
+                continue
+            pool_id = max(pool_ids, key=lambda p: self.pools[p]['ada'])
+            if self.pools[pool_id]['ada'] >= self.min_liquidity:
+                index[dex] = dict(self.pools[pool_id], pool_id=pool_id)
+        if index:
+            self.price_index[token] = index
+        else:
+            self.price_index.pop(token, None)
+
+    def token_gap(self, token: str) -> Optional[Dict]:
+        """DEX間の最大価格差（手数料控除後）"""
+        index = self.price_index.get(token, {})
+        if len(index) < 2:
+            return None
+        buy_dex, buy = min(index.items(), key=lambda item: item[1]['price'])
+        sell_dex, sell = max(index.items(), key=lambda item: item[1]['price'])
+        gap_pct = (sell['price'] / buy['price'] - 1) * 100
+        net_gap_pct = gap_pct - 2 * self.fee_pct
+        return {
+            'token': token,
+            'buy_dex': buy_dex,
+            'buy_price': buy['price'],
+            'buy_pool': buy['pool_id'],
+            'sell_dex': sell_dex,
+            'sell_price': sell['price'],
+            'sell_pool': sell['pool_id'],
+            'gap_pct': gap_pct,
+            'net_gap_pct': net_gap_pct
+        }
+
+    def apply_block(self, block_height: int, transactions: Iterable) -> List[Dict]:
+        """1ブロック分を反映し、価格が変わったトークンのうち閾値を超える価格差を返す"""
+        changed = self.apply_transactions(transactions, block_height)
+        gaps = []
+        for token in changed:
+            self.refresh_prices(token)
+            gap = self.token_gap(token)
+            if gap is not None and gap['net_gap_pct'] >= self.min_gap_pct:
+                gap['block_height'] = block_height
+                gaps.append(gap)
+        gaps.sort(key=lambda gap: gap['net_gap_pct'], reverse=True)
+        return gaps
+
+    def bootstrap(self, fetcher, pool_addresses: Iterable[str], max_pages: int = 50, skip_known: bool = False) -> int:
+        """プールアドレスの現在（最新ブロック時点）のUTxOから初期状態を作成（取り込んだプール数を返す）
+
+        最新ブロックから先を追従する場合にだけ使う。過去のブロックを再生する前に呼ぶと、
+        最新の状態に古いブロックの更新を重ねることになる。
+        skip_known=True なら追跡中のプール（再生で得た状態）は上書きせず、未知のプールだけ補う。
+        """
+        before = len(self.pools)
+        for address in pool_addresses:
+            dex = self.pool_dex(address)
+            if not dex:
+                continue
+            for page in range(1, max_pages + 1):
+                utxos = fetcher.call(fetcher.api.address_utxos, address, count=100, page=page)
+                for utxo in utxos:
+                    if skip_known:
+                        parsed = parse_pool_utxo(utxo.amount)
+                        if parsed is not None and parsed[0] in self.pools:
+                            continue
+                    updated = self.update_pool(dex, utxo.amount, 0)
+                    if updated is not None:
+                        self.refresh_prices(updated[1])
+                if len(utxos) < 100:
+                    break
+        return len(self.pools) - before
+
+    def run(self, fetcher, blocks) -> Iterable[Tuple[object, List[Dict], list]]:
+        """ブロックを古い順に処理し、ブロックごとに (ブロック, 価格差のリスト, 取引詳細) を生成"""
+        for block in blocks:
+            if block.tx_count == 0:
+                yield block, [], []
+                continue
+            tx_hashes = fetcher.get_block_tx_hashes(block.hash)
+            transactions = [tx for tx in fetcher.get_transactions_details(tx_hashes) if tx]
+            yield block, self.apply_block(block.height, transactions), transactions
+
+
+def block_fixture(height: int, transactions) -> Dict:
+    """ブロックを記録用のJSONに変換（プールの追跡に必要な入出力だけ）"""
+    def utxos(items):
+        records = []
+        for u in items:
+            record = {'address': field(u, 'address'),
+                      'amount': [{'unit': field(a, 'unit'), 'quantity': str(field(a, 'quantity'))} for a in field(u, 'amount')]}
+            # 参照入力・担保入力の印も残す（再現時に消費として扱わないため）
+            record.update({name: True for name in ('reference', 'collateral') if flag(u, name)})
+            records.append(record)
+        return records
+    return {'height': height,
+            'transactions': [{'inputs': utxos(tx['inputs']), 'outputs': utxos(tx['outputs'])} for tx in transactions]}
+
+def load_block_fixtures(path: str):
+    """記録したブロック（1行1ブロックのJSON）を順に読み込み"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def format_gap(gap: Dict) -> str:
+    return (f"[{gap['block_height']}] {gap['token'][:16]}... {gap['buy_dex']}→{gap['sell_dex']} "
+            f"{gap['gap_pct']:+.2f}%（手数料控除後 {gap['net_gap_pct']:+.2f}%）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="記録したブロックでDEX間の価格差を再現")
+    parser.add_argument("path", help="記録ブロック（JSON Lines）")
+    parser.add_argument("--min-gap", type=float, default=1.0, help="報告する最小価格差（手数料控除後、%）")
+    parser.add_argument("--min-liquidity", type=float, default=10_000, help="比較に使うプールの最小ADA残高")
+    args = parser.parse_args()
+
+    tracker = PoolTracker(min_liquidity=int(args.min_liquidity * 1_000_000), min_gap_pct=args.min_gap)
+    for block in load_block_fixtures(args.path):
+        for gap in tracker.apply_block(block['height'], block['transactions']):
+            print(format_gap(gap))
+    print(f"追跡中のプール: {len(tracker.pools)} / 価格のあるトークン: {len(tracker.price_index)}")
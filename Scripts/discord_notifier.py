@@ -0,0 +1,269 @@
+"""
+Discord通知ディスパッチャー
+通知をキューに積むだけで即座に戻り、送信はバックグラウンドで行う（検出処理がDiscordの応答を待たない）。
+同じキーの通知は一定時間まとめ、Discordの埋め込み数・文字数の上限に合わせて複数メッセージに分割する。
+Webhookのレート制限ヘッダーに従い、再試行しても送れなかった通知はディスクに退避して次回送信する。
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from http_limiter import DEFAULT_LIMITS, HOST_LIMITS, RETRY_STATUSES, HostLimiter, backoff_delay
+from metrics import METRICS
+
+# Discordのメッセージ上限
+MAX_EMBEDS = 10           # 1メッセージあたりの埋め込み数
+MAX_EMBED_CHARS = 6000    # 1メッセージあたりの埋め込み合計文字数
+MAX_CONTENT_CHARS = 2000  # 本文の文字数
+
+
+def embed_size(embed: Dict) -> int:
+    """埋め込みの文字数（Discordが上限判定に使う項目の合計）"""
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    size += len(embed.get("footer", {}).get("text", "")) + len(embed.get("author", {}).get("name", ""))
+    for field in embed.get("fields", []):
+        size += len(field.get("name", "")) + len(field.get("value", ""))
+    return size
+
+def split_messages(content: str, embeds: List[Dict]) -> List[Dict]:
+    """埋め込みを上限内に収まるよう複数のペイロードに分割"""
+    chunks, chunk, chunk_size = [], [], 0
+    for embed in embeds:
+        size = embed_size(embed)
+        if chunk and (len(chunk) >= MAX_EMBEDS or chunk_size + size > MAX_EMBED_CHARS):
+            chunks.append(chunk)
+            chunk, chunk_size = [], 0
+        chunk.append(embed)
+        chunk_size += size
+    if chunk or not chunks:
+        chunks.append(chunk)
+
+    payloads = []
+    for i, chunk in enumerate(chunks, 1):
+        text = content if len(chunks) == 1 else f"{content} ({i}/{len(chunks)})"
+        payload = {"content": text[:MAX_CONTENT_CHARS]}
+        if chunk:
+            payload["embeds"] = chunk
+        payloads.append(payload)
+    return payloads
+
+
+class DiscordNotifier:
+    def __init__(self, webhook_url: str, format_alerts: Optional[Callable[[List[Dict]], Tuple[str, List[Dict]]]] = None,
+                 merge: Optional[Callable[[Dict, Dict], Dict]] = None, coalesce_window: float = 5.0,
+                 max_queue: int = 1000, retries: int = 4, spool_path: str = "discord_spool.jsonl"):
+        self.webhook_url = webhook_url
+        self.format_alerts = format_alerts or (lambda alerts: (f"{len(alerts)}件の通知", alerts))
+        self.merge = merge or (lambda old, new: new)  # 同じキーの通知をまとめる方法（既定は新しい方）
+        self.coalesce_window = coalesce_window          # 通知をまとめる時間（秒）
+        self.retries = retries
+        self.spool_path = spool_path
+        self.timeout = aiohttp.ClientTimeout(total=10)
+
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.pending: Dict[str, Dict] = {}  # まとめ待ちの通知（キー → 通知）
+        self.pending_since = 0.0
+        self.outbox: List[Tuple[str, Dict]] = []  # 送信待ちの (URL, ペイロード)
+        self.sending: Optional[Tuple[str, Dict]] = None  # 送信中の (URL, ペイロード)
+        self.limiters: Dict[str, HostLimiter] = {}
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.task: Optional[asyncio.Task] = None
+        self.closing = False
+
+        # 統計
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def alert(self, key: str, alert: Dict) -> None:
+        """通知をキューに積む（同じキーは coalesce_window 秒の間まとめる）"""
+        self.put(("alert", key, alert))
+
+    def notify(self, payload: Dict, url: Optional[str] = None) -> None:
+        """ペイロードをそのまま送信キューに積む"""
+        self.put(("payload", url or self.webhook_url, payload))
+
+    def put(self, item: Tuple) -> None:
+        """キューが満杯なら最も古い通知を捨てて積む（呼び出し側を待たせない）"""
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.dropped += 1
+            print("Discord queue full, dropped oldest notification")
+            self.queue.put_nowait(item)
+
+    def limiter(self, url: str) -> HostLimiter:
+        """Webhookごとのリミッター（Discordのレート制限はWebhook単位）"""
+        if url not in self.limiters:
+            host = url.split("/")[2] if "://" in url else url
+            self.limiters[url] = HostLimiter(host, **HOST_LIMITS.get(host, DEFAULT_LIMITS))
+        return self.limiters[url]
+
+    def accept(self, item: Tuple) -> None:
+        kind, target, body = item
+        if kind == "alert":
+            if not self.pending:
+                self.pending_since = time.monotonic()
+            self.pending[target] = self.merge(self.pending[target], body) if target in self.pending else body
+        elif kind == "payload":
+            self.outbox.append((target, body))
+
+    def flush_pending(self) -> None:
+        """まとめ待ちの通知をメッセージに整形して送信待ちへ"""
+        if not self.pending:
+            return
+        alerts = list(self.pending.values())
+        self.pending = {}
+        try:
+            content, embeds = self.format_alerts(alerts)
+            payloads = split_messages(content, embeds)
+        except Exception as e:
+            # 整形できない通知は捨てて、以降の通知の送信を続ける
+            self.failed += len(alerts)
+            print(f"Failed to format Discord notifications ({len(alerts)} alerts dropped): {e!r}")
+            return
+        self.outbox.extend((self.webhook_url, payload) for payload in payloads)
+
+    async def post(self, url: str, payload: Dict) -> bool:
+        """レート制限・再試行付きで送信（送信済みまたは再送不要ならTrue）"""
+        limiter = self.limiter(url)
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            await limiter.acquire_async()
+            acquired = time.perf_counter()
+            # WebhookのURLにはトークンが含まれるのでラベルには使わない
+            METRICS.observe("wait", acquired - start, "discord", "webhook")
+            status, headers = None, None
+            try:
+                async with self.session.post(url, json=payload, timeout=self.timeout) as resp:
+                    status, headers = resp.status, resp.headers
+                    await resp.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Failed to send Discord notification: {e}")
+            finally:
+                limiter.release(status, headers)
+                METRICS.observe("notify", time.perf_counter() - acquired, "discord", "webhook",
+                                error=status is None or status >= 400)
+
+            if status is not None and status < 300:
+                return True
+            if status is not None and status not in RETRY_STATUSES:
+                # ペイロード不正などは再送しても通らないので破棄
+                print(f"Discord notification rejected: {status}")
+                return True
+            if attempt < self.retries:
+                await asyncio.sleep(backoff_delay(attempt, headers))
+        return False
+
+    def spool(self, items: List[Tuple[str, Dict]]) -> None:
+        """送れなかった通知をディスクに追記"""
+        if not items:
+            return
+        try:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                for url, payload in items:
+                    f.write(json.dumps({"url": url, "payload": payload}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Failed to spool Discord notifications: {e}")
+
+    def load_spool(self) -> None:
+        """退避した通知を読み込んで送信待ちへ戻す"""
+        try:
+            with open(self.spool_path, encoding="utf-8") as f:
+                items = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spool_path)
+        except (OSError, ValueError):
+            return
+        self.outbox.extend((item["url"], item["payload"]) for item in items)
+        if items:
+            print(f"Loaded {len(items)} spooled Discord notifications")
+
+    async def worker(self) -> None:
+        """キューを読み、まとめて整形し、順番に送信"""
+        while True:
+            timeout = None
+            if self.closing:
+                timeout = 0
+            elif self.pending:
+                timeout = max(0.0, self.pending_since + self.coalesce_window - time.monotonic())
+            elif self.outbox:
+                timeout = 0
+
+            if timeout is None or timeout > 0:
+                try:
+                    self.accept(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    pass
+            while not self.queue.empty():
+                self.accept(self.queue.get_nowait())
+
+            if self.pending and (self.closing or time.monotonic() - self.pending_since >= self.coalesce_window):
+                self.flush_pending()
+
+            if self.outbox:
+                url, payload = self.sending = self.outbox.pop(0)
+                try:
+                    ok = await self.post(url, payload)
+                except Exception as e:
+                    # 想定外のエラー（送れないペイロード等）でも送信タスクを止めない
+                    print(f"Failed to send Discord notification, dropped: {e!r}")
+                    self.sending = None
+                    self.failed += 1
+                    continue
+                self.sending = None
+                if ok:
+                    self.sent += 1
+                    if os.path.exists(self.spool_path):
+                        self.load_spool()
+                else:
+                    self.failed += 1
+                    self.spool([(url, payload)])
+            elif self.closing and not self.pending and self.queue.empty():
+                return
+
+    async def start(self) -> None:
+        """送信タスクを開始（前回退避した通知も送信）"""
+        if self.task is not None:
+            return
+        self.closing = False
+        self.session = aiohttp.ClientSession(trace_configs=[METRICS.trace_config()])
+        self.load_spool()
+        self.task = asyncio.create_task(self.worker())
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """残りの通知を送信して停止（timeout秒で送り切れなければディスクに退避）"""
+        if self.task is None:
+            return
+        self.closing = True
+        if not self.queue.full():
+            # 待機中の送信タスクを起こす
+            self.queue.put_nowait(("wake", None, None))
+        try:
+            await asyncio.wait_for(self.task, timeout)
+        except asyncio.TimeoutError:
+            print("Discord notifier stop timed out, spooling remaining notifications")
+        finally:
+            while not self.queue.empty():
+                self.accept(self.queue.get_nowait())
+            self.flush_pending()
+            if self.sending is not None:
+                self.outbox.insert(0, self.sending)
+                self.sending = None
+            self.spool(self.outbox)
+            self.outbox = []
+            self.task = None
+            await self.session.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
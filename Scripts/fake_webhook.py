@@ -0,0 +1,85 @@
+"""
+Discord Webhook 疑似サーバー
+受信したペイロードを記録し、Discordと同じレート制限ヘッダー・429応答を返す（テスト・検証用）
+
+使い方: python fake_webhook.py --port 8766 --limit 5 --reset-after 2 --fail-first 1
+"""
+
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+
+
+def create_app(limit: int = 5, reset_after: float = 2.0, fail_first: int = 0, delay: float = 0.0) -> web.Application:
+    """Webhook疑似アプリを作成（受信したペイロードは app["received"] に記録）
+
+    limit: reset_after 秒あたりの受付回数（超えると429）
+    fail_first: 最初のN回は500を返す
+    delay: 応答までの遅延（秒）
+    """
+    state = {"window_start": time.monotonic(), "count": 0, "requests": 0}
+
+    async def handler(request):
+        state["requests"] += 1
+        if delay:
+            await asyncio.sleep(delay)
+        if state["requests"] <= fail_first:
+            return web.json_response({"message": "Internal Server Error"}, status=500)
+
+        now = time.monotonic()
+        if now - state["window_start"] >= reset_after:
+            state["window_start"], state["count"] = now, 0
+        retry_after = max(0.0, state["window_start"] + reset_after - now)
+
+        if state["count"] >= limit:
+            request.app["throttled"] += 1
+            headers = {
+                "Retry-After": f"{retry_after:.3f}",
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset-After": f"{retry_after:.3f}",
+            }
+            return web.json_response({"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                                     status=429, headers=headers)
+
+        payload = await request.json()
+        embeds = payload.get("embeds", [])
+        if len(embeds) > 10 or len(payload.get("content", "")) > 2000:
+            return web.json_response({"message": "Invalid Form Body"}, status=400)
+
+        state["count"] += 1
+        request.app["received"].append(payload)
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(limit - state["count"]),
+            "X-RateLimit-Reset-After": f"{retry_after:.3f}",
+        }
+        return web.Response(status=204, headers=headers)
+
+    app = web.Application()
+    app["received"] = []
+    app["throttled"] = 0
+    app.router.add_post("/{tail:.*}", handler)
+    return app
+
+async def serve(host: str = "127.0.0.1", port: int = 8766, **kwargs):
+    """疑似サーバーを起動（停止は戻り値の runner.cleanup()、受信内容は runner.app["received"]）"""
+    runner = web.AppRunner(create_app(**kwargs))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discord Webhook 疑似サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--limit", type=int, default=5, help="リセットまでの受付回数")
+    parser.add_argument("--reset-after", type=float, default=2.0, help="レート制限のリセット間隔（秒）")
+    parser.add_argument("--fail-first", type=int, default=0, help="最初のN回は500を返す")
+    parser.add_argument("--delay", type=float, default=0.0, help="応答遅延（秒）")
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.limit, args.reset_after, args.fail_first, args.delay), host=args.host, port=args.port)
@@ -0,0 +1,124 @@
+"""
+為替レートキャッシュ
+TTL内はキャッシュを返し、期限切れ後は古い値を返しつつバックグラウンドで更新する
+最後に取得できた値（last known good）はディスクに保存して再起動後も使う
+"""
+
+import json
+import os
+import threading
+import time
+
+from http_limiter import request_json_sync
+
+
+class FxRateCache:
+    def __init__(self, url: str = "https://api.exchangerate-api.com/v4/latest/USD", currency: str = "JPY",
+                 ttl: float = 3600, max_stale: float = 86400, path: str = "fx_rate.json"):
+        self.url = url
+        self.currency = currency
+        self.ttl = ttl              # この秒数までは新鮮とみなす
+        self.max_stale = max_stale  # この秒数を超えた値は使わない
+        self.path = path
+
+        self.rate = None
+        self.updated_at = 0.0
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.refresh_thread = None
+        self.stop_event = threading.Event()
+
+        self.load()
+
+    def load(self) -> None:
+        """ディスクから最後に取得した値を読み込み"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.rate = float(data['rate'])
+            self.updated_at = float(data['updated_at'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save(self) -> None:
+        """最後に取得した値をディスクへ保存（一時ファイル経由で置換）"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({'rate': self.rate, 'updated_at': self.updated_at}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"為替レート保存エラー: {e}")
+
+    def fetch(self) -> float:
+        """APIから為替レートを取得"""
+        data = request_json_sync("GET", self.url)
+        return float(data['rates'][self.currency])
+
+    def refresh(self) -> bool:
+        """為替レートを更新（失敗時は前回値を維持）"""
+        try:
+            rate = self.fetch()
+        except Exception as e:
+            print(f"為替レート取得エラー: {e}")
+            return False
+        finally:
+            self.refreshing = False
+
+        with self.lock:
+            self.rate = rate
+            self.updated_at = time.time()
+            self.save()
+        return True
+
+    def age(self) -> float:
+        """前回更新からの経過秒数"""
+        return time.time() - self.updated_at
+
+    def get(self):
+        """為替レートを返す（取得できない場合はNone）"""
+        if self.rate is None or self.age() > self.max_stale:
+            # 使える値がないので同期で取得
+            self.refresh()
+        elif self.age() > self.ttl:
+            # 古い値を返しつつバックグラウンドで更新
+            self.refresh_async()
+        return self.cached()
+
+    def cached(self):
+        """キャッシュ済みの為替レートを返す（通信しない、使える値がない場合はNone）"""
+        if self.rate is None or self.age() > self.max_stale:
+            return None
+        return self.rate
+
+    def refresh_async(self) -> None:
+        """バックグラウンドで1回更新（多重起動しない）"""
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def start(self, interval: float = None) -> None:
+        """定期更新スレッドを開始"""
+        if self.refresh_thread is not None:
+            return
+        interval = interval if interval is not None else self.ttl
+        # stop() 後の再開に備えて停止フラグを作り直す（停止中の旧スレッドは旧フラグで終了する）
+        stop_event = self.stop_event = threading.Event()
+
+        def loop():
+            while not stop_event.wait(interval):
+                self.refresh()
+
+        self.refresh_thread = threading.Thread(target=loop, daemon=True)
+        self.refresh_thread.start()
+
+    def stop(self) -> None:
+        """定期更新スレッドを停止"""
+        self.stop_event.set()
+        self.refresh_thread = None
+
+
+# 全スクリプトで共有するUSD/JPYキャッシュ
+usdjpy_cache = FxRateCache()
@@ -1,48 +1,174 @@
 import pybotters
-import json
 import asyncio
+import time
+import numpy as np
 import pandas as pd
-from analysis import rsi_analysis, atr_analysis
+from analysis import IncrementalIndicator
+from kline_store import KlineStore, KLINE_COLUMNS
+from http_limiter import HostLimiter, get_limiter, request_json
+
+# 時間足ごとのミリ秒
+INTERVAL_MS = {
+    '1': 60_000, '3': 180_000, '5': 300_000, '15': 900_000, '30': 1_800_000,
+    '60': 3_600_000, '120': 7_200_000, '240': 14_400_000, '360': 21_600_000,
+    '720': 43_200_000, 'D': 86_400_000, 'W': 604_800_000,
+}
 
 class kline:
-    def __init__(self, symbol:str, client:pybotters.Client):
+    def __init__(self, symbol:str, client:pybotters.Client, store:KlineStore=None, interval:str="30", base_url:str="https://api.bybit.com"):
         # Parameter
         self.symbol = symbol
+        self.interval = interval # 30分足
 
         # API
         self.client: pybotters.Client = client
-        self.base_url = "https://api.bybit.com"
+        self.base_url = base_url
 
-    async def get_kline(self):
-        """ローソク足取得、データフレームに変換"""
+        # ローカル保存（前回の続きから取得）
+        self.store = store if store is not None else KlineStore()
+
+        # 逐次インジケーター（新しい足だけを1本ずつ反映）
+        self.indicator = IncrementalIndicator()
+
+    async def fetch_new_bars(self):
+        """保存済みの最終足以降だけを取得してストアに追記"""
         endpoint = "/v5/market/kline"
         url = f"{self.base_url}{endpoint}"
+        limit = 500 # 500本
         params = {
             'category': "linear",
             'symbol': self.symbol,
-            'interval' : "30", #15分足
-            'limit' : "500" # 500本
+            'interval' : self.interval,
+            'limit' : str(limit)
         }
-        result = await self.client.fetch("GET", url=url, params=params)
-        text = result.text
-        data = json.loads(text)
+        # 最終足は未確定の可能性があるので、その足から取り直す
+        last_timestamp = self.store.last_timestamp(self.symbol, self.interval)
+        if last_timestamp is not None:
+            params['start'] = str(last_timestamp)
+
+        data = await request_json(self.client, "GET", url, params=params)
+        if data.get('retCode', 0) != 0:
+            raise RuntimeError(f"{self.symbol} kline取得エラー: {data.get('retMsg')}")
         data = data.get('result', {}).get('list', [])
-        df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume", "quote_volume"]).astype(float)
-        df["timestamp"] = pd.to_datetime(df["timestamp"].astype("int64"), unit='ms', utc=True) + pd.Timedelta(hours=9)
-        df['RSI'] = rsi_analysis(data=df)
-        df['ATR'] = atr_analysis(data=df)
-        df.to_csv(r'C:\Users\User\git\bot\test.csv')
-        print(df.dropna())
+        rows = [(int(row[0]), *map(float, row[1:7])) for row in data]
+
+        # 停止期間が1ページ（500本）を超えると間が抜けるので、ページ分割の取得で最終足から現在まで埋める
+        if last_timestamp is not None and rows:
+            first = min(row[0] for row in rows)
+            if len(rows) >= limit or first > last_timestamp + INTERVAL_MS[self.interval]:
+                print(f"{self.symbol} {last_timestamp}以降の足が1ページに収まらないため再取得します")
+                df = await self.backfill(last_timestamp, int(time.time() * 1000))
+                return len(df)
+        return self.store.append(self.symbol, self.interval, rows)
+
+    async def get_kline(self):
+        """新しい足を取得し、未反映の足だけでRSI/ATR%を逐次更新"""
+        await self.fetch_new_bars()
+        bars = self.new_bars()
+        rsi, atr = self.update_indicator(bars)
+        if len(bars):
+            latest = pd.to_datetime(int(bars['timestamp'].iloc[-1]), unit='ms', utc=True) + pd.Timedelta(hours=9)
+            print(f"{self.symbol} {latest:%Y-%m-%d %H:%M} RSI: {rsi:.2f} ATR: {atr:.3f}%")
+        return rsi, atr
+
+    def new_bars(self) -> pd.DataFrame:
+        """インジケーターに未反映の足（確定済みの最終足より後）をストアから取得"""
+        records = self.store.read(self.symbol, self.interval)
+        last = self.indicator.last_timestamp
+        if last is not None:
+            records = records[int(np.searchsorted(records['timestamp'], last, side='right')):]
+        return pd.DataFrame(np.array(records), columns=KLINE_COLUMNS)
+
+    async def fetch_page(self, start:int, end:int, limiter:HostLimiter=None, limit:int=1000):
+        """指定期間[start, end]の足を1ページ取得"""
+        url = f"{self.base_url}/v5/market/kline"
+        params = {
+            'category': "linear",
+            'symbol': self.symbol,
+            'interval': self.interval,
+            'start': str(start),
+            'end': str(end),
+            'limit': str(limit),
+        }
+        # レート制限・再試行は共通処理に任せる
+        data = await request_json(self.client, "GET", url, params=params, limiter=limiter)
+        if data.get('retCode', 0) != 0:
+            raise RuntimeError(f"{self.symbol} {start}-{end} kline取得エラー: {data.get('retMsg')}")
+        return data.get('result', {}).get('list', [])
+
+    async def backfill(self, start:int, end:int, limiter:HostLimiter=None, limit:int=1000, max_concurrent:int=10, save:bool=True):
+        """過去の足を期間ごとのページに分けて並列取得し、重複排除・時系列順で返す"""
+        limiter = limiter if limiter is not None else get_limiter(self.base_url)
+        step = INTERVAL_MS[self.interval]
+        end = end - end % step
+
+        # 新しい方から過去へ向かって期間を区切る
+        windows = []
+        page_end = end
+        while page_end >= start:
+            page_start = max(start, page_end - (limit - 1) * step)
+            windows.append((page_start, page_end))
+            page_end = page_start - step
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+        async def fetch_with_semaphore(window):
+            async with semaphore:
+                return await self.fetch_page(*window, limiter=limiter, limit=limit)
+        pages = await asyncio.gather(*(fetch_with_semaphore(w) for w in windows))
+
+        rows = [(int(row[0]), *map(float, row[1:7])) for page in pages for row in page]
+        df = pd.DataFrame(rows, columns=KLINE_COLUMNS)
+        df = df.drop_duplicates('timestamp', keep='last').sort_values('timestamp').reset_index(drop=True)
+        if save:
+            self.store.merge(self.symbol, self.interval, df.to_records(index=False))
         return df
 
-async def run_task(symbol, client:pybotters.Client):
-    bot = kline(symbol, client)
-    await bot.get_kline()
+    def update_indicator(self, df:pd.DataFrame, now_ms:int=None):
+        """確定足だけを古い順にインジケーターへ反映し、形成中の足は暫定値として (RSI, ATR%) を返す
+
+        形成中の足は取得のたびに値が変わるので確定するまで状態に入れない。
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        bars = df.sort_values("timestamp")
+        closed = bars["timestamp"] + INTERVAL_MS[self.interval] <= now_ms
+        confirmed = bars[closed]
+        last = self.indicator.last_timestamp
+        if last is not None:
+            confirmed = confirmed[confirmed["timestamp"] > last]
+        for row in confirmed.itertuples(index=False):
+            self.indicator.update(row.high, row.low, row.close, timestamp=int(row.timestamp))
+
+        forming = bars[~closed]
+        if len(forming):
+            row = forming.iloc[-1]
+            return self.indicator.provisional(row.high, row.low, row.close)
+        return self.indicator.rsi, self.indicator.atr
+
+async def run_task(bot:kline, poll_interval:float=60):
+    """同じkline（インジケーターの状態）を使い回して定期的に新しい足だけを反映"""
+    while True:
+        try:
+            await bot.get_kline()
+        except Exception as e:
+            print(f"{bot.symbol} 更新エラー: {e}")
+        await asyncio.sleep(poll_interval)
+
+async def backfill_symbols(symbols, client:pybotters.Client, start:int, end:int, interval:str="30", rate:float=None, store:KlineStore=None):
+    """複数銘柄の過去足をまとめて取得（レート制限は全銘柄で共有）"""
+    store = store if store is not None else KlineStore()
+    # rate未指定の場合はBybitの共有リミッターを使う
+    limiter = HostLimiter("api.bybit.com", rate=rate, burst=rate) if rate else get_limiter("api.bybit.com")
+    bots = [kline(symbol, client, store, interval) for symbol in symbols]
+    frames = await asyncio.gather(*(bot.backfill(start, end, limiter=limiter) for bot in bots))
+    return dict(zip(symbols, frames))
 
 async def main():
     symbols = ['BTCUSDT', 'ETHUSDT']
+    store = KlineStore()
     async with pybotters.Client() as client:
-        await asyncio.gather(*(run_task(symbol, client) for symbol in symbols))
+        # 銘柄ごとにklineを1つだけ作り、インジケーターの状態をポーリング間で引き継ぐ
+        bots = [kline(symbol, client, store) for symbol in symbols]
+        await asyncio.gather(*(run_task(bot) for bot in bots))
 
 if __name__ == '__main__':
     asyncio.run(main())
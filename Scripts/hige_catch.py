@@ -10,13 +10,31 @@ import time
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
+import numpy as np
 import pybotters
 import aiohttp
 
+from discord_notifier import DiscordNotifier
+from http_limiter import request_json
+from market_log import record_from_env
+from metrics import METRICS
+
 
 class BitgetPumpDetector:
-    def __init__(self, discord_webhook_url: str, api_key: str = "", api_secret: str = "", passphrase: str = ""):
+    def __init__(self, discord_webhook_url: str, api_key: str = "", api_secret: str = "", passphrase: str = "",
+                 state_path: str = "bitget_state.json"):
         self.discord_webhook = discord_webhook_url
+        self.status_webhook = "https://discord.com/api/webhooks/1369503632650928148/lNMN5RzSRDTIYo2X4nTbMBlv4Rzg_HYR4PQY7shMnTnAhZv-xkbdVAdbI59JAslVa8cl"
+        
+        # Discord通知はキュー経由でバックグラウンド送信（同じ銘柄は5秒間まとめて上昇率の大きい方を通知）
+        self.max_alert_embeds = 50  # 1回の通知で送る最大銘柄数
+        self.notifier = DiscordNotifier(
+            discord_webhook_url,
+            format_alerts=self.format_pump_alerts,
+            merge=lambda old, new: new if new["price_change"] >= old["price_change"] else old,
+            coalesce_window=5.0,
+            spool_path="discord_spool.jsonl"
+        )
         
         # Bitget API認証情報（パブリックAPIのみ使用する場合は空でOK）
         self.apis = {
@@ -26,14 +44,40 @@ class BitgetPumpDetector:
         # パフォーマンス設定
         self.max_concurrent = 100  # 同時リクエスト数
         self.timeout_seconds = 3   # タイムアウト時間
+        
+        # 検出条件
+        self.price_threshold = 0.5   # 価格上昇率（+50%）
+        self.volume_threshold = 2.0  # ボリューム増加率（+200%）
+        
+        # スナップショットモード設定
+        self.snapshot_interval = 60        # ティッカー取得間隔（秒）
+        self.prefilter_ratio = 0.5         # 候補抽出の閾値（検出条件に対する割合）
+        self.snapshot_alerted = set()      # 通知済みの (シンボル, 足の時刻)
+        
+        # WebSocketモード設定
+        self.ws_url = "wss://ws.bitget.com/v2/ws/public"
+        self.ws_shard_size = 100           # 1接続あたりの購読数
+        self.ws_batch_size = 50            # 1メッセージあたりの購読数
+        self.ws_candles: Dict[tuple, Dict[str, List]] = {}  # (チャンネル, シンボル) → 現在/直前の足
+        self.ws_alerted = set()            # 通知済みの (チャンネル, シンボル, 足の時刻)
+        self.recorder = None               # 受信メッセージの記録先（market_log.MarketLogWriter）
+        
+        # 常駐モード設定
+        self.interval_ms = 15 * 60 * 1000  # 15分足
+        self.close_delay = 5               # 足確定後の待ち時間（秒）
+        self.symbol_ttl = 6 * 60 * 60      # シンボル一覧の再取得間隔（秒）
+        
+        # 常駐モードの状態（シンボル一覧・シンボルごとの直前の確定足）
+        self.state_path = state_path
+        self.symbols: List[str] = []
+        self.symbols_updated_at = 0.0
+        self.previous_candles: Dict[str, List] = {}
+        self.load_state()
     
     async def get_all_usdt_symbols(self, session) -> List[str]:
         """全USDTペアのシンボル一覧を取得"""
         try:
-            resp = await session.get(
-                "https://api.bitget.com/api/v2/spot/public/symbols"
-            )
-            data = await resp.json()
+            data = await request_json(session, "GET", "https://api.bitget.com/api/v2/spot/public/symbols")
             
             if data.get("code") == "00000":
                 symbols = []
@@ -52,35 +96,28 @@ class BitgetPumpDetector:
             print(f"Error getting symbols: {e}")
             return []
     
-    async def get_15m_candles_optimized(self, session, symbol: str) -> Optional[List[List]]:
-        """最適化された15分足データ取得"""
-        try:
-            params = {
-                "symbol": symbol,
-                "granularity": "15m",
-                "limit": 2
-            }
-            
-            # タイムアウトを短縮してレスポンス向上
-            timeout = aiohttp.ClientTimeout(total=5)
-            resp = await session.get(
-                "https://api.bitget.com/api/v2/spot/market/candles",
-                params=params,
-                timeout=timeout
-            )
-            data = await resp.json()
-            
-            if data.get("code") == "00000":
-                return data.get("data", [])
-            else:
-                return None
-                
-        except asyncio.TimeoutError:
-            print(f"Timeout for {symbol}")
-            return None
-        except Exception as e:
-            # エラーログを簡素化
-            return None
+    async def get_15m_candles_optimized(self, session, symbol: str, limit: int = 2, end_time: Optional[int] = None) -> Optional[List[List]]:
+        """最適化された15分足データ取得（レート制限・再試行付き、失敗時は例外）"""
+        params = {
+            "symbol": symbol,
+            "granularity": "15m",
+            "limit": limit
+        }
+        if end_time is not None:
+            params["endTime"] = end_time
+        
+        # タイムアウトを短縮してレスポンス向上
+        timeout = aiohttp.ClientTimeout(total=5)
+        data = await request_json(
+            session, "GET",
+            "https://api.bitget.com/api/v2/spot/market/candles",
+            params=params,
+            timeout=timeout
+        )
+        
+        if data.get("code") != "00000":
+            raise RuntimeError(f"API Error: {data.get('msg', 'Unknown error')}")
+        return data.get("data", [])
     
     async def process_all_symbols_concurrent(self, session, symbols: List[str], max_concurrent: int = 50) -> List[Dict]:
         """全シンボルを高速並列処理して急騰を検出"""
@@ -101,29 +138,34 @@ class BitgetPumpDetector:
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # 結果を処理
+        failed = 0
         for symbol, result in zip(symbols, results):
             if isinstance(result, dict) and result:
                 pumps.append(result)
             elif isinstance(result, Exception):
+                failed += 1
                 print(f"Error processing {symbol}: {result}")
         
         elapsed = time.time() - start_time
-        print(f"Completed {len(symbols)} symbols in {elapsed:.2f} seconds")
+        METRICS.observe("scan", elapsed, "bitget", "candles")
+        print(f"Completed {len(symbols)} symbols in {elapsed:.2f} seconds (failed: {failed})")
         
         return pumps
     
     async def analyze_single_symbol(self, session, symbol: str) -> Optional[Dict]:
-        """単一シンボルの高速分析と急騰判定"""
+        """単一シンボルの高速分析と急騰判定（取得失敗は呼び出し元に送出）"""
+        # 最新2本の15分足を取得
+        candles = await self.get_15m_candles_optimized(session, symbol)
+        if not candles or len(candles) < 2:
+            return None
+        
+        # データ解析を高速化
+        return self.evaluate_pump(symbol, candles[0], candles[1])
+    
+    @METRICS.timed("analyze", "bitget")
+    def evaluate_pump(self, symbol: str, current_candle: List, previous_candle: List) -> Optional[Dict]:
+        """2本の15分足を比較して急騰判定"""
         try:
-            # 最新2本の15分足を取得
-            candles = await self.get_15m_candles_optimized(session, symbol)
-            if not candles or len(candles) < 2:
-                return None
-            
-            # データ解析を高速化
-            current_candle = candles[0]
-            previous_candle = candles[1]
-            
             current_close = float(current_candle[4])
             previous_close = float(previous_candle[4])
             current_volume = float(current_candle[6])
@@ -137,7 +179,7 @@ class BitgetPumpDetector:
             volume_change = (current_volume - previous_volume) / previous_volume
             
             # 急騰条件チェックを最初に
-            if price_change >= 0.5 and volume_change >= 2.0:
+            if price_change >= self.price_threshold and volume_change >= self.volume_threshold:
                 return {
                     "symbol": symbol,
                     "price_change": price_change,
@@ -155,8 +197,8 @@ class BitgetPumpDetector:
             # エラーハンドリングを簡素化
             return None
     
-    async def send_status_notification(self, session, total_symbols: int, processed_symbols: int, execution_time: float) -> None:
-        """稼働状況をDiscordに通知"""
+    def send_status_notification(self, total_symbols: int, processed_symbols: int, execution_time: float) -> None:
+        """稼働状況をDiscordに通知（送信キューに積むだけ）"""
         embed = {
             "title": "📊 Bitget監視システム 稼働レポート",
             "color": 0x0099ff,  # 青色
@@ -197,29 +239,23 @@ class BitgetPumpDetector:
             "content": "ℹ️ **急騰銘柄なし** - システム正常稼働中",
             "embeds": [embed]
         }
-        
-        try:
-            async with session.post("https://discord.com/api/webhooks/1369503632650928148/lNMN5RzSRDTIYo2X4nTbMBlv4Rzg_HYR4PQY7shMnTnAhZv-xkbdVAdbI59JAslVa8cl", json=payload) as resp:
-                if resp.status == 204:
-                    print("Status notification sent to Discord")
-                else:
-                    print(f"Status notification failed: {resp.status}")
-        except Exception as e:
-            print(f"Failed to send status notification: {e}")
+        self.notifier.notify(payload, url=self.status_webhook)
     
-    async def send_discord_notification(self, session, pumps: List[Dict]) -> None:
-        """Discordに急騰通知送信"""
-        if not pumps:
-            return
-        
+    def send_discord_notification(self, pumps: List[Dict]) -> None:
+        """Discordに急騰通知送信（送信キューに積むだけで、検出処理は送信完了を待たない）"""
+        for pump in pumps:
+            self.notifier.alert(pump["symbol"], pump)
+    
+    def format_pump_alerts(self, pumps: List[Dict]):
+        """まとめた急騰通知を本文と埋め込みに整形（メッセージ分割は通知側で行う）"""
         # 価格上昇率でソート（降順）
-        pumps.sort(key=lambda x: x["price_change"], reverse=True)
+        pumps = sorted(pumps, key=lambda x: x["price_change"], reverse=True)
         
         # Embed形式でリッチな通知を作成
         embeds = []
         
-        # 最大10銘柄まで表示
-        for pump in pumps[:10]:
+        # 最大 max_alert_embeds 銘柄まで表示
+        for pump in pumps[:self.max_alert_embeds]:
             symbol = pump["symbol"]
             price_change_pct = pump["price_change"] * 100
             volume_change_pct = pump["volume_change"] * 100
@@ -258,27 +294,320 @@ class BitgetPumpDetector:
             }
             embeds.append(embed)
         
-        # Discord Webhook送信
-        payload = {
-            "content": f"🔥 **{len(pumps)}銘柄で急騰を検出！**（前15分足比較） 🔥",
-            "embeds": embeds
-        }
-        
+        return f"🔥 **{len(pumps)}銘柄で急騰を検出！**（前15分足比較） 🔥", embeds
+    
+    async def get_ticker_snapshot(self, session) -> Optional[Dict[str, np.ndarray]]:
+        """全シンボルのティッカーを1リクエストで取得し、シンボル順の配列にする"""
         try:
-            async with session.post(self.discord_webhook, json=payload) as resp:
-                if resp.status == 204:
-                    print(f"Discord notification sent for {len(pumps)} pumps")
-                else:
-                    print(f"Discord notification failed: {resp.status}")
+            data = await request_json(session, "GET", "https://api.bitget.com/api/v2/spot/market/tickers")
+            if data.get("code") != "00000":
+                print(f"API Error: {data.get('msg', 'Unknown error')}")
+                return None
+            
+            received_at = time.time()
+            rows = []
+            for ticker in data.get("data", []):
+                symbol = ticker.get("symbol", "")
+                if not symbol.endswith("USDT") or symbol == "USDT":
+                    continue
+                try:
+                    # ts（ティッカーの更新時刻、ミリ秒）がなければ受信時刻
+                    ts = float(ticker["ts"]) / 1000 if ticker.get("ts") else received_at
+                    rows.append((symbol, float(ticker["lastPr"]), float(ticker["open"]), float(ticker["quoteVolume"]), ts))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            rows.sort()
+            return {
+                "symbol": np.array([r[0] for r in rows]),
+                "last": np.array([r[1] for r in rows]),
+                "open": np.array([r[2] for r in rows]),
+                "quote_volume": np.array([r[3] for r in rows]),
+                "ts": np.array([r[4] for r in rows]),
+                "received_at": received_at
+            }
         except Exception as e:
-            print(f"Failed to send Discord notification: {e}")
+            print(f"Error getting tickers: {e}")
+            return None
+    
+    @METRICS.timed("analyze", "bitget")
+    def prefilter_snapshots(self, previous: Dict[str, np.ndarray], current: Dict[str, np.ndarray]) -> List[str]:
+        """連続する2つのスナップショットから価格・出来高の変化を一括計算し、急騰候補のシンボルを抽出"""
+        common, prev_idx, curr_idx = np.intersect1d(previous["symbol"], current["symbol"], return_indices=True)
+        prev_last = previous["last"][prev_idx]
+        curr_last = current["last"][curr_idx]
+        curr_open = current["open"][curr_idx]
+        prev_volume = previous["quote_volume"][prev_idx]
+        curr_volume = current["quote_volume"][curr_idx]
+        elapsed = current["ts"][curr_idx] - previous["ts"][prev_idx]
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # スナップショット間の価格変化と24時間始値からの変化
+            interval_change = np.where(prev_last > 0, curr_last / prev_last - 1, 0.0)
+            day_change = np.where(curr_open > 0, curr_last / curr_open - 1, 0.0)
+            # スナップショット間の出来高（24時間出来高の増分）のペースを24時間平均のペースと比較
+            # （これまで出来高のなかった銘柄は増えれば候補にする）
+            volume_pace = np.where((prev_volume > 0) & (elapsed > 0),
+                                   (curr_volume - prev_volume) / elapsed / (prev_volume / 86400),
+                                   np.where(curr_volume > prev_volume, np.inf, 0.0))
+        
+        # 検出条件より緩い閾値で候補を絞る（確定判定はローソク足で行う）
+        threshold = self.price_threshold * self.prefilter_ratio
+        volume_threshold = 1 + self.volume_threshold * self.prefilter_ratio
+        mask = ((interval_change >= threshold) | (day_change >= threshold)) & (volume_pace >= volume_threshold)
+        
+        # スナップショットにない（新規上場など）シンボルも候補に含める
+        new_symbols = np.setdiff1d(current["symbol"], previous["symbol"])
+        return common[mask].tolist() + new_symbols.tolist()
+    
+    def new_snapshot_pumps(self, pumps: List[Dict]) -> List[Dict]:
+        """未通知の急騰だけを返す（同じ足は形成中に何度候補になっても1回だけ通知）"""
+        pumps = [p for p in pumps if (p["symbol"], p["timestamp"]) not in self.snapshot_alerted]
+        self.snapshot_alerted.update((p["symbol"], p["timestamp"]) for p in pumps)
+        return pumps
+    
+    async def run_snapshot_mode(self) -> None:
+        """スナップショットモード: 全ティッカー1リクエストで候補を絞り、候補だけローソク足で判定"""
+        print(f"[{datetime.now()}] Starting ticker snapshot pump detection...")
+        previous = None
+        
+        async with pybotters.Client(apis=self.apis, trace_configs=[METRICS.trace_config()]) as client, self.notifier:
+            while True:
+                start_time = time.time()
+                current = await self.get_ticker_snapshot(client)
+                
+                if current is not None:
+                    if previous is not None:
+                        candidates = self.prefilter_snapshots(previous, current)
+                        print(f"[{datetime.now()}] {len(current['symbol'])} tickers, {len(candidates)} candidates")
+                        if candidates:
+                            pumps = await self.process_all_symbols_concurrent(client, candidates, max_concurrent=self.max_concurrent)
+                            pumps = self.new_snapshot_pumps(pumps)
+                            if pumps:
+                                self.report(pumps, candidates, time.time() - start_time)
+                    previous = current
+                
+                await asyncio.sleep(max(0.0, self.snapshot_interval - (time.time() - start_time)))
+    
+    @METRICS.timed("analyze", "bitget")
+    def on_candle_message(self, msg, ws=None) -> Optional[List[Dict]]:
+        """WebSocketのローソク足を反映し、更新のたびに急騰判定（新たに検出した急騰を返す）"""
+        if not isinstance(msg, dict) or "data" not in msg:
+            return None
+        arg = msg.get("arg", {})
+        channel = arg.get("channel", "")
+        symbol = arg.get("instId")
+        if not channel.startswith("candle") or not symbol:
+            return None
+        
+        state = self.ws_candles.setdefault((channel, symbol), {"current": None, "previous": None})
+        candles = sorted(msg["data"], key=lambda c: int(c[0]))
+        if msg.get("action") == "snapshot":
+            # 購読時に届く過去の足は判定せず、最新2本で状態を初期化（判定は以降のupdateで行う）
+            if candles:
+                state["current"] = candles[-1]
+                state["previous"] = candles[-2] if len(candles) > 1 else None
+            return []
+
+        pumps = []
+        for candle in candles:
+            current = state["current"]
+            if candle == current:
+                continue  # 変化のない足は判定しない
+            if current is None or int(candle[0]) == int(current[0]):
+                state["current"] = candle
+            elif int(candle[0]) > int(current[0]):
+                # 新しい足が始まったので現在の足を直前の足へ
+                state["previous"] = current
+                state["current"] = candle
+            else:
+                continue
+            
+            if state["previous"] is None:
+                continue
+            pump = self.evaluate_pump(symbol, state["current"], state["previous"])
+            key = (channel, symbol, int(state["current"][0]))
+            if pump and key not in self.ws_alerted:
+                self.ws_alerted.add(key)
+                pump["channel"] = channel
+                pumps.append(pump)
+        return pumps
+    
+    async def run_websocket_mode(self, channels=("candle15m",), duration: Optional[float] = None) -> None:
+        """WebSocketモード: 全USDTペアのローソク足を購読し、更新のたびに判定して即通知"""
+        print(f"[{datetime.now()}] Starting WebSocket pump detection ({', '.join(channels)})...")
+        
+        async with pybotters.Client(apis=self.apis, trace_configs=[METRICS.trace_config()]) as client, self.notifier:
+            symbols = await self.refresh_symbols(client)
+            if not symbols:
+                print("Failed to get symbols")
+                return
+            
+            def handler(msg, ws):
+                pumps = self.on_candle_message(msg, ws)
+                if pumps:
+                    for pump in pumps:
+                        print(f"🚀 {pump['symbol']} ({pump['channel']}): Price +{pump['price_change']*100:.1f}%, "
+                              f"Volume +{pump['volume_change']*100:.1f}%")
+                    # 通知はキューに積むだけで受信処理を止めない
+                    self.send_discord_notification(pumps)
+            
+            # 購読を接続ごとに分割（1接続あたり ws_shard_size 件）
+            args = [{"instType": "SPOT", "channel": channel, "instId": symbol}
+                    for symbol in symbols for channel in channels]
+            connections = []
+            for i in range(0, len(args), self.ws_shard_size):
+                shard = args[i:i + self.ws_shard_size]
+                messages = [{"op": "subscribe", "args": shard[j:j + self.ws_batch_size]}
+                            for j in range(0, len(shard), self.ws_batch_size)]
+                # 記録時は受信した文字列をJSON解析前にそのまま記録
+                recorder = self.recorder.ws_handler(self.ws_url) if self.recorder else None
+                connections.append(client.ws_connect(self.ws_url, send_json=messages, hdlr_str=recorder,
+                                                     hdlr_json=handler))
+            await asyncio.gather(*connections)
+            print(f"Subscribed {len(args)} channels over {len(connections)} connections")
+            
+            if duration is None:
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(duration)
+    
+    def load_state(self) -> None:
+        """前回の状態（シンボル一覧・直前の確定足）をディスクから読み込み"""
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.symbols = state.get("symbols", [])
+            self.symbols_updated_at = state.get("symbols_updated_at", 0.0)
+            self.previous_candles = state.get("previous_candles", {})
+        except (OSError, ValueError):
+            pass
+    
+    def save_state(self) -> None:
+        """状態をディスクに保存（一時ファイル経由で置換）"""
+        state = {
+            "symbols": self.symbols,
+            "symbols_updated_at": self.symbols_updated_at,
+            "previous_candles": self.previous_candles
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"Failed to save state: {e}")
+    
+    async def refresh_symbols(self, session) -> List[str]:
+        """シンボル一覧をTTL付きでキャッシュ"""
+        if not self.symbols or time.time() - self.symbols_updated_at > self.symbol_ttl:
+            symbols = await self.get_all_usdt_symbols(session)
+            if symbols:
+                self.symbols = symbols
+                self.symbols_updated_at = time.time()
+                # 上場廃止されたシンボルの状態を削除
+                listed = set(symbols)
+                self.previous_candles = {s: c for s, c in self.previous_candles.items() if s in listed}
+        return self.symbols
+    
+    async def analyze_closed_candle(self, session, symbol: str, close_time: int) -> Optional[Dict]:
+        """確定したばかりの足と保存済みの直前の足を比較"""
+        previous = self.previous_candles.get(symbol)
+        closed_open_time = close_time - self.interval_ms
+        
+        # 直前の足がなければ2本、あれば最新の確定足1本だけ取得
+        has_previous = previous is not None and int(previous[0]) == closed_open_time - self.interval_ms
+        candles = await self.get_15m_candles_optimized(
+            session, symbol, limit=1 if has_previous else 2, end_time=close_time - 1
+        )
+        if not candles:
+            return None
+        
+        # 未確定の足を除外して時刻順に並べる
+        candles = sorted((c for c in candles if int(c[0]) < close_time), key=lambda c: int(c[0]))
+        if not candles or int(candles[-1][0]) != closed_open_time:
+            return None
+        current = candles[-1]
+        if not has_previous:
+            previous = candles[-2] if len(candles) >= 2 else None
+        
+        self.previous_candles[symbol] = current
+        if previous is None:
+            return None
+        return self.evaluate_pump(symbol, current, previous)
+    
+    async def process_closed_candles(self, session, symbols: List[str], close_time: int, max_concurrent: int = 50) -> List[Dict]:
+        """全シンボルの確定足を並列処理して急騰を検出"""
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def analyze_with_semaphore(symbol):
+            async with semaphore:
+                return await self.analyze_closed_candle(session, symbol, close_time)
+        
+        start_time = time.time()
+        results = await asyncio.gather(*(analyze_with_semaphore(s) for s in symbols), return_exceptions=True)
+        
+        pumps = []
+        failed = 0
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, dict) and result:
+                pumps.append(result)
+            elif isinstance(result, Exception):
+                failed += 1
+                print(f"Error processing {symbol}: {result}")
+        
+        elapsed = time.time() - start_time
+        METRICS.observe("scan", elapsed, "bitget", "closed_candles")
+        print(f"Completed {len(symbols)} symbols in {elapsed:.2f} seconds (failed: {failed})")
+        return pumps
+    
+    def next_close_time(self, now_ms: Optional[int] = None) -> int:
+        """次の15分足の確定時刻（ミリ秒）"""
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return (now_ms // self.interval_ms + 1) * self.interval_ms
+    
+    def report(self, pumps: List[Dict], symbols: List[str], execution_time: float) -> None:
+        """検出結果を表示してDiscordに通知"""
+        if pumps:
+            print(f"🚀 Detected {len(pumps)} pumps (vs previous 15m candle)!")
+            for pump in pumps:
+                print(f"  {pump['symbol']}: Price +{pump['price_change']*100:.1f}%, "
+                      f"Volume +{pump['volume_change']*100:.1f}%")
+            
+            # 急騰通知送信
+            self.send_discord_notification(pumps)
+        else:
+            print("No significant pumps detected vs previous 15m candle")
+            
+            # 稼働状況通知送信（急騰なしの場合）
+            processed_count = len([s for s in symbols if s])  # 処理された銘柄数
+            self.send_status_notification(len(symbols), processed_count, execution_time)
+    
+    async def run_forever(self) -> None:
+        """常駐モード: 15分足の確定に合わせて確定足だけを取得して判定"""
+        print(f"[{datetime.now()}] Starting 15m pump detection daemon...")
+        
+        async with pybotters.Client(apis=self.apis, trace_configs=[METRICS.trace_config()]) as client, self.notifier:
+            while True:
+                close_time = self.next_close_time()
+                await asyncio.sleep(max(0.0, close_time / 1000 - time.time()) + self.close_delay)
+                
+                start_time = time.time()
+                symbols = await self.refresh_symbols(client)
+                if not symbols:
+                    print("Failed to get symbols")
+                    continue
+                
+                pumps = await self.process_closed_candles(client, symbols, close_time, max_concurrent=self.max_concurrent)
+                self.save_state()
+                self.report(pumps, symbols, time.time() - start_time)
+                print(f"[{datetime.now()}] Cycle for {datetime.fromtimestamp(close_time / 1000)} completed\n")
     
     async def run(self) -> None:
         """メイン実行処理"""
         print(f"[{datetime.now()}] Starting simplified 15m pump detection...")
         start_time = time.time()
         
-        async with pybotters.Client(apis=self.apis) as client:
+        async with pybotters.Client(apis=self.apis, trace_configs=[METRICS.trace_config()]) as client, self.notifier:
             # 全USDTペアのシンボル取得
             symbols = await self.get_all_usdt_symbols(client)
             if not symbols:
@@ -292,22 +621,12 @@ class BitgetPumpDetector:
             
             execution_time = time.time() - start_time
             
-            if pumps:
-                print(f"🚀 Detected {len(pumps)} pumps (vs previous 15m candle)!")
-                for pump in pumps:
-                    print(f"  {pump['symbol']}: Price +{pump['price_change']*100:.1f}%, "
-                          f"Volume +{pump['volume_change']*100:.1f}%")
-                
-                # 急騰通知送信
-                await self.send_discord_notification(client, pumps)
-            else:
-                print("No significant pumps detected vs previous 15m candle")
-                
-                # 稼働状況通知送信（急騰なしの場合）
-                processed_count = len([s for s in symbols if s])  # 処理された銘柄数
-                await self.send_status_notification(client, len(symbols), processed_count, execution_time)
+            self.report(pumps, symbols, execution_time)
             
             print(f"[{datetime.now()}] Simplified pump detection completed\n")
+        
+        # 1回実行（cron）では終了時に段階ごとの所要時間を表示
+        METRICS.print_summary()
 
 
 async def main():
@@ -324,9 +643,27 @@ async def main():
     api_secret = os.getenv("BITGET_API_SECRET", "")
     passphrase = os.getenv("BITGET_PASSPHRASE", "")
     
+    # 段階ごとの所要時間（Prometheus形式: http://127.0.0.1:9108/metrics、METRICS_PORT=0で無効）
+    metrics_port = int(os.getenv("METRICS_PORT", "9108"))
+    if metrics_port:
+        METRICS.serve(metrics_port)
+    METRICS.start_summary_log(float(os.getenv("METRICS_SUMMARY_INTERVAL", "300")))
+    
     # 検出器を初期化して実行
     detector = BitgetPumpDetector(discord_webhook_url, api_key, api_secret, passphrase)
-    await detector.run()
+    # MARKET_LOG=パス で受信した応答・メッセージを記録（python market_log.py replay で再生）
+    detector.recorder = record_from_env()
+    if os.getenv("BITGET_DAEMON") == "1":
+        # 常駐モード（cronの代わりに15分足の確定に合わせて実行）
+        await detector.run_forever()
+    elif os.getenv("BITGET_WEBSOCKET") == "1":
+        # WebSocketモード（足の更新ごとに判定）
+        await detector.run_websocket_mode()
+    elif os.getenv("BITGET_SNAPSHOT") == "1":
+        # スナップショットモード（全ティッカーで候補を絞ってから判定）
+        await detector.run_snapshot_mode()
+    else:
+        await detector.run()
 
 
 if __name__ == "__main__":
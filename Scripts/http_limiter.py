@@ -0,0 +1,367 @@
+"""
+HTTPレート制限・リトライ共通処理
+ホストごとのトークンバケットで秒間リクエスト数を守り、429やRetry-After・レート制限ヘッダーに応じて
+同時実行数をAIMD（成功で加算、制限で半減）で調整する。失敗時はジッター付き指数バックオフで再試行する。
+各リクエストの待ち時間（wait）・通信（fetch）・JSON解析（parse）はホスト・パス別に metrics へ記録する。
+market_log の記録（RECORDER）・再生（PLAYBACK）もここで差し込む。
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from metrics import METRICS
+
+# 再試行するHTTPステータス
+RETRY_STATUSES = {418, 429, 500, 502, 503, 504}
+# レート制限を示すHTTPステータス
+THROTTLE_STATUSES = {418, 429}
+
+# ホストごとの設定（秒間リクエスト数、バースト、最大同時実行数）
+HOST_LIMITS = {
+    # Bybit V5: IP単位で5秒間に600リクエスト（https://bybit-exchange.github.io/docs/v5/rate-limit）。余裕を見て半分以下
+    "api.bybit.com": {"rate": 50, "burst": 50, "max_concurrent": 20},
+    # Bitget v2 spot market: IP単位で20回/秒（https://www.bitget.com/api-doc/spot/market/Get-Tickers）
+    "api.bitget.com": {"rate": 20, "burst": 20, "max_concurrent": 20},
+    # OKX market/tickers・market/books: IP単位で2秒間に20回（https://www.okx.com/docs-v5/en/#order-book-trading-market-data）
+    "www.okx.com": {"rate": 10, "burst": 20, "max_concurrent": 10},
+    # Kraken public: 概ね1回/秒（https://docs.kraken.com/api/docs/guides/spot-rest-ratelimits）
+    "api.kraken.com": {"rate": 1, "burst": 3, "max_concurrent": 2},
+    # Coincheck public: 数値の上限は非公開（https://coincheck.com/ja/documents/exchange/api）。
+    # 一括ティッカーがなくペアごとに取得するので、1回のスキャン（26ペア）をバーストで一度に送れるようにし、
+    # 継続レートは5回/秒に抑える（429が返ればAIMDで同時実行数を下げる）
+    "coincheck.com": {"rate": 5, "burst": 30, "max_concurrent": 10},
+    # Blockfrost: 10回/秒、バースト500（https://blockfrost.dev/overview/plans-and-billing）
+    "cardano-mainnet.blockfrost.io": {"rate": 10, "burst": 500, "max_concurrent": 20},
+    # Discord: 上限はレスポンスヘッダーで通知（Webhookは概ね2秒に5回、https://discord.com/developers/docs/topics/rate-limits）
+    "discord.com": {"rate": 1, "burst": 5, "max_concurrent": 1},
+}
+DEFAULT_LIMITS = {"rate": 10, "burst": 10, "max_concurrent": 10}
+
+# URLの置き換え（元のオリジン → 置き換え先）。ベンチマーク・検証で記録済み応答の疑似サーバーへ向ける
+URL_OVERRIDES: Dict[str, str] = {}
+
+# 市場データの記録・再生（market_log）。RECORDER はGETの応答本体を受信時刻付きで記録し、
+# PLAYBACK は記録した応答を通信の代わりに返す（どちらも元のURL・paramsで照合）
+RECORDER = None
+PLAYBACK = None
+
+
+class RetryError(Exception):
+    """再試行しても成功しなかった"""
+
+
+class HostLimiter:
+    """1ホスト分のトークンバケット＋AIMD同時実行数制御（スレッド・asyncio両対応）"""
+
+    def __init__(self, host: str, rate: float = 10, burst: float = 10, max_concurrent: int = 10, min_concurrent: int = 1):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.min_concurrent = min_concurrent
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.concurrency = float(max_concurrent)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        # 同時実行数の上限で待っているスレッド・タスク（release() で空いた枠の数だけ起こす）
+        self.slot_freed = threading.Condition(self.lock)
+        self.async_waiters = deque()  # (イベントループ, Future)
+
+    def try_acquire(self) -> Optional[float]:
+        """取得できれば0、できなければ待つべき秒数（同時実行数の上限ならNone: release() まで待つ）"""
+        with self.lock:
+            return self._try_acquire()
+
+    def _try_acquire(self) -> Optional[float]:
+        now = time.monotonic()
+        if self.paused_until > now:
+            return self.paused_until - now
+        if self.in_flight >= int(self.concurrency):
+            return None
+
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.lock:
+                wait = self._try_acquire()
+                if wait is None:
+                    waiter = loop.create_future()
+                    self.async_waiters.append((loop, waiter))
+            if wait is None:
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    with self.lock:
+                        if (loop, waiter) in self.async_waiters:
+                            self.async_waiters.remove((loop, waiter))
+                        elif not waiter.cancelled():
+                            # 起こされた後に取り消されたら、空いた枠を次の待機者へ回す
+                            self._wake(1)
+                    raise
+            elif wait <= 0:
+                return
+            else:
+                await asyncio.sleep(wait)
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                wait = self._try_acquire()
+                if wait is None:
+                    self.slot_freed.wait()
+                    continue
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _wake(self, count: int) -> None:
+        """空いた枠の数だけ待機中のスレッド・タスクを起こす（self.lock を保持して呼ぶ）"""
+        self.slot_freed.notify(count)
+        while count > 0 and self.async_waiters:
+            loop, waiter = self.async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._resume, waiter)
+            except RuntimeError:  # イベントループが終了済み
+                continue
+            count -= 1
+
+    def _resume(self, waiter) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+        elif waiter.cancelled():
+            # 起こす前に取り消されていたら次の待機者へ
+            with self.lock:
+                self._wake(1)
+
+    def release(self, status: Optional[int] = None, headers=None) -> None:
+        """リクエスト完了を通知し、結果に応じて同時実行数・一時停止を調整"""
+        with self.lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if status in THROTTLE_STATUSES:
+                # 乗算的減少
+                self.concurrency = max(self.min_concurrent, self.concurrency / 2)
+                self.tokens = 0.0
+                retry_after = parse_retry_after(headers)
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif status is not None and status < 400:
+                # 加算的増加（1往復あたり約+1）
+                self.concurrency = min(self.max_concurrent, self.concurrency + 1 / self.concurrency)
+
+            # 残り回数が0ならリセットまで停止
+            reset_after = parse_rate_limit_reset(headers)
+            if reset_after is not None:
+                self.paused_until = max(self.paused_until, now + reset_after)
+
+            if int(self.concurrency) > self.in_flight:
+                self._wake(int(self.concurrency) - self.in_flight)
+
+
+_limiters: Dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(url_or_host: str) -> HostLimiter:
+    """ホストごとの共有リミッターを取得"""
+    host = urlparse(url_or_host).hostname or url_or_host
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = HostLimiter(host, **HOST_LIMITS.get(host, DEFAULT_LIMITS))
+        return _limiters[host]
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Retry-Afterヘッダー（秒またはHTTP日付）を秒数に変換"""
+    if not headers:
+        return None
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def parse_rate_limit_reset(headers) -> Optional[float]:
+    """残り回数0を示すレート制限ヘッダーがあれば、リセットまでの秒数を返す"""
+    if not headers:
+        return None
+    remaining = headers.get("X-RateLimit-Remaining") or headers.get("X-Bapi-Limit-Status")
+    if remaining is None:
+        return None
+    try:
+        if float(remaining) > 0:
+            return None
+    except ValueError:
+        return None
+
+    reset_after = headers.get("X-RateLimit-Reset-After")
+    if reset_after is not None:
+        try:
+            return max(0.0, float(reset_after))
+        except ValueError:
+            return None
+
+    reset = headers.get("X-RateLimit-Reset") or headers.get("X-Bapi-Limit-Reset-Timestamp")
+    if reset is None:
+        return 1.0
+    try:
+        reset = float(reset)
+    except ValueError:
+        return 1.0
+    if reset > 1e12:  # ミリ秒のUNIX時刻
+        return max(0.0, reset / 1000 - time.time())
+    if reset > 1e9:  # 秒のUNIX時刻
+        return max(0.0, reset - time.time())
+    return max(0.0, reset)  # 秒数
+
+def resolve_url(url: str) -> str:
+    """URL_OVERRIDES に一致するオリジンを置き換え"""
+    for origin, replacement in URL_OVERRIDES.items():
+        if url.startswith(origin):
+            return replacement + url[len(origin):]
+    return url
+
+def backoff_delay(attempt: int, headers=None, base_delay: float = 0.5, max_delay: float = 30.0) -> float:
+    """ジッター付き指数バックオフ（Retry-Afterがあればそれ以上待つ）"""
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    retry_after = parse_retry_after(headers)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay))
+    return delay
+
+
+async def request_json(session, method: str, url: str, *, params=None, json_body=None, retries: int = 4,
+                       base_delay: float = 0.5, max_delay: float = 30.0, limiter: Optional[HostLimiter] = None,
+                       **kwargs):
+    """レート制限・再試行付きの非同期リクエスト（aiohttp.ClientSession / pybotters.Client）
+
+    再試行対象外のステータスはボディをJSONとして返す（取引所のエラーコードは呼び出し側で判定）。
+    """
+    if PLAYBACK is not None and method == "GET":
+        return await PLAYBACK.request_async(method, url, params, retries)
+    requested_url = url
+    url = resolve_url(url)
+    limiter = limiter or get_limiter(url)
+    endpoint = urlparse(url).path
+    last_error = None
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        await limiter.acquire_async()
+        acquired = time.perf_counter()
+        METRICS.observe("wait", acquired - start, limiter.host, endpoint)
+        status, headers, body = None, None, b""
+        try:
+            async with session.request(method, url, params=params, json=json_body, **kwargs) as response:
+                status, headers = response.status, response.headers
+                body = await response.read()
+            if RECORDER is not None and method == "GET":
+                RECORDER.record_http(method, requested_url, params, status, body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            last_error = e
+        finally:
+            limiter.release(status, headers)
+            METRICS.observe("fetch", time.perf_counter() - acquired, limiter.host, endpoint,
+                            error=status is None or status >= 400)
+
+        if status is not None and status not in RETRY_STATUSES:
+            with METRICS.timer("parse", limiter.host, endpoint):
+                return json.loads(body) if body else None
+        if status is not None:
+            last_error = f"HTTP {status}"
+        if attempt < retries:
+            await asyncio.sleep(backoff_delay(attempt, headers, base_delay, max_delay))
+    raise RetryError(f"{method} {url} failed after {retries + 1} attempts: {last_error}")
+
+def request_json_sync(method: str, url: str, *, params=None, json_body=None, retries: int = 4,
+                      base_delay: float = 0.5, max_delay: float = 30.0, limiter: Optional[HostLimiter] = None,
+                      timeout: float = 10, session=None):
+    """レート制限・再試行付きの同期リクエスト（requests）"""
+    import requests
+
+    if PLAYBACK is not None and method == "GET":
+        return PLAYBACK.request(method, url, params, retries)
+    session = session or requests
+    requested_url = url
+    url = resolve_url(url)
+    limiter = limiter or get_limiter(url)
+    endpoint = urlparse(url).path
+    last_error = None
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        limiter.acquire()
+        acquired = time.perf_counter()
+        METRICS.observe("wait", acquired - start, limiter.host, endpoint)
+        status, headers, response = None, None, None
+        try:
+            response = session.request(method, url, params=params, json=json_body, timeout=timeout)
+            status, headers = response.status_code, response.headers
+            if RECORDER is not None and method == "GET":
+                RECORDER.record_http(method, requested_url, params, status, response.content)
+        except requests.RequestException as e:
+            last_error = e
+        finally:
+            limiter.release(status, headers)
+            METRICS.observe("fetch", time.perf_counter() - acquired, limiter.host, endpoint,
+                            error=status is None or status >= 400)
+
+        if status is not None and status not in RETRY_STATUSES:
+            with METRICS.timer("parse", limiter.host, endpoint):
+                return response.json() if response.content else None
+        if status is not None:
+            last_error = f"HTTP {status}"
+        if attempt < retries:
+            time.sleep(backoff_delay(attempt, headers, base_delay, max_delay))
+    raise RetryError(f"{method} {url} failed after {retries + 1} attempts: {last_error}")
+
+def call_with_retry(limiter: HostLimiter, func: Callable, *args, status_of: Callable = None, retries: int = 4,
+                    base_delay: float = 0.5, max_delay: float = 30.0, **kwargs):
+    """SDK呼び出し（Blockfrostなど）をレート制限・再試行付きで実行
+
+    status_of(例外) が再試行対象のステータスを返した場合のみ再試行し、それ以外の例外はそのまま送出する。
+    """
+    status_of = status_of or (lambda e: getattr(e, "status_code", None))
+    endpoint = getattr(func, "__name__", "")
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        limiter.acquire()
+        acquired = time.perf_counter()
+        METRICS.observe("wait", acquired - start, limiter.host, endpoint)
+        status = 200
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            status = status_of(e)
+            if status not in RETRY_STATUSES or attempt >= retries:
+                raise
+        finally:
+            limiter.release(status)
+            # SDK呼び出しは通信とJSON解析を分けられないので fetch にまとめて記録
+            METRICS.observe("fetch", time.perf_counter() - acquired, limiter.host, endpoint,
+                            error=status is None or status >= 400)
+        time.sleep(backoff_delay(attempt, None, base_delay, max_delay))
@@ -0,0 +1,87 @@
+"""
+ローソク足ローカルストア
+銘柄・時間足ごとに固定長レコードのバイナリファイルへ追記し、np.memmapで読み出す
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+KLINE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),  # ミリ秒（UTC）
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('quote_volume', '<f8'),
+])
+KLINE_COLUMNS = list(KLINE_DTYPE.names)
+
+
+class KlineStore:
+    def __init__(self, root: str = "kline_data"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, symbol: str, interval: str) -> str:
+        """保存先ファイルパス"""
+        return os.path.join(self.root, f"{symbol}_{interval}.bin")
+
+    def read(self, symbol: str, interval: str) -> np.ndarray:
+        """保存済みの足をメモリマップで取得（古い順）"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) < KLINE_DTYPE.itemsize:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        return np.memmap(path, dtype=KLINE_DTYPE, mode='r')
+
+    def last_timestamp(self, symbol: str, interval: str):
+        """最後に保存した足のタイムスタンプ（ミリ秒）、なければNone"""
+        records = self.read(symbol, interval)
+        if len(records) == 0:
+            return None
+        return int(records['timestamp'][-1])
+
+    def append(self, symbol: str, interval: str, rows) -> int:
+        """足を追記（既存の同時刻以降の足は確定前として上書き）、追記件数を返す"""
+        new = np.array(
+            [tuple(row) for row in rows] if not isinstance(rows, np.ndarray) else rows,
+            dtype=KLINE_DTYPE,
+        )
+        if len(new) == 0:
+            return 0
+        new = np.sort(new, order='timestamp')
+        # 同一タイムスタンプは後の値を採用
+        _, last_idx = np.unique(new['timestamp'][::-1], return_index=True)
+        new = new[len(new) - 1 - last_idx]
+
+        path = self.path(symbol, interval)
+        existing = self.read(symbol, interval)
+        keep = int(np.searchsorted(existing['timestamp'], new['timestamp'][0], side='left')) if len(existing) else 0
+        del existing
+
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.truncate(keep * KLINE_DTYPE.itemsize)
+            f.seek(keep * KLINE_DTYPE.itemsize)
+            f.write(new.tobytes())
+        return len(new)
+
+    def merge(self, symbol: str, interval: str, rows) -> int:
+        """過去分を含む足を統合して書き直す（重複は新しい値を採用）、保存件数を返す"""
+        new = np.array(
+            [tuple(row) for row in rows] if not isinstance(rows, np.ndarray) else rows,
+            dtype=KLINE_DTYPE,
+        )
+        merged = np.concatenate([new, np.array(self.read(symbol, interval))])
+        # 先に並べた新しい値を優先して重複排除（np.uniqueは最初の出現位置を返す）
+        _, first_idx = np.unique(merged['timestamp'], return_index=True)
+        merged = merged[first_idx]
+
+        with open(self.path(symbol, interval), 'wb') as f:
+            f.write(merged.tobytes())
+        return len(merged)
+
+    def load(self, symbol: str, interval: str) -> pd.DataFrame:
+        """保存済みの足をDataFrameで取得"""
+        return pd.DataFrame(np.array(self.read(symbol, interval)), columns=KLINE_COLUMNS)
@@ -0,0 +1,564 @@
+"""
+市場データの記録と再生
+http_limiter 経由で受信したHTTP応答の生バイト列とWebSocketメッセージを、受信時刻付きで追記専用の圧縮ログに記録し、
+同じバイト列を取得処理へ戻して再生する（1倍速・N倍速・最大速度）。最大速度の再生は解析・検出処理全体のスループット計測を兼ねる。
+
+ログ形式（<ログ>）: フレームの連続。フレームヘッダーは非圧縮、本体はzstd（zstandard未導入ならzlib）で圧縮
+    フレームヘッダー: magic "MKLG" / 版 / コーデック / 本体長 / レコード数 / 先頭・末尾の受信時刻(ns)
+    レコード: 受信時刻(ns) / 種別(HTTP・WS) / HTTPステータス / ソース長 / 本体長 / ソース / 本体
+    ソースは "GET https://host/path?ソートしたクエリ"（HTTP）または接続先URL（WebSocket）
+時刻インデックス（<ログ>.idx）: フレームごとの (先頭時刻, 末尾時刻, オフセット)。なければヘッダーを辿って再構築する
+
+使い方:
+    MARKET_LOG=market.mklg python hige_catch.py            # 記録（get_ticker.py・arbitrage_stream.py も同様）
+    python market_log.py info market.mklg
+    python market_log.py dump market.mklg --since 2026-10-17T09:00 --source coincheck
+    python market_log.py replay market.mklg --target hige-ws --speed max
+    python market_log.py replay market.mklg --target arbitrage --speed 10
+"""
+
+import argparse
+import asyncio
+import atexit
+import bisect
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlsplit, urlunsplit
+
+import http_limiter
+from metrics import METRICS
+
+try:
+    import zstandard
+except ImportError:  # zlibで圧縮（読み込み時はフレームのコーデックで判別）
+    zstandard = None
+
+MAGIC = b"MKLG"
+VERSION = 1
+# magic, 版, コーデック, 本体長, レコード数, 先頭時刻(ns), 末尾時刻(ns)
+FRAME_HEADER = struct.Struct("<4sBBIIqq")
+# 受信時刻(ns), 種別, HTTPステータス, ソース長, 本体長
+RECORD_HEADER = struct.Struct("<qBHHI")
+# 先頭時刻(ns), 末尾時刻(ns), フレームのオフセット
+INDEX_ENTRY = struct.Struct("<qqQ")
+
+CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD = 0, 1, 2
+CODEC_NAMES = {CODEC_NONE: "none", CODEC_ZLIB: "zlib", CODEC_ZSTD: "zstd"}
+
+# レコードの種別
+HTTP, WS = 0, 1
+KIND_NAMES = {HTTP: "http", WS: "ws"}
+
+Record = Tuple[int, int, int, str, bytes]  # (受信時刻(ns), 種別, HTTPステータス, ソース, 本体)
+
+
+class ReplayMiss(Exception):
+    """再生中のリクエストに対応する記録がない"""
+
+
+def request_key(method: str, url: str, params=None) -> str:
+    """HTTPレコードのソース（URLに含まれるクエリとparamsをまとめてソート）"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        items = params.items() if hasattr(params, "items") else params
+        query += [(str(k), str(v)) for k, v in items]
+    base = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+    if not query:
+        return f"{method.upper()} {base}"
+    return f"{method.upper()} {base}?{urlencode(sorted(query))}"
+
+def index_path(path: str) -> str:
+    return f"{path}.idx"
+
+def compress(data: bytes, codec: int, level: int = 3) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, level)
+    return data
+
+def decompress(data: bytes, codec: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstdで圧縮されたフレームの読み込みには zstandard が必要です（pip install zstandard）")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return data
+
+def scan_frames(f, offset: int = 0) -> Tuple[List[Tuple[int, int, int]], int]:
+    """offsetからフレームヘッダーを辿り、(インデックス, 完全なフレームの終端) を返す（書きかけのフレームで止まる）"""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    entries = []
+    while offset + FRAME_HEADER.size <= size:
+        f.seek(offset)
+        magic, version, codec, length, count, first_ns, last_ns = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+        if magic != MAGIC or offset + FRAME_HEADER.size + length > size:
+            break
+        entries.append((first_ns, last_ns, offset))
+        offset += FRAME_HEADER.size + length
+    return entries, offset
+
+def read_index(path: str) -> List[Tuple[int, int, int]]:
+    try:
+        with open(index_path(path), "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return [INDEX_ENTRY.unpack_from(data, i) for i in range(0, usable, INDEX_ENTRY.size)]
+
+def write_index(path: str, entries) -> None:
+    with open(index_path(path), "wb") as f:
+        for entry in entries:
+            f.write(INDEX_ENTRY.pack(*entry))
+
+def decode_records(payload: bytes) -> Iterator[Record]:
+    view = memoryview(payload)
+    offset = 0
+    while offset < len(view):
+        ts_ns, kind, status, source_len, body_len = RECORD_HEADER.unpack_from(view, offset)
+        offset += RECORD_HEADER.size
+        source = bytes(view[offset:offset + source_len]).decode("utf-8")
+        offset += source_len
+        body = bytes(view[offset:offset + body_len])
+        offset += body_len
+        yield ts_ns, kind, status, source, body
+
+
+class MarketLogWriter:
+    """追記専用の記録ログ（スレッド・asyncio両対応）
+
+    レコードはメモリに溜め、frame_bytes を超えるか前回の書き出しから flush_interval 秒経つと1フレームとして圧縮して追記する。
+    再オープン時は末尾の書きかけフレームを切り詰めてから追記する。
+    """
+
+    def __init__(self, path: str, frame_bytes: int = 1 << 20, flush_interval: float = 1.0, level: int = 3):
+        self.path = path
+        self.frame_bytes = frame_bytes
+        self.flush_interval = flush_interval
+        self.level = level
+        self.codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+        self.lock = threading.Lock()
+        self.buffer: List[bytes] = []
+        self.buffered_bytes = 0
+        self.first_ns = None
+        self.last_ns = 0
+        self.flushed_at = time.monotonic()
+        self.records = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+
+        # 書きかけのフレーム（前回の異常終了）を切り詰め、インデックスがずれていれば作り直す
+        with open(path, "ab+") as f:
+            entries, end = scan_frames(f)
+            size = f.seek(0, os.SEEK_END)
+            if size > end:
+                print(f"market_log: {path} の末尾 {size - end} バイト（書きかけのフレーム）を切り詰めます")
+                f.truncate(end)
+        if read_index(path) != entries:
+            write_index(path, entries)
+        self.file = open(path, "ab")
+        self.index = open(index_path(path), "ab")
+
+    def append(self, kind: int, source: str, body: bytes, status: int = 0) -> None:
+        source_bytes = source.encode("utf-8")[:0xFFFF]
+        with self.lock:
+            if self.file is None:
+                return
+            ts_ns = time.time_ns()  # ロック内で採番して受信順と時刻順を一致させる
+            self.buffer.append(RECORD_HEADER.pack(ts_ns, kind, status, len(source_bytes), len(body)))
+            self.buffer.append(source_bytes)
+            self.buffer.append(body)
+            self.buffered_bytes += RECORD_HEADER.size + len(source_bytes) + len(body)
+            if self.first_ns is None:
+                self.first_ns = ts_ns
+            self.last_ns = ts_ns
+            self.records += 1
+            if self.buffered_bytes >= self.frame_bytes or time.monotonic() - self.flushed_at >= self.flush_interval:
+                self._flush()
+
+    def record_http(self, method: str, url: str, params, status: int, body: bytes) -> None:
+        """http_limiter.RECORDER として受信したHTTP応答を記録"""
+        self.append(HTTP, request_key(method, url, params), body, status)
+
+    def record_ws(self, url: str, message) -> None:
+        self.append(WS, url, message.encode("utf-8") if isinstance(message, str) else bytes(message))
+
+    def ws_handler(self, url: str):
+        """pybotters の hdlr_str に渡すWebSocket受信ハンドラー（受信した文字列をそのまま記録）"""
+        def handler(msg, ws):
+            self.record_ws(url, msg)
+        return handler
+
+    def _flush(self) -> None:
+        self.flushed_at = time.monotonic()
+        if not self.buffer:
+            return
+        raw = b"".join(self.buffer)
+        payload = compress(raw, self.codec, self.level)
+        offset = self.file.tell()
+        self.file.write(FRAME_HEADER.pack(MAGIC, VERSION, self.codec, len(payload), len(self.buffer) // 3,
+                                          self.first_ns, self.last_ns))
+        self.file.write(payload)
+        self.file.flush()
+        # フレームを書き終えてからインデックスを追記（途中で落ちてもインデックスが壊れたフレームを指さない）
+        self.index.write(INDEX_ENTRY.pack(self.first_ns, self.last_ns, offset))
+        self.index.flush()
+        self.raw_bytes += len(raw)
+        self.written_bytes += FRAME_HEADER.size + len(payload)
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.first_ns = None
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.file is not None:
+                self._flush()
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file is None:
+                return
+            self._flush()
+            self.file.close()
+            self.index.close()
+            self.file = None
+        if http_limiter.RECORDER is self:
+            http_limiter.RECORDER = None
+
+    def install(self) -> "MarketLogWriter":
+        """http_limiter 経由の全HTTP応答を記録する"""
+        http_limiter.RECORDER = self
+        return self
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MarketLogReader:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            # インデックスの後に追記された（インデックス書き込み前に落ちた）フレームはヘッダーを辿って補う
+            entries = read_index(path)
+            offset = 0
+            if entries:
+                f.seek(entries[-1][2])
+                header = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+                offset = entries[-1][2] + FRAME_HEADER.size + header[3]
+            rest, _ = scan_frames(f, offset)
+        self.frames = entries + rest
+        self.last_times = [last_ns for _, last_ns, _ in self.frames]
+
+    def records(self, since_ns: Optional[int] = None, until_ns: Optional[int] = None) -> Iterator[Record]:
+        """受信時刻の範囲 [since_ns, until_ns] のレコードを順に返す（範囲外のフレームは読まない）"""
+        start = bisect.bisect_left(self.last_times, since_ns) if since_ns is not None else 0
+        with open(self.path, "rb") as f:
+            for first_ns, _, offset in self.frames[start:]:
+                if until_ns is not None and first_ns > until_ns:
+                    break
+                f.seek(offset)
+                header = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+                for record in decode_records(decompress(f.read(header[3]), header[2])):
+                    if since_ns is not None and record[0] < since_ns:
+                        continue
+                    if until_ns is not None and record[0] > until_ns:
+                        return
+                    yield record
+
+    def __iter__(self):
+        return self.records()
+
+    def frame_headers(self) -> Iterator[tuple]:
+        with open(self.path, "rb") as f:
+            for _, _, offset in self.frames:
+                f.seek(offset)
+                yield FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+
+
+class Pacer:
+    """記録時刻の間隔を speed 倍に縮めて再生（speed=None は待たない最大速度）"""
+
+    def __init__(self, speed: Optional[float] = None):
+        self.speed = speed
+        self.origin_ns = None
+        self.started = None
+
+    def delay(self, ts_ns: int) -> float:
+        """記録時刻 ts_ns のレコードを渡すまでに待つ秒数"""
+        if self.speed is None:
+            return 0.0
+        now = time.monotonic()
+        if self.origin_ns is None:
+            self.origin_ns, self.started = ts_ns, now
+        return self.started + (ts_ns - self.origin_ns) / 1e9 / self.speed - now
+
+
+class Playback:
+    """記録したHTTP応答を http_limiter の request_json / request_json_sync に返す（install中は通信しない）
+
+    同じソースのリクエストには記録順に応答を返し、記録時刻に合わせて待つ。記録が尽きたら ReplayMiss。
+    """
+
+    def __init__(self, records, speed: Optional[float] = None):
+        self.pacer = Pacer(speed)
+        self.responses: Dict[str, deque] = {}
+        for ts_ns, kind, status, source, body in records:
+            if kind == HTTP:
+                self.responses.setdefault(source, deque()).append((ts_ns, status, body))
+        self.lock = threading.Lock()
+        self.served = 0
+        self.served_bytes = 0
+        self.missed = 0
+
+    def remaining(self, method: str, url: str, params=None) -> int:
+        return len(self.responses.get(request_key(method, url, params), ()))
+
+    def take(self, method: str, url: str, params=None) -> Tuple[int, bytes, float]:
+        """次の記録を取り出し、(ステータス, 本体, 待つ秒数) を返す"""
+        key = request_key(method, url, params)
+        with self.lock:
+            queue = self.responses.get(key)
+            if not queue:
+                self.missed += 1
+                raise ReplayMiss(f"記録なし: {key}")
+            ts_ns, status, body = queue.popleft()
+            self.served += 1
+            self.served_bytes += len(body)
+            return status, body, self.pacer.delay(ts_ns)
+
+    def parse(self, url: str, body: bytes):
+        with METRICS.timer("parse", "replay", urlparse(url).path):
+            return json.loads(body) if body else None
+
+    async def request_async(self, method: str, url: str, params=None, retries: int = 4):
+        for _ in range(retries + 1):
+            status, body, delay = self.take(method, url, params)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if status not in http_limiter.RETRY_STATUSES:
+                return self.parse(url, body)
+        raise http_limiter.RetryError(f"{method} {url} failed after {retries + 1} attempts (replay): HTTP {status}")
+
+    def request(self, method: str, url: str, params=None, retries: int = 4):
+        for _ in range(retries + 1):
+            status, body, delay = self.take(method, url, params)
+            if delay > 0:
+                time.sleep(delay)
+            if status not in http_limiter.RETRY_STATUSES:
+                return self.parse(url, body)
+        raise http_limiter.RetryError(f"{method} {url} failed after {retries + 1} attempts (replay): HTTP {status}")
+
+    def __enter__(self):
+        http_limiter.PLAYBACK = self
+        return self
+
+    def __exit__(self, *exc):
+        http_limiter.PLAYBACK = None
+
+
+def record_from_env(env: str = "MARKET_LOG") -> Optional[MarketLogWriter]:
+    """環境変数にログのパスがあれば記録を開始（終了時に書き出す）"""
+    path = os.getenv(env)
+    if not path:
+        return None
+    writer = MarketLogWriter(path).install()
+    atexit.register(writer.close)
+    print(f"市場データを {path} に記録します（{CODEC_NAMES[writer.codec]}）")
+    return writer
+
+
+def print_pumps(pumps) -> None:
+    for pump in pumps:
+        print(f"🚀 {pump['symbol']}: Price +{pump['price_change']*100:.1f}%, Volume +{pump['volume_change']*100:.1f}%")
+
+async def replay_hige(records, speed: Optional[float], snapshot: bool = False) -> Dict:
+    """急騰検出（1回実行・スナップショットモード）を記録したHTTP応答で繰り返し実行"""
+    from hige_catch import BitgetPumpDetector
+
+    detector = BitgetPumpDetector("", state_path=os.path.join(tempfile.mkdtemp(), "bitget_state.json"))
+    playback = Playback(records, speed)
+    symbols_url = "https://api.bitget.com/api/v2/spot/public/symbols"
+    tickers_url = "https://api.bitget.com/api/v2/spot/market/tickers"
+    cycles, detections = 0, 0
+    start = time.perf_counter()
+    with playback:
+        if snapshot:
+            previous = None
+            while playback.remaining("GET", tickers_url):
+                current = await detector.get_ticker_snapshot(None)
+                if current is not None and previous is not None:
+                    candidates = detector.prefilter_snapshots(previous, current)
+                    if candidates:
+                        pumps = await detector.process_all_symbols_concurrent(None, candidates, detector.max_concurrent)
+                        pumps = detector.new_snapshot_pumps(pumps)
+                        print_pumps(pumps)
+                        detections += len(pumps)
+                previous = current if current is not None else previous
+                cycles += 1
+        else:
+            while playback.remaining("GET", symbols_url):
+                symbols = await detector.get_all_usdt_symbols(None)
+                if symbols:
+                    pumps = await detector.process_all_symbols_concurrent(None, symbols, detector.max_concurrent)
+                    print_pumps(pumps)
+                    detections += len(pumps)
+                cycles += 1
+    return {"cycles": cycles, "messages": playback.served, "bytes": playback.served_bytes,
+            "missed": playback.missed, "detections": detections, "elapsed": time.perf_counter() - start}
+
+def replay_hige_ws(records, speed: Optional[float]) -> Dict:
+    """急騰検出（WebSocketモード）に記録したメッセージを順に渡す"""
+    from hige_catch import BitgetPumpDetector
+
+    detector = BitgetPumpDetector("", state_path=os.path.join(tempfile.mkdtemp(), "bitget_state.json"))
+    pacer = Pacer(speed)
+    messages, size, detections = 0, 0, 0
+    start = time.perf_counter()
+    for ts_ns, kind, status, source, body in records:
+        if kind != WS:
+            continue
+        delay = pacer.delay(ts_ns)
+        if delay > 0:
+            time.sleep(delay)
+        messages += 1
+        size += len(body)
+        try:
+            msg = json.loads(body)
+        except ValueError:  # ping/pong
+            continue
+        pumps = detector.on_candle_message(msg)
+        if pumps:
+            print_pumps(pumps)
+            detections += len(pumps)
+    return {"messages": messages, "bytes": size, "missed": 0, "detections": detections,
+            "elapsed": time.perf_counter() - start}
+
+async def replay_arbitrage(records, speed: Optional[float]) -> Dict:
+    """Coincheck/OKXのアービトラージ検索を記録したHTTP応答で繰り返し実行し、結果を表示"""
+    from fx_rate import FxRateCache
+    from get_ticker import MultiCurrencyArbitrage
+
+    arbitrage = MultiCurrencyArbitrage()
+    playback = Playback(records, speed)
+    # 為替レートも記録から取得（記録がなければ保存済みの値を使う）
+    fx = FxRateCache(path=os.path.join(tempfile.mkdtemp(), "fx_rate.json"))
+    if playback.remaining("GET", fx.url):
+        arbitrage.fx = fx
+    currencies = [c for c, pairs in arbitrage.currency_pairs.items()
+                  if playback.remaining("GET", arbitrage.coincheck_url, {"pair": pairs["coincheck"]})]
+    if not currencies:
+        print("Coincheckの記録がありません")
+        return {"cycles": 0, "messages": 0, "bytes": 0, "missed": 0, "detections": 0, "elapsed": 0.0}
+
+    cycles, detections = 0, 0
+    start = time.perf_counter()
+    with playback:
+        first = {"pair": arbitrage.currency_pairs[currencies[0]]["coincheck"]}
+        while playback.remaining("GET", arbitrage.coincheck_url, first):
+            results = await arbitrage.get_all_prices_async(currencies)
+            arbitrage.display_results(results, show_details=False)
+            # ランキングに表示される機会（0.3%超）を検出として数える
+            for data in results["currencies"].values():
+                arb = arbitrage.calculate_arbitrage_opportunity(data["coincheck"], data["okx"])
+                if max(abs(arb["cc_to_okx"]["pct"]), abs(arb["okx_to_cc"]["pct"])) > 0.3:
+                    detections += 1
+            cycles += 1
+    return {"cycles": cycles, "messages": playback.served, "bytes": playback.served_bytes,
+            "missed": playback.missed, "detections": detections, "elapsed": time.perf_counter() - start}
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+    """ISO形式の時刻（タイムゾーンなしはローカル時刻）をns単位のUNIX時刻に変換"""
+    if value is None:
+        return None
+    return int(datetime.fromisoformat(value).timestamp() * 1e9)
+
+def format_ns(ts_ns: int) -> str:
+    return datetime.fromtimestamp(ts_ns / 1e9).isoformat(timespec="milliseconds")
+
+def print_info(reader: MarketLogReader) -> None:
+    headers = list(reader.frame_headers())
+    if not headers:
+        print(f"{reader.path}: 空のログ")
+        return
+    compressed = sum(FRAME_HEADER.size + h[3] for h in headers)
+    sources, kinds, raw = Counter(), Counter(), 0
+    for ts_ns, kind, status, source, body in reader:
+        kinds[KIND_NAMES.get(kind, kind)] += 1
+        sources[source.split("?")[0]] += 1
+        raw += RECORD_HEADER.size + len(source) + len(body)
+    codecs = Counter(CODEC_NAMES.get(h[2], h[2]) for h in headers)
+    print(f"{reader.path}: {len(headers)} フレーム（{', '.join(f'{k}: {v}' for k, v in codecs.items())}）")
+    print(f"期間: {format_ns(headers[0][5])} 〜 {format_ns(headers[-1][6])}")
+    print(f"レコード: {sum(kinds.values())}（{', '.join(f'{k}: {v}' for k, v in kinds.items())}）")
+    print(f"サイズ: {raw / 1e6:.2f} MB → {compressed / 1e6:.2f} MB（圧縮率 {raw / max(compressed, 1):.1f}倍）")
+    for source, count in sources.most_common(20):
+        print(f"  {count:8d}  {source}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="市場データ記録ログの確認と再生")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="フレーム数・期間・ソース別件数を表示")
+    info.add_argument("path")
+    dump = sub.add_parser("dump", help="レコードを表示")
+    dump.add_argument("path")
+    dump.add_argument("--source", help="ソースに含まれる文字列で絞り込み")
+    dump.add_argument("--limit", type=int, default=20)
+    dump.add_argument("--bytes", type=int, default=200, help="表示する本体の先頭バイト数")
+    replay = sub.add_parser("replay", help="記録を取得処理へ戻して再生")
+    replay.add_argument("path")
+    replay.add_argument("--target", choices=["hige", "hige-snapshot", "hige-ws", "arbitrage"], required=True)
+    replay.add_argument("--speed", default="max", help="再生速度（1, 10 などの倍率、max で待たない）")
+    replay.add_argument("--metrics", action="store_true", help="段階ごとの所要時間を表示")
+    for p in (dump, replay):
+        p.add_argument("--since", help="開始時刻（ISO形式）")
+        p.add_argument("--until", help="終了時刻（ISO形式）")
+    args = parser.parse_args()
+
+    reader = MarketLogReader(args.path)
+    if args.command == "info":
+        print_info(reader)
+    elif args.command == "dump":
+        shown = 0
+        for ts_ns, kind, status, source, body in reader.records(parse_time(args.since), parse_time(args.until)):
+            if args.source and args.source not in source:
+                continue
+            print(f"{format_ns(ts_ns)} {KIND_NAMES.get(kind, kind)} {status or ''} {source} ({len(body)} B)")
+            print(f"    {body[:args.bytes].decode('utf-8', errors='replace')}")
+            shown += 1
+            if shown >= args.limit:
+                break
+    else:
+        speed = None if args.speed == "max" else float(args.speed)
+        records = list(reader.records(parse_time(args.since), parse_time(args.until)))
+        # 計測は再生ループのみ（ログの展開・検出器の初期化は含めない）
+        if args.target == "hige-ws":
+            stats = replay_hige_ws(records, speed)
+        elif args.target == "arbitrage":
+            stats = asyncio.run(replay_arbitrage(records, speed))
+        else:
+            stats = asyncio.run(replay_hige(records, speed, snapshot=args.target == "hige-snapshot"))
+        elapsed = max(stats["elapsed"], 1e-9)
+        print(f"\n再生: {stats['messages']} 件 / {stats['bytes'] / 1e6:.2f} MB を {elapsed:.3f} 秒"
+              f"（{stats['messages'] / elapsed:,.0f} 件/秒, {stats['bytes'] / 1e6 / elapsed:.1f} MB/秒, 速度 {args.speed}）")
+        print(f"検出: {stats['detections']} 件 / 記録なし: {stats['missed']} 件"
+              + (f" / {stats['cycles']} 周" if "cycles" in stats else ""))
+        if args.metrics:
+            METRICS.print_summary()
@@ -0,0 +1,327 @@
+"""
+レイテンシ計測
+リクエスト・処理段階（wait / fetch / parse / analyze / notify など）ごとの所要時間を、
+取引所（venue）・エンドポイント別のHDR形式ヒストグラムに記録する。
+Prometheus形式のHTTPエンドポイントと、一定間隔のサマリーログ（区間ごとのp50/p90/p99）で出力する。
+
+記録は整数配列の1要素を加算するだけなので、本番でも常時有効にできる。
+使い方:
+    from metrics import METRICS
+    with METRICS.timer("analyze", "bitget", "evaluate_pump"):
+        ...
+    @METRICS.timed("analyze", "bitget")
+    def evaluate_pump(...): ...
+    METRICS.serve(9108)               # http://127.0.0.1:9108/metrics
+    METRICS.start_summary_log(60)     # 60秒ごとにサマリーを表示
+"""
+
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# ヒストグラムの精度: 2のべき乗ごとに 2**SUB_BITS 区間（相対誤差は最大 1/2**SUB_BITS ≒ 3%）
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_EXPONENT = 36  # 記録できる最大値 2**36 マイクロ秒（約19時間、超えた値はここに丸める）
+BUCKET_COUNT = SUB_BUCKETS + (MAX_EXPONENT - SUB_BITS) * SUB_BUCKETS
+
+# Prometheusに出力するバケット境界（秒）
+PROMETHEUS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def bucket_index(micros: int) -> int:
+    """マイクロ秒の値が入る区間番号（2**SUB_BITS 未満は1マイクロ秒刻み、以降は対数×線形）"""
+    if micros < SUB_BUCKETS:
+        return max(micros, 0)
+    exponent = micros.bit_length() - 1
+    if exponent >= MAX_EXPONENT:
+        return BUCKET_COUNT - 1
+    shift = exponent - SUB_BITS
+    return SUB_BUCKETS + shift * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+def bucket_upper(index: int) -> int:
+    """区間の上限（マイクロ秒、この値を含まない）"""
+    if index < SUB_BUCKETS:
+        return index + 1
+    shift, sub = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    return (SUB_BUCKETS + sub + 1) << shift
+
+
+class LatencyHistogram:
+    """HDR形式のレイテンシヒストグラム（値はマイクロ秒で保持）"""
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0  # 合計（秒）
+        self.max = 0.0    # 最大（秒）
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False) -> None:
+        index = bucket_index(int(seconds * 1_000_000))
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            if error:
+                self.errors += 1
+
+    def copy(self) -> "LatencyHistogram":
+        other = LatencyHistogram()
+        with self.lock:
+            other.counts = self.counts[:]
+            other.count, other.total, other.max, other.errors = self.count, self.total, self.max, self.errors
+        return other
+
+    def since(self, previous: Optional["LatencyHistogram"]) -> "LatencyHistogram":
+        """previous（過去の copy()）以降に記録された分（最大値は区間内の最大区間の上限で近似）"""
+        current = self.copy()
+        if previous is None:
+            return current
+        current.counts = [a - b for a, b in zip(current.counts, previous.counts)]
+        current.count -= previous.count
+        current.total -= previous.total
+        current.errors -= previous.errors
+        highest = max((i for i, n in enumerate(current.counts) if n), default=None)
+        current.max = 0.0 if highest is None else min(current.max, bucket_upper(highest) / 1_000_000)
+        return current
+
+    def percentile(self, q: float) -> float:
+        """q（0〜100）パーセンタイル（秒、区間の上限で返すので真値以上・最大値以下）"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(self.count * q / 100 + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_upper(index) / 1_000_000, self.max)
+        return self.max
+
+    def cumulative(self, bounds=PROMETHEUS_BUCKETS) -> List[int]:
+        """各境界（秒）以下の件数（境界をまたぐ区間は上限で判定）"""
+        result, seen, index = [], 0, 0
+        for bound in bounds:
+            limit = bound * 1_000_000
+            while index < BUCKET_COUNT and bucket_upper(index) <= limit:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+class Metrics:
+    def __init__(self, prefix: str = "scanner"):
+        self.prefix = prefix
+        self.enabled = True
+        # (段階, venue, エンドポイント) → ヒストグラム
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.summary_stop: Optional[threading.Event] = None
+
+    def histogram(self, stage: str, venue: str = "", endpoint: str = "") -> LatencyHistogram:
+        key = (stage, venue, endpoint)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage: str, seconds: float, venue: str = "", endpoint: str = "", error: bool = False) -> None:
+        """所要時間（秒）を記録"""
+        if self.enabled:
+            self.histogram(stage, venue, endpoint).record(seconds, error)
+
+    @contextmanager
+    def timer(self, stage: str, venue: str = "", endpoint: str = ""):
+        """ブロックの所要時間を記録（例外で抜けた場合はエラーとして数える）"""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, venue, endpoint, error)
+
+    def timed(self, stage: str, venue: str = "", endpoint: str = ""):
+        """関数（コルーチン関数も可）の所要時間を記録するデコレーター（endpoint省略時は関数名）"""
+        def decorator(func):
+            name = endpoint or func.__name__
+            # 呼び出しごとのオーバーヘッドを抑えるため timer() を使わず直接計測
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start, error = time.perf_counter(), True
+                    try:
+                        result = await func(*args, **kwargs)
+                        error = False
+                        return result
+                    finally:
+                        self.observe(stage, time.perf_counter() - start, venue, name, error)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start, error = time.perf_counter(), True
+                try:
+                    result = func(*args, **kwargs)
+                    error = False
+                    return result
+                finally:
+                    self.observe(stage, time.perf_counter() - start, venue, name, error)
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms = {}
+
+    def render_prometheus(self) -> str:
+        """Prometheusのテキスト形式（ヒストグラム＋エラー数）"""
+        name = f"{self.prefix}_stage_latency_seconds"
+        lines = [f"# HELP {name} Latency per request/processing stage",
+                 f"# TYPE {name} histogram"]
+        errors = [f"# HELP {self.prefix}_stage_errors_total Failed requests/stages",
+                  f"# TYPE {self.prefix}_stage_errors_total counter"]
+        for (stage, venue, endpoint), histogram in sorted(list(self.histograms.items())):
+            snapshot = histogram.copy()
+            labels = f'stage="{escape_label(stage)}",venue="{escape_label(venue)}",endpoint="{escape_label(endpoint)}"'
+            for bound, n in zip(PROMETHEUS_BUCKETS, snapshot.cumulative()):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {n}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {snapshot.count}')
+            lines.append(f"{name}_sum{{{labels}}} {snapshot.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {snapshot.count}")
+            errors.append(f"{self.prefix}_stage_errors_total{{{labels}}} {snapshot.errors}")
+        return "\n".join(lines + errors) + "\n"
+
+    def summary_lines(self, previous: Optional[Dict] = None) -> List[str]:
+        """段階ごとの件数・p50/p90/p99/最大（previous を渡すとそれ以降の区間のみ）"""
+        lines = []
+        for key, histogram in sorted(list(self.histograms.items())):
+            snapshot = histogram.since(previous.get(key) if previous else None)
+            if snapshot.count == 0:
+                continue
+            stage, venue, endpoint = key
+            label = " ".join(part for part in (stage, venue, endpoint) if part)
+            lines.append(f"{label}: n={snapshot.count} err={snapshot.errors} "
+                         f"p50={format_seconds(snapshot.percentile(50))} p90={format_seconds(snapshot.percentile(90))} "
+                         f"p99={format_seconds(snapshot.percentile(99))} max={format_seconds(snapshot.max)}")
+        return lines
+
+    def print_summary(self, previous: Optional[Dict] = None) -> Dict:
+        """サマリーを表示し、次回の区間計算用のスナップショットを返す"""
+        lines = self.summary_lines(previous)
+        if lines:
+            print(f"[metrics] {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            for line in lines:
+                print(f"  {line}")
+        return {key: histogram.copy() for key, histogram in list(self.histograms.items())}
+
+    def start_summary_log(self, interval: float = 60.0) -> threading.Event:
+        """interval秒ごとに直近区間のサマリーを表示するスレッドを開始（戻り値をset()すると停止）"""
+        if self.summary_stop is not None:
+            return self.summary_stop
+        stop = self.summary_stop = threading.Event()
+
+        def loop():
+            previous = None
+            while not stop.wait(interval):
+                previous = self.print_summary(previous)
+
+        threading.Thread(target=loop, name="metrics-summary", daemon=True).start()
+        return stop
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+        """Prometheus形式のエンドポイント（/metrics）をバックグラウンドで開始"""
+        if self.server is not None:
+            return self.server
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"Failed to start metrics endpoint on {host}:{port}: {e}")
+            return None
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics endpoint: http://{host}:{self.server.server_address[1]}/metrics")
+        return self.server
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.summary_stop is not None:
+            self.summary_stop.set()
+            self.summary_stop = None
+
+    def trace_config(self):
+        """aiohttpのTraceConfig（DNS解決・接続確立（TCP+TLS）の時間をホスト別に記録）
+
+        pybotters.Client(..., trace_configs=[METRICS.trace_config()]) のようにセッションに渡す。
+        """
+        import aiohttp
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host or ""
+
+        async def on_dns_start(session, ctx, params):
+            ctx.dns_start = time.perf_counter()
+
+        async def on_dns_end(session, ctx, params):
+            self.observe("dns", time.perf_counter() - ctx.dns_start, params.host)
+
+        async def on_connect_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_connect_end(session, ctx, params):
+            self.observe("connect", time.perf_counter() - ctx.connect_start, getattr(ctx, "host", ""))
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        trace_config.on_connection_create_start.append(on_connect_start)
+        trace_config.on_connection_create_end.append(on_connect_end)
+        return trace_config
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 0.001:
+        return f"{seconds * 1_000_000:.0f}us"
+    if seconds < 1:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+# プロセス共通の計測器
+METRICS = Metrics()
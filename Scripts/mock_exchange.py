@@ -0,0 +1,149 @@
+"""
+取引所API疑似サーバー
+記録済みの応答（fixtures/<venue>.json）を返す（ベンチマーク・オフライン検証用）
+--record を指定すると、記録にないリクエストを本物のAPIへ転送して応答を記録する
+
+使い方:
+    python mock_exchange.py --fixtures bench_fixtures --port 8800 --latency 0.005
+    python mock_exchange.py --fixtures bench_fixtures --record   # 実APIから記録
+取得側は http_limiter.URL_OVERRIDES（use_mock()）で https://api.bitget.com → http://127.0.0.1:8800/bitget のように向ける
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlencode, urlparse
+
+import aiohttp
+from aiohttp import web
+
+import http_limiter
+
+# 疑似サーバーのパス先頭（venue） → 本物のオリジン
+VENUES = {
+    "bybit": "https://api.bybit.com",
+    "bitget": "https://api.bitget.com",
+    "okx": "https://www.okx.com",
+    "kraken": "https://api.kraken.com",
+    "coincheck": "https://coincheck.com",
+    "blockfrost": "https://cardano-mainnet.blockfrost.io",
+    "fx": "https://api.exchangerate-api.com",
+}
+
+# 疑似サーバーはレート制限しない（取得側のリミッターで計測が律速されないよう緩める）
+MOCK_LIMITS = {"rate": 100000, "burst": 100000, "max_concurrent": 1000}
+
+
+def fixture_key(path: str, query: Optional[Mapping] = None) -> str:
+    """記録のキー（パス＋ソートしたクエリ）"""
+    if not query:
+        return path
+    return f"{path}?{urlencode(sorted((str(k), str(v)) for k, v in query.items()))}"
+
+def load_fixtures(directory: str) -> Dict[str, Dict[str, object]]:
+    """記録済みの応答を読み込み（venue → キー → 応答JSON）"""
+    fixtures = {}
+    for venue in VENUES:
+        path = os.path.join(directory, f"{venue}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                fixtures[venue] = json.load(f)
+        except (OSError, ValueError):
+            fixtures[venue] = {}
+    return fixtures
+
+def save_fixtures(directory: str, fixtures: Dict[str, Dict[str, object]]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    for venue, responses in fixtures.items():
+        if responses:
+            with open(os.path.join(directory, f"{venue}.json"), "w", encoding="utf-8") as f:
+                json.dump(responses, f, separators=(",", ":"))
+
+def create_app(fixtures: Dict[str, Dict[str, object]], latency: float = 0.0, record: bool = False) -> web.Application:
+    """疑似アプリを作成（リクエスト数は app["stats"]["requests"]、記録にないキーは app["stats"]["missing"]）
+
+    記録にないキーはパスだけのキーで探し、それもなければ404（record=Trueなら本物のAPIから取得して記録）。
+    """
+    async def handler(request):
+        venue = request.match_info["venue"]
+        path = "/" + request.match_info["tail"]
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+
+        responses = fixtures.setdefault(venue, {})
+        key = fixture_key(path, request.query)
+        body = responses.get(key, responses.get(path))
+        if body is None and record and venue in VENUES:
+            body = await fetch_upstream(request, venue, path)
+            if body is not None:
+                responses[key] = body
+        if body is None:
+            stats["missing"].add(f"{venue}{key}")
+            return web.json_response({"status_code": 404, "error": "Not Found", "message": key}, status=404)
+        return web.json_response(body)
+
+    async def fetch_upstream(request, venue, path):
+        # 認証ヘッダー（Blockfrostのproject_idなど）はそのまま転送
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in ("host", "content-length")}
+        try:
+            async with stats["session"].get(VENUES[venue] + path, params=request.query, headers=headers) as resp:
+                if resp.status != 200:
+                    print(f"record: {venue}{path} -> {resp.status}")
+                    return None
+                return await resp.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            print(f"record: {venue}{path} failed: {e}")
+            return None
+
+    async def on_startup(app):
+        if record:
+            stats["session"] = aiohttp.ClientSession()
+
+    async def on_cleanup(app):
+        if "session" in stats:
+            await stats["session"].close()
+
+    stats = {"requests": 0, "missing": set()}
+    app = web.Application()
+    app["fixtures"] = fixtures
+    app["stats"] = stats
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_get("/{venue}/{tail:.*}", handler)
+    return app
+
+async def serve(fixtures, host: str = "127.0.0.1", port: int = 8800, **kwargs):
+    """疑似サーバーを起動（停止は戻り値の runner.cleanup()）"""
+    runner = web.AppRunner(create_app(fixtures, **kwargs))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+def use_mock(base_url: str = "http://127.0.0.1:8800") -> Dict[str, str]:
+    """http_limiter経由の取得を疑似サーバーへ向け、各venueの置き換え先を返す"""
+    overrides = {origin: f"{base_url}/{venue}" for venue, origin in VENUES.items()}
+    http_limiter.URL_OVERRIDES.update(overrides)
+    http_limiter.HOST_LIMITS[urlparse(base_url).hostname] = MOCK_LIMITS
+    return overrides
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="取引所API疑似サーバー")
+    parser.add_argument("--fixtures", default="bench_fixtures", help="記録済み応答のディレクトリ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0, help="応答遅延（秒）")
+    parser.add_argument("--record", action="store_true", help="記録にないリクエストを本物のAPIから取得して記録")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    app = create_app(fixtures, args.latency, args.record)
+    if args.record:
+        async def save_on_exit(app):
+            save_fixtures(args.fixtures, fixtures)
+            print(f"Saved fixtures to {args.fixtures}")
+        app.on_shutdown.append(save_on_exit)
+    web.run_app(app, host=args.host, port=args.port)
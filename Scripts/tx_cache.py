@@ -0,0 +1,79 @@
+"""
+Cardano取引データのローカルキャッシュ
+確定済みの取引は変わらないため、Blockfrostの応答(JSON)を取引ハッシュをキーにSQLiteへ保存して再利用する
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+
+class TxCache:
+    # 保存する応答の種類
+    KINDS = ('transaction', 'utxos', 'metadata')
+
+    def __init__(self, path: str = "cardano_tx_cache.sqlite3"):
+        self.path = path
+        # 並列取得のワーカースレッドから共有するため、1接続をロックで保護
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "tx_hash TEXT NOT NULL, kind TEXT NOT NULL, body TEXT NOT NULL, "
+                "PRIMARY KEY (tx_hash, kind)) WITHOUT ROWID"
+            )
+            self.conn.commit()
+
+        # 統計
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tx_hash: str, kind: str):
+        """保存済みの応答(JSON)、なければNone"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body FROM responses WHERE tx_hash = ? AND kind = ?", (tx_hash, kind)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def get_many(self, tx_hashes: Iterable[str], kind: str) -> Dict[str, object]:
+        """複数の取引の応答をまとめて取得（保存済みのものだけ返す）"""
+        tx_hashes = list(dict.fromkeys(tx_hashes))
+        found = {}
+        with self.lock:
+            # SQLiteの変数上限を超えないよう分割
+            for i in range(0, len(tx_hashes), 500):
+                chunk = tx_hashes[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT tx_hash, body FROM responses WHERE kind = ? AND tx_hash IN ({','.join('?' * len(chunk))})",
+                    [kind, *chunk]
+                ).fetchall()
+                found.update((tx_hash, json.loads(body)) for tx_hash, body in rows)
+            self.hits += len(found)
+            self.misses += len(tx_hashes) - len(found)
+        return found
+
+    def put(self, tx_hash: str, kind: str, body) -> None:
+        """応答(JSON)を保存"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (tx_hash, kind, body) VALUES (?, ?, ?)",
+                (tx_hash, kind, json.dumps(body, separators=(',', ':')))
+            )
+            self.conn.commit()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(DISTINCT tx_hash) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,268 @@
+"""
+Cardano取引の列指向バッチ
+複数取引のUTxOを、資産ID・アドレスの表（文字列は1回だけ保持）と整数配列で表現する。
+取引ごとのトークン入出力はソート＋reduceatのグループ集計で一括計算する。
+"""
+
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+INPUT, OUTPUT = 0, 1
+
+
+class UtxoBatch:
+    def __init__(self, metadata_matcher: Optional[Callable[[list], bool]] = None):
+        # metadata_matcher(メタデータのリスト) → bool を渡すと取引ごとに判定結果を保持
+        self.metadata_matcher = metadata_matcher
+
+        # 文字列の表（資産ID・アドレス）
+        self.assets: List[str] = []
+        self.asset_ids: Dict[str, int] = {}
+        self.addresses: List[str] = []
+        self.address_ids: Dict[str, int] = {}
+
+        # 取引ごとの列
+        self.tx_hashes: List[str] = []
+        self._block_time = array('q')
+        self._block_height = array('q')
+        self._fee = array('q')
+        self._input_count = array('i')
+        self._output_count = array('i')
+        self._metadata_count = array('i')
+        self._metadata_flag = array('b')
+
+        # UTxOごとの列
+        self._utxo_tx = array('i')
+        self._utxo_side = array('b')
+        self._utxo_address = array('i')
+
+        # 数量ごとの列
+        self._amount_tx = array('i')
+        self._amount_side = array('b')
+        self._amount_asset = array('i')
+        self._amount_quantity = array('Q')
+
+    def __len__(self) -> int:
+        return len(self.tx_hashes)
+
+    def intern_asset(self, unit: str) -> int:
+        asset_id = self.asset_ids.get(unit)
+        if asset_id is None:
+            asset_id = self.asset_ids[unit] = len(self.assets)
+            self.assets.append(unit)
+        return asset_id
+
+    def intern_address(self, address: str) -> int:
+        address_id = self.address_ids.get(address)
+        if address_id is None:
+            address_id = self.address_ids[address] = len(self.addresses)
+            self.addresses.append(address)
+        return address_id
+
+    def add_tx(self, tx_hash: str, block_time, block_height, fee, input_count: int, output_count: int,
+               metadata: list) -> int:
+        """取引1件分の列を追加して取引番号を返す"""
+        tx_index = len(self.tx_hashes)
+        self.tx_hashes.append(tx_hash)
+        self._block_time.append(block_time or 0)
+        self._block_height.append(block_height or 0)
+        self._fee.append(int(fee or 0))
+        self._input_count.append(input_count)
+        self._output_count.append(output_count)
+        self._metadata_count.append(len(metadata))
+        self._metadata_flag.append(bool(self.metadata_matcher and self.metadata_matcher(metadata)))
+        return tx_index
+
+    def add_utxo(self, tx_index: int, side: int, address: str, amounts: Iterable) -> None:
+        """UTxO1件分の列を追加（amountsは (資産ID, 数量) の列）"""
+        self._utxo_tx.append(tx_index)
+        self._utxo_side.append(side)
+        self._utxo_address.append(self.intern_address(address))
+        for unit, quantity in amounts:
+            self._amount_tx.append(tx_index)
+            self._amount_side.append(side)
+            self._amount_asset.append(self.intern_asset(unit))
+            self._amount_quantity.append(int(quantity))
+
+    def append_raw(self, tx: dict, utxos: dict, metadata: list) -> None:
+        """Blockfrostの応答(JSON)のまま追加（Namespaceオブジェクトを作らない）"""
+        tx_index = self.add_tx(tx['hash'], tx.get('block_time'), tx.get('block_height'), tx.get('fees'),
+                               len(utxos['inputs']), len(utxos['outputs']), metadata)
+        for side, key in ((INPUT, 'inputs'), (OUTPUT, 'outputs')):
+            for utxo in utxos[key]:
+                self.add_utxo(tx_index, side, utxo['address'], ((a['unit'], a['quantity']) for a in utxo['amount']))
+
+    def append(self, tx_details: dict) -> None:
+        """フェッチャーの取引詳細（Namespace）を追加"""
+        tx = tx_details['transaction']
+        tx_index = self.add_tx(tx.hash, tx_details['block_time'], tx_details['block_height'], getattr(tx, 'fees', 0),
+                               len(tx_details['inputs']), len(tx_details['outputs']), tx_details['metadata'])
+        for side, key in ((INPUT, 'inputs'), (OUTPUT, 'outputs')):
+            for utxo in tx_details[key]:
+                self.add_utxo(tx_index, side, utxo.address, ((a.unit, a.quantity) for a in utxo.amount))
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[dict], **kwargs) -> "UtxoBatch":
+        batch = cls(**kwargs)
+        for tx_details in transactions:
+            if tx_details:
+                batch.append(tx_details)
+        return batch
+
+    @classmethod
+    def from_cache(cls, cache, tx_hashes: Iterable[str], **kwargs) -> "UtxoBatch":
+        """TxCacheに保存済みの応答から作成（保存されていない取引は除く）"""
+        tx_hashes = list(tx_hashes)
+        bodies = {kind: cache.get_many(tx_hashes, kind) for kind in ('transaction', 'utxos', 'metadata')}
+        batch = cls(**kwargs)
+        for tx_hash in tx_hashes:
+            if tx_hash in bodies['transaction'] and tx_hash in bodies['utxos']:
+                batch.append_raw(bodies['transaction'][tx_hash], bodies['utxos'][tx_hash],
+                                 bodies['metadata'].get(tx_hash, []))
+        return batch
+
+    def column(self, name: str, dtype) -> np.ndarray:
+        """列をNumPy配列として取得（追加を続けられるようコピーを返す）"""
+        values = getattr(self, f"_{name}")
+        return np.frombuffer(values, dtype=dtype).copy() if len(values) else np.empty(0, dtype)
+
+    @property
+    def block_time(self) -> np.ndarray:
+        return self.column('block_time', np.int64)
+
+    @property
+    def block_height(self) -> np.ndarray:
+        return self.column('block_height', np.int64)
+
+    @property
+    def fee(self) -> np.ndarray:
+        return self.column('fee', np.int64)
+
+    @property
+    def input_count(self) -> np.ndarray:
+        return self.column('input_count', np.int32)
+
+    @property
+    def output_count(self) -> np.ndarray:
+        return self.column('output_count', np.int32)
+
+    @property
+    def metadata_count(self) -> np.ndarray:
+        return self.column('metadata_count', np.int32)
+
+    @property
+    def metadata_flag(self) -> np.ndarray:
+        return self.column('metadata_flag', np.int8).astype(bool)
+
+    @property
+    def utxo_tx(self) -> np.ndarray:
+        return self.column('utxo_tx', np.int32)
+
+    @property
+    def utxo_side(self) -> np.ndarray:
+        return self.column('utxo_side', np.int8)
+
+    @property
+    def utxo_address(self) -> np.ndarray:
+        return self.column('utxo_address', np.int32)
+
+    @property
+    def amount_tx(self) -> np.ndarray:
+        return self.column('amount_tx', np.int32)
+
+    @property
+    def amount_side(self) -> np.ndarray:
+        return self.column('amount_side', np.int8)
+
+    @property
+    def amount_asset(self) -> np.ndarray:
+        return self.column('amount_asset', np.int32)
+
+    @property
+    def amount_quantity(self) -> np.ndarray:
+        return self.column('amount_quantity', np.uint64)
+
+    def nbytes(self) -> int:
+        """配列部分のバイト数（文字列の表は除く）"""
+        return sum(a.itemsize * len(a) for a in (
+            self._block_time, self._block_height, self._fee, self._input_count, self._output_count,
+            self._metadata_count, self._metadata_flag, self._utxo_tx, self._utxo_side, self._utxo_address,
+            self._amount_tx, self._amount_side, self._amount_asset, self._amount_quantity))
+
+    def token_flows(self) -> Dict[str, np.ndarray]:
+        """(取引, 資産)ごとの入力合計・出力合計・差引（取引→資産の順に並ぶ）"""
+        n_assets = max(len(self.assets), 1)
+        key = self.amount_tx.astype(np.int64) * n_assets + self.amount_asset
+        order = np.argsort(key, kind='stable')
+        sorted_key = key[order]
+        if len(sorted_key) == 0:
+            empty = np.empty(0, np.int64)
+            return {'tx': empty, 'asset': empty, 'input': empty.astype(np.uint64),
+                    'output': empty.astype(np.uint64), 'net': empty}
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_key)) + 1))
+        quantity = self.amount_quantity[order]
+        is_input = self.amount_side[order] == INPUT
+
+        # uint64の合計は黙って桁あふれするので、(グループ内の最大数量 × 件数) が上限を超えうる場合は
+        # Pythonの整数（object）で合計する
+        group_size = np.diff(np.append(starts, len(quantity))).astype(np.uint64)
+        group_max = np.maximum.reduceat(quantity, starts)
+        if np.any(group_max > np.uint64(np.iinfo(np.uint64).max) // group_size):
+            quantity = quantity.astype(object)
+            zero = 0
+        else:
+            zero = np.uint64(0)
+        input_total = np.add.reduceat(np.where(is_input, quantity, zero), starts)
+        output_total = np.add.reduceat(np.where(is_input, zero, quantity), starts)
+
+        # 差引はint64で計算（int64に収まらない数量があればPythonの整数で計算）
+        limit = np.iinfo(np.int64).max
+        if input_total.max() <= limit and output_total.max() <= limit:
+            net = output_total.astype(np.int64) - input_total.astype(np.int64)
+        else:
+            net = output_total.astype(object) - input_total.astype(object)
+
+        group_key = sorted_key[starts]
+        return {
+            'tx': group_key // n_assets,
+            'asset': group_key % n_assets,
+            'input': input_total,
+            'output': output_total,
+            'net': net,
+        }
+
+    def unique_counts(self, flows: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """取引ごとのユニークなアドレス数・トークン数（token_flows の結果があれば再利用）"""
+        n_tx = len(self)
+        n_addresses = max(len(self.addresses), 1)
+        address_key = np.sort(self.utxo_tx.astype(np.int64) * n_addresses + self.utxo_address)
+        first = np.concatenate(([True], np.diff(address_key) != 0)) if len(address_key) else np.empty(0, bool)
+        flows = flows if flows is not None else self.token_flows()
+        return {
+            'addresses': np.bincount(address_key[first] // n_addresses, minlength=n_tx),
+            'tokens': np.bincount(flows['tx'], minlength=n_tx),
+        }
+
+    def address_flag(self, address_mask: np.ndarray) -> np.ndarray:
+        """アドレス表に対するマスクから、該当アドレスを含む取引のフラグを作る"""
+        hits = address_mask[self.utxo_address] if len(self.utxo_address) else np.empty(0, bool)
+        return np.bincount(self.utxo_tx[hits], minlength=len(self)) > 0
+
+    def profits(self, flows: Dict[str, np.ndarray], tx_index: int) -> Dict[str, Dict]:
+        """1取引分の利益（analyze_token_profits と同じ形式）"""
+        lo, hi = np.searchsorted(flows['tx'], [tx_index, tx_index + 1])
+        profit_analysis = {}
+        for i in range(lo, hi):
+            input_total, output_total = int(flows['input'][i]), int(flows['output'][i])
+            profit = output_total - input_total
+            if profit > 0:
+                profit_analysis[self.assets[flows['asset'][i]]] = {
+                    'input': input_total,
+                    'output': output_total,
+                    'profit': profit,
+                    'profit_percentage': (profit / input_total * 100) if input_total > 0 else 0
+                }
+        return profit_analysis
@@ -0,0 +1,59 @@
+"""
+WebSocketリプレイサーバー
+記録したメッセージ（1行1JSON）をローカルのWebSocketで配信する（テスト・検証用）
+
+使い方: python ws_replay.py recorded.jsonl --port 8765 --interval 0.01
+"""
+
+import argparse
+import asyncio
+import json
+
+from aiohttp import web
+
+
+def load_messages(path: str):
+    """1行1メッセージのJSONファイルを読み込み"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def create_app(messages, interval: float = 0.0, wait_subscribe: bool = True) -> web.Application:
+    """接続ごとに記録メッセージを順番に送信するアプリを作成"""
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        
+        if wait_subscribe:
+            # 購読メッセージを受け取ってから配信開始
+            await ws.receive()
+        for message in messages:
+            await ws.send_json(message)
+            if interval:
+                await asyncio.sleep(interval)
+        
+        # クライアントが切断するまで待機（pingなどは読み捨て）
+        async for _ in ws:
+            pass
+        return ws
+    
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    return app
+
+async def serve(messages, host: str = "127.0.0.1", port: int = 8765, interval: float = 0.0) -> web.AppRunner:
+    """リプレイサーバーを起動（停止は戻り値の runner.cleanup()）"""
+    runner = web.AppRunner(create_app(messages, interval))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocketリプレイサーバー")
+    parser.add_argument("path", help="記録メッセージ（JSON Lines）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.0, help="メッセージ間隔（秒）")
+    args = parser.parse_args()
+    
+    web.run_app(create_app(load_messages(args.path), args.interval), host=args.host, port=args.port)
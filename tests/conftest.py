@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Scripts/ はパッケージではなくフラットなモジュール群なので直接importできるようにする
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Scripts"))
@@ -0,0 +1,88 @@
+"""ArbitrageStream の板の最良気配と、リプレイしたWebSocket（ws_replay）での機会検出の確認"""
+
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+import ws_replay
+from arbitrage_stream import ArbitrageStream
+from fx_rate import FxRateCache
+from get_ticker import MultiCurrencyArbitrage
+from market_log import WS, MarketLogReader, MarketLogWriter
+
+USDJPY = 150.0
+ORDER_BOOK = {"bids": [["15000000", "1"], ["14990000", "2"]], "asks": [["15010000", "1"], ["15020000", "1"]]}
+
+
+def make_stream(tmp_path, **kwargs):
+    path = tmp_path / "fx_rate.json"
+    path.write_text(json.dumps({"rate": USDJPY, "updated_at": time.time()}))
+    arbitrage = MultiCurrencyArbitrage(fx=FxRateCache(path=str(path)))
+    return ArbitrageStream(arbitrage, ["BTC", "ETH"], **kwargs)
+
+def store_best(stream, pair):
+    """DataStoreの板をソートして求めた最良気配（比較用）"""
+    book = stream.coincheck_store.orderbook.sorted({"pair": pair}, limit=1)
+    if not book["bids"] or not book["asks"]:
+        return None
+    return {"bid": float(book["bids"][0]["rate"]), "ask": float(book["asks"][0]["rate"])}
+
+
+def test_book_top_matches_sorted_store(tmp_path):
+    stream = make_stream(tmp_path)
+    rng = random.Random(0)
+    rates = [str(1_000_000 + i * 1000) for i in range(40)]
+    for _ in range(2000):
+        pair = rng.choice(["btc_jpy", "eth_jpy"])
+        side = rng.choice(["bids", "asks"])
+        levels = [[rate, "0" if rng.random() < 0.4 else f"{rng.uniform(0.1, 2):.4f}"]
+                  for rate in rng.sample(rates, rng.randint(1, 3))]
+        stream.on_coincheck_message([pair, {side: levels}])
+        assert stream.coincheck_books[pair].quote() == store_best(stream, pair)
+
+def test_replayed_stream_detects_opportunity_once(tmp_path):
+    opportunities = []
+    stream = make_stream(tmp_path, min_profit=0.5, on_opportunity=opportunities.append)
+    stream.recorder = MarketLogWriter(str(tmp_path / "market.mklg"))
+    coincheck_messages = [
+        ["xrp_jpy", {"bids": [["90", "1"]], "asks": []}],       # 購読していないペア（板の初期化待ち）
+        ["btc_jpy", {"bids": [], "asks": [["15010000", "0"]]}],   # 最良売り気配が消える
+        ["btc_jpy", {"bids": [["15100000", "0.5"]], "asks": []}],  # 最良買い気配が上がる → OKX→Coincheck +0.87%
+        ["btc_jpy", {"bids": [["15100000", "0.4"]], "asks": []}],  # 閾値超えのまま（再通知しない）
+    ]
+    okx_messages = [{"arg": {"channel": "tickers", "instId": "BTC-USDT"},
+                     "data": [{"instId": "BTC-USDT", "bidPx": "99000", "askPx": "99800", "last": "99500"}]}]
+
+    async def order_books(request):
+        return web.json_response(ORDER_BOOK if request.query["pair"] == "btc_jpy" else {"bids": [], "asks": []})
+
+    async def run():
+        rest = web.Application()
+        rest.router.add_get("/api/order_books", order_books)
+        rest_runner = web.AppRunner(rest)
+        await rest_runner.setup()
+        await web.TCPSite(rest_runner, "127.0.0.1", 18780).start()
+        coincheck_runner = await ws_replay.serve(coincheck_messages, port=18781, interval=0.3)
+        okx_runner = await ws_replay.serve(okx_messages, port=18782)
+        stream.coincheck_rest_url = "http://127.0.0.1:18780"
+        stream.coincheck_ws_url = "ws://127.0.0.1:18781/"
+        stream.okx_ws_url = "ws://127.0.0.1:18782/ws/v5/public"
+        try:
+            await stream.stream(duration=1.8)
+        finally:
+            for runner in (rest_runner, coincheck_runner, okx_runner):
+                await runner.cleanup()
+            stream.recorder.close()
+
+    asyncio.run(run())
+    # 受信したWebSocketメッセージは接続先ごとに受信順で記録される
+    recorded = [(source, json.loads(body)) for _, kind, _, source, body in MarketLogReader(str(tmp_path / "market.mklg"))
+                if kind == WS]
+    assert [body for source, body in recorded if source == stream.coincheck_ws_url] == coincheck_messages
+    assert [body for source, body in recorded if source == stream.okx_ws_url] == okx_messages
+    assert stream.coincheck_books["btc_jpy"].quote() == store_best(stream, "btc_jpy") == {"bid": 15100000.0, "ask": 15020000.0}
+    assert [(o["currency"], o["direction"]) for o in opportunities] == [("BTC", "OKX→Coincheck")]
+    assert abs(opportunities[0]["profit_pct"] - (15100000 / USDJPY / 99800 - 1) * 100) < 1e-3
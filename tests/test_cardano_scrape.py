@@ -0,0 +1,30 @@
+"""CardanoDataFetcher.get_transactions_details: 取引ごとのエラーは欠損（None）として残りを取得"""
+
+from cardano_scrape import CardanoDataFetcher
+
+
+class FakeApi:
+    def __init__(self, failing):
+        self.failing = failing
+
+    def transaction(self, tx_hash, return_type=None):
+        if tx_hash == self.failing:
+            raise ConnectionError("connection reset")
+        return {'hash': tx_hash, 'block_time': 1, 'block_height': 2}
+
+    def transaction_utxos(self, tx_hash, return_type=None):
+        return {'hash': tx_hash, 'inputs': [], 'outputs': []}
+
+    def transaction_metadata(self, tx_hash, return_type=None):
+        return []
+
+
+def test_connection_error_is_logged_per_transaction(capsys):
+    fetcher = CardanoDataFetcher("test", cache_path=None)
+    fetcher.api = FakeApi(failing="b")
+
+    results = fetcher.get_transactions_details(["a", "b", "c"])
+
+    assert results[1] is None
+    assert [r['transaction'].hash for r in (results[0], results[2])] == ["a", "c"]
+    assert "取引詳細取得エラー b: connection reset" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+"""PoolTracker.apply_block を記録ブロック（block_fixture / load_block_fixtures）で再生して確認"""
+
+import json
+
+from cardano_address import DEX_POOL_ADDRESSES
+from dex_pools import PoolTracker, block_fixture, load_block_fixtures
+
+MINSWAP = DEX_POOL_ADDRESSES['minswap'][0]
+SUNDAE = DEX_POOL_ADDRESSES['sundaeswap'][0]
+USER = 'addr1qxuser'
+TOKEN = 'abcd' * 14 + '544f4b'
+ADA = 1_000_000
+
+
+def pool(address, nft, ada, tokens, **flags):
+    return {'address': address, 'amount': [{'unit': 'lovelace', 'quantity': str(ada * ADA)},
+                                           {'unit': nft, 'quantity': '1'},
+                                           {'unit': TOKEN, 'quantity': str(tokens)}], **flags}
+
+def user(ada=5):
+    return {'address': USER, 'amount': [{'unit': 'lovelace', 'quantity': str(ada * ADA)}]}
+
+def record_and_load(tmp_path, blocks):
+    """ブロックを記録ファイルに書き出して読み戻す"""
+    path = tmp_path / 'blocks.jsonl'
+    with open(path, 'w', encoding='utf-8') as f:
+        for height, transactions in blocks:
+            f.write(json.dumps(block_fixture(height, transactions)) + '\n')
+    return list(load_block_fixtures(str(path)))
+
+
+def test_apply_block_replays_recorded_blocks(tmp_path):
+    pool_a = pool(MINSWAP, 'nftA', 20_000, 1_000_000)
+    pool_a2 = pool(MINSWAP, 'nftA', 19_800, 1_010_000)
+    pool_b = pool(SUNDAE, 'nftB', 20_300, 1_000_000)
+    blocks = record_and_load(tmp_path, [
+        # 2つのDEXにプール作成（価格差1.5%、手数料控除後0.9%は閾値1%未満）
+        (1, [{'inputs': [user()], 'outputs': [pool_a, pool_b]}]),
+        # minswapでスワップ（プールを消費して同じNFTで再作成）→ 価格差3.55%
+        (2, [{'inputs': [pool_a, user()], 'outputs': [pool_a2, user(4)]}]),
+        # sundaeのプールを参照入力として読むだけ（消費されない）
+        (3, [{'inputs': [pool(SUNDAE, 'nftB', 20_300, 1_000_000, reference=True), user()], 'outputs': [user(4)]}]),
+        # sundaeのプールを消費して再作成しない（流動性の引き出し）
+        (4, [{'inputs': [pool_b], 'outputs': [user(20_300)]}]),
+    ])
+    assert blocks[2]['transactions'][0]['inputs'][0]['reference'] is True
+
+    tracker = PoolTracker(min_gap_pct=1.0)
+    def apply(block):
+        return tracker.apply_block(block['height'], block['transactions'])
+
+    assert apply(blocks[0]) == []
+    gaps = apply(blocks[1])
+    assert len(gaps) == 1
+    gap = gaps[0]
+    assert (gap['token'], gap['buy_dex'], gap['sell_dex']) == (TOKEN, 'minswap', 'sundaeswap')
+    assert gap['gap_pct'] == (20_300 / (19_800 / 1_010_000 * 1_000_000) - 1) * 100
+    assert gap['net_gap_pct'] == gap['gap_pct'] - 0.6
+    assert gap['block_height'] == 2
+    assert set(tracker.pools) == {('nftA',), ('nftB',)}
+    assert tracker.pools[('nftA',)]['ada'] == 19_800 * ADA
+
+    # 参照入力では削除されない
+    assert apply(blocks[2]) == []
+    assert set(tracker.pools) == {('nftA',), ('nftB',)}
+    # 消費されて再作成されなかったプールは削除され、比較相手がなくなる
+    assert apply(blocks[3]) == []
+    assert set(tracker.pools) == {('nftA',)}
+    assert set(tracker.price_index[TOKEN]) == {'minswap'}
@@ -0,0 +1,100 @@
+"""DiscordNotifier を fake_webhook の疑似Webhookに送って確認（分割・429のRetry-After・退避と再読み込み・整形エラー）"""
+
+import asyncio
+import time
+
+import aiohttp
+
+import fake_webhook
+from discord_notifier import MAX_EMBEDS, DiscordNotifier
+
+
+def embed_alerts(alerts):
+    return f"{len(alerts)}件", [{"title": alert["name"]} for alert in alerts]
+
+def run_with_webhook(port, body, **kwargs):
+    """疑似Webhookを起動して body(URL) を実行し、受信したペイロードと429の回数を返す"""
+    async def run():
+        runner = await fake_webhook.serve(port=port, **kwargs)
+        try:
+            await body(f"http://127.0.0.1:{port}/api/webhooks/1/token")
+            return runner.app["received"], runner.app["throttled"]
+        finally:
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+def test_alerts_are_coalesced_and_split(tmp_path):
+    async def body(url):
+        async with DiscordNotifier(url, format_alerts=embed_alerts, coalesce_window=0.1,
+                                   spool_path=str(tmp_path / "spool.jsonl")) as notifier:
+            for i in range(25):
+                notifier.alert(f"S{i}", {"name": f"S{i}"})
+            notifier.alert("S0", {"name": "S0-merged"})  # 同じキーはまとめる
+            await asyncio.sleep(0.5)
+
+    received, _ = run_with_webhook(18790, body)
+    assert [len(p["embeds"]) for p in received] == [MAX_EMBEDS, MAX_EMBEDS, 5]
+    assert [p["content"] for p in received] == ["25件 (1/3)", "25件 (2/3)", "25件 (3/3)"]
+    assert received[0]["embeds"][0]["title"] == "S0-merged"
+
+def test_rate_limited_payloads_are_retried_after_retry_after(tmp_path):
+    async def body(url):
+        # 別のクライアントが同じWebhookの枠を使い切った状態にする（最初の送信は429になる）
+        async with aiohttp.ClientSession() as session:
+            for i in range(2):
+                async with session.post(url, json={"content": f"other{i}"}) as resp:
+                    assert resp.status == 204
+        start = time.monotonic()
+        async with DiscordNotifier(url, spool_path=str(tmp_path / "spool.jsonl")) as notifier:
+            for i in range(3):
+                notifier.notify({"content": f"m{i}"})
+            while notifier.sent < 3 and time.monotonic() - start < 5:
+                await asyncio.sleep(0.05)
+        assert notifier.sent == 3 and notifier.failed == 0
+        # Retry-After（枠のリセット）まで待ってから再送している
+        assert time.monotonic() - start >= 0.8
+
+    received, throttled = run_with_webhook(18791, body, limit=2, reset_after=1.0)
+    assert [p["content"] for p in received] == ["other0", "other1", "m0", "m1", "m2"]
+    assert throttled >= 1
+
+def test_failed_payloads_are_spooled_and_reloaded(tmp_path):
+    spool_path = str(tmp_path / "spool.jsonl")
+
+    async def failing(url):
+        async with DiscordNotifier(url, retries=0, spool_path=spool_path) as notifier:
+            notifier.notify({"content": "first"})
+            notifier.notify({"content": "second"})
+            await asyncio.sleep(0.3)
+        assert notifier.sent == 0
+
+    received, _ = run_with_webhook(18792, failing, fail_first=100)
+    assert received == []
+    assert (tmp_path / "spool.jsonl").exists()
+
+    async def healthy(url):
+        async with DiscordNotifier(url, spool_path=spool_path):
+            await asyncio.sleep(0.3)
+
+    received, _ = run_with_webhook(18792, healthy)
+    assert [p["content"] for p in received] == ["first", "second"]
+    assert not (tmp_path / "spool.jsonl").exists()
+
+def test_format_error_does_not_stop_the_worker(tmp_path):
+    def format_alerts(alerts):
+        if any(alert.get("broken") for alert in alerts):
+            raise KeyError("price_change")
+        return embed_alerts(alerts)
+
+    async def body(url):
+        async with DiscordNotifier(url, format_alerts=format_alerts, coalesce_window=0.1,
+                                   spool_path=str(tmp_path / "spool.jsonl")) as notifier:
+            notifier.alert("bad", {"broken": True})
+            await asyncio.sleep(0.3)
+            notifier.alert("good", {"name": "good"})
+            await asyncio.sleep(0.3)
+            assert not notifier.task.done()
+
+    received, _ = run_with_webhook(18794, body)
+    assert [p["embeds"][0]["title"] for p in received] == ["good"]
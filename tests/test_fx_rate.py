@@ -0,0 +1,26 @@
+"""FxRateCache の定期更新スレッドの停止と再開"""
+
+import time
+
+from fx_rate import FxRateCache
+
+
+def test_refresh_thread_restarts_after_stop(tmp_path):
+    cache = FxRateCache(path=str(tmp_path / "fx_rate.json"))
+    calls = []
+    cache.refresh = lambda: calls.append(time.monotonic()) or True
+
+    cache.start(interval=0.02)
+    time.sleep(0.1)
+    cache.stop()
+    time.sleep(0.05)
+    stopped = len(calls)
+    assert stopped > 0
+    time.sleep(0.1)
+    assert len(calls) == stopped
+
+    # 停止後に再開しても定期更新が動く
+    cache.start(interval=0.02)
+    time.sleep(0.1)
+    cache.stop()
+    assert len(calls) > stopped
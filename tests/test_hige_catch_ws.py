@@ -0,0 +1,65 @@
+"""急騰検出（WebSocketモード）の on_candle_message を ws_replay のリプレイサーバー経由で確認"""
+
+import asyncio
+
+import aiohttp
+
+import ws_replay
+from hige_catch import BitgetPumpDetector
+
+STEP = 15 * 60 * 1000
+START = 1_699_986_500_000
+CHANNEL = {"instType": "SPOT", "channel": "candle15m", "instId": "PUMPUSDT"}
+
+
+def candle(index, close, volume):
+    """Bitgetのローソク足 [開始時刻, 始値, 高値, 安値, 終値, 数量, クオート出来高, USDT出来高]"""
+    return [str(START + index * STEP), "1", str(close), "1", str(close), "1", str(volume), str(volume)]
+
+def snapshot_with_old_pump():
+    """購読時のスナップショット（2時間前の足で急騰、最新2本は平常）"""
+    candles = [candle(i, 1.0, 100) for i in range(10)]
+    candles[2] = candle(2, 2.0, 1000)
+    return {"action": "snapshot", "arg": CHANNEL, "data": candles}
+
+def update(*candles):
+    return {"action": "update", "arg": CHANNEL, "data": list(candles)}
+
+def replay(messages, port):
+    """リプレイサーバーから受信したメッセージを順に on_candle_message に渡し、検出結果を返す"""
+    detector = BitgetPumpDetector("", state_path="bitget_state.json")
+
+    async def run():
+        runner = await ws_replay.serve(messages, port=port)
+        pumps = []
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect(f"http://127.0.0.1:{port}/v2/ws/public") as ws:
+                    await ws.send_json({"op": "subscribe", "args": [CHANNEL]})
+                    for _ in messages:
+                        pumps.extend(detector.on_candle_message(await ws.receive_json(timeout=5), ws))
+        finally:
+            await runner.cleanup()
+        return pumps
+
+    return asyncio.run(run())
+
+
+def test_snapshot_history_does_not_alert(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert replay([snapshot_with_old_pump()], port=18765) == []
+
+def test_update_after_snapshot_alerts_once_per_candle(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    messages = [
+        snapshot_with_old_pump(),
+        update(candle(9, 1.05, 150)),                 # 形成中の足の更新（閾値未満）
+        update(candle(9, 1.05, 150)),                 # 変化のない再送
+        update(candle(10, 1.1, 120)),                 # 新しい足の開始
+        update(candle(10, 1.8, 400)),                 # 価格は+71%だが出来高+167%は閾値未満
+        update(candle(10, 1.8, 400), candle(11, 3.0, 1500)),  # 次の足で急騰
+        update(candle(11, 3.2, 1600)),                # 同じ足の続きは再通知しない
+    ]
+    pumps = replay(messages, port=18766)
+    assert [(p["symbol"], p["timestamp"]) for p in pumps] == [("PUMPUSDT", START + 11 * STEP)]
+    assert pumps[0]["previous_price"] == 1.8
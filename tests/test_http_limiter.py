@@ -0,0 +1,69 @@
+"""HostLimiter の同時実行数の上限での待機（release() で起こされ、ポーリングしない）"""
+
+import asyncio
+import threading
+import time
+
+from http_limiter import HostLimiter
+
+
+def counting_limiter(max_concurrent):
+    limiter = HostLimiter("example.com", rate=1000, burst=1000, max_concurrent=max_concurrent)
+    attempts = []
+    try_acquire = limiter._try_acquire
+    limiter._try_acquire = lambda: attempts.append(1) or try_acquire()
+    return limiter, attempts
+
+
+def test_async_waiters_are_woken_by_release():
+    limiter, attempts = counting_limiter(2)
+    running, peak = [0], [0]
+
+    async def request():
+        await limiter.acquire_async()
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.02)
+        running[0] -= 1
+        limiter.release(200)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(20)))
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert peak[0] == 2 and limiter.in_flight == 0
+    assert time.monotonic() - start < 0.5
+    # 待機中は試行しない（取得1回＋待機前の1回＋起こされた後の数回程度）
+    assert len(attempts) < 20 * 4
+
+def test_cancelled_waiter_passes_its_slot_on():
+    limiter, _ = counting_limiter(1)
+
+    async def run():
+        await limiter.acquire_async()
+        cancelled = asyncio.create_task(limiter.acquire_async())
+        waiting = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        limiter.release(200)   # 先頭の待機者を起こす
+        cancelled.cancel()     # 起こされた待機者が取得前に取り消される
+        await asyncio.wait_for(waiting, 1)
+        assert cancelled.cancelled() and limiter.in_flight == 1
+
+    asyncio.run(run())
+
+def test_threads_wait_for_release():
+    limiter, attempts = counting_limiter(1)
+
+    def request():
+        limiter.acquire()
+        time.sleep(0.01)
+        limiter.release(200)
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+    assert not any(thread.is_alive() for thread in threads) and limiter.in_flight == 0
+    assert len(attempts) < 8 * 4
@@ -0,0 +1,94 @@
+"""逐次インジケーター（IncrementalIndicator / kline.update_indicator）とバッチ計算（rsi_analysis / atr_analysis）の一致確認"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import IncrementalIndicator, atr_analysis, rsi_analysis
+from get_kline import INTERVAL_MS, kline
+from kline_store import KlineStore
+
+STEP = INTERVAL_MS["30"]
+
+
+def random_bar(rng, prev_close):
+    close = prev_close * (1 + rng.normal(scale=0.01))
+    high = max(prev_close, close) * (1 + rng.random() * 0.005)
+    low = min(prev_close, close) * (1 - rng.random() * 0.005)
+    return high, low, close
+
+def forming_versions(rng, prev_close, n):
+    """同じ足の形成途中の値（高値は上がり安値は下がる方向にのみ更新）"""
+    high = low = close = prev_close
+    versions = []
+    for _ in range(n):
+        close = close * (1 + rng.normal(scale=0.005))
+        high, low = max(high, close), min(low, close)
+        versions.append((high, low, close))
+    return versions
+
+def batch(rows, period=14):
+    """バッチ計算の最終行の (RSI, ATR%)"""
+    df = pd.DataFrame(rows, columns=["high", "low", "close"])
+    return rsi_analysis(data=df, period=period).iloc[-1], atr_analysis(data=df, period=period).iloc[-1]
+
+def assert_same(actual, expected):
+    for a, e in zip(actual, expected):
+        if np.isnan(e):
+            assert np.isnan(a)
+        else:
+            assert a == pytest.approx(e, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_incremental_matches_batch_with_forming_bars(seed):
+    rng = np.random.default_rng(seed)
+    indicator = IncrementalIndicator()
+    confirmed = []
+    prev_close = 100.0
+    for _ in range(80):
+        # 形成中の足を何度も取り直しても確定足の状態は変わらない
+        versions = forming_versions(rng, prev_close, rng.integers(1, 5))
+        for version in versions:
+            assert_same(indicator.provisional(*version), batch(confirmed + [version]))
+        confirmed.append(versions[-1])
+        assert_same(indicator.update(*versions[-1]), batch(confirmed))
+        prev_close = versions[-1][2]
+
+def test_ring_buffer_wraps_many_times():
+    rng = np.random.default_rng(3)
+    indicator = IncrementalIndicator(period=5)
+    rows = []
+    prev_close = 50.0
+    for _ in range(500):
+        row = random_bar(rng, prev_close)
+        rows.append(row)
+        values = indicator.update(*row)
+        prev_close = row[2]
+    assert_same(values, batch(rows, period=5))
+
+
+def test_kline_update_indicator_only_commits_closed_bars(tmp_path):
+    """ポーリングごとに最終足（形成中）を取り直しても、バッチ計算と同じ値になる"""
+    rng = np.random.default_rng(4)
+    bot = kline("TESTUSDT", None, KlineStore(str(tmp_path)))
+    start = 1_700_000_000_000 - 1_700_000_000_000 % STEP
+    history = []  # 確定足 (timestamp, high, low, close)
+    prev_close = 100.0
+    for i in range(60):
+        ts = start + i * STEP
+        for j, (high, low, close) in enumerate(forming_versions(rng, prev_close, 3)):
+            # 取得結果は「前回の確定足以降＋形成中の足」
+            now_ms = ts + (j + 1) * STEP // 4
+            bars = history[-2:] + [(ts, high, low, close)]
+            df = pd.DataFrame(bars, columns=["timestamp", "high", "low", "close"])
+            values = bot.update_indicator(df, now_ms=now_ms)
+            assert_same(values, batch([row[1:] for row in history] + [(high, low, close)]))
+        history.append((ts, high, low, close))
+        prev_close = close
+
+    # 最終足が確定したら状態に反映される
+    df = pd.DataFrame(history[-1:], columns=["timestamp", "high", "low", "close"])
+    values = bot.update_indicator(df, now_ms=history[-1][0] + STEP)
+    assert bot.indicator.last_timestamp == history[-1][0]
+    assert_same(values, batch([row[1:] for row in history]))
@@ -0,0 +1,94 @@
+"""kline.backfill を疑似Bybit（aiohttpのローカルサーバー）に対して確認（ページ分割・重複排除・時系列順）"""
+
+import asyncio
+import time
+
+import numpy as np
+import pybotters
+from aiohttp import web
+
+from get_kline import INTERVAL_MS, kline
+from http_limiter import HostLimiter
+from kline_store import KlineStore
+
+STEP = INTERVAL_MS["30"]
+PORT = 18800
+
+
+def bar(ts):
+    """時刻から決まる足（Bybitの形式: [開始時刻, 始値, 高値, 安値, 終値, 出来高, 売買代金]）"""
+    price = 100 + (ts // STEP) % 50
+    return [str(ts), str(price), str(price + 1), str(price - 1), str(price + 0.5), "10", str(price * 10)]
+
+def run_with_bybit(body):
+    """疑似Bybitを起動して body(klineを作る関数) を実行し、受け取ったリクエストのパラメータ一覧を返す"""
+    requests = []
+
+    async def handler(request):
+        params = dict(request.query)
+        requests.append(params)
+        end = int(params.get("end", time.time() * 1000))
+        end -= end % STEP
+        limit = int(params["limit"])
+        start = int(params.get("start", end - (limit - 1) * STEP))
+        # Bybitと同じく新しい順。隣のページと重なる1本（start の1本前）も返して重複排除を確認する
+        timestamps = list(range(end, start - 2 * STEP, -STEP))[:limit + 1]
+        return web.json_response({"retCode": 0, "retMsg": "OK",
+                                  "result": {"symbol": params["symbol"], "list": [bar(ts) for ts in timestamps]}})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/v5/market/kline", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", PORT).start()
+        try:
+            async with pybotters.Client() as client:
+                def make(store):
+                    return kline("BTCUSDT", client, store=store, base_url=f"http://127.0.0.1:{PORT}")
+                return await body(make)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run()), requests
+
+def assert_contiguous(timestamps, start, end):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    assert timestamps[0] == start and timestamps[-1] == end
+    assert np.all(np.diff(timestamps) == STEP)
+
+
+def test_backfill_paginates_dedupes_and_sorts(tmp_path):
+    end = 1_700_000_000_000 - 1_700_000_000_000 % STEP
+    start = end - 2345 * STEP
+    limiter = HostLimiter("127.0.0.1", rate=1000, burst=1000)
+
+    async def body(make):
+        return await make(KlineStore(str(tmp_path))).backfill(start, end, limiter=limiter, limit=1000)
+
+    df, requests = run_with_bybit(body)
+    # 2346本を1000本ずつの期間に分けて3ページ
+    assert len(requests) == 3
+    assert sorted(int(r["start"]) for r in requests) == [start, end - 1999 * STEP, end - 999 * STEP]
+    assert all(int(r["end"]) - int(r["start"]) <= 999 * STEP for r in requests)
+    # ページの重なりは除かれ、時系列順に並ぶ（最初のページの1本前も返るので start より前の1本は残る）
+    assert df["timestamp"].is_unique
+    assert_contiguous(df["timestamp"], start - STEP, end)
+    stored = KlineStore(str(tmp_path)).read("BTCUSDT", "30")
+    assert np.array_equal(stored["timestamp"], df["timestamp"].to_numpy())
+    assert df["close"].iloc[-1] == float(bar(end)[4])
+
+def test_fetch_new_bars_backfills_long_downtime(tmp_path):
+    now = int(time.time() * 1000)
+    latest = now - now % STEP
+    last = latest - 3000 * STEP  # 1ページ（500本）を超える停止期間
+
+    async def body(make):
+        store = KlineStore(str(tmp_path))
+        store.append("BTCUSDT", "30", [(last, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)])
+        await make(store).fetch_new_bars()
+        return store.read("BTCUSDT", "30")
+
+    stored, requests = run_with_bybit(body)
+    assert len(requests) > 1
+    assert_contiguous(stored["timestamp"], last - STEP, latest)